@@ -0,0 +1,142 @@
+"""
+Batched ``UserActivity`` writes.
+
+Views used to call ``UserActivity.objects.create()`` inline, so every user
+action paid one more INSERT (and two index updates) before its response was
+sent. ``record()`` builds the row and defers the write instead:
+
+* inside a transaction the event is held until the transaction commits, so
+  rolled-back actions leave no activity behind;
+* during a request (``ActivityBufferMiddleware``) committed events collect in
+  a per-request buffer that is handed over once, when the response is ready;
+* the buffer goes to ``activity_writer``, which writes queued events with
+  ``bulk_create`` on a background thread.
+
+The writer's queue is bounded. When it is full the caller writes its own
+events instead of waiting, so a slow database slows the requests that produce
+activity rather than letting the queue grow without limit.
+``ACTIVITY_WRITER = 'sync'`` skips the thread and writes each buffer in the
+caller (useful for tests and management commands that read their own
+activity back).
+"""
+import atexit
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import UserActivity
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+# Buffers (one per request) waiting for the writer thread
+MAX_QUEUED = 1000
+
+_local = threading.local()
+
+
+class ActivityWriter:
+    """Write lists of unsaved ``UserActivity`` rows in batches on one thread"""
+
+    def __init__(self, batch_size=BATCH_SIZE, max_queued=MAX_QUEUED):
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def submit(self, events):
+        if not events:
+            return
+        if getattr(settings, 'ACTIVITY_WRITER', 'thread') == 'sync':
+            self.write(events)
+            return
+        self._start()
+        try:
+            self._queue.put_nowait(events)
+        except queue.Full:
+            logger.warning("Activity queue full; writing %s event(s) in the caller", len(events))
+            self.write(events)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='activity-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            events = self._queue.get()
+            # Coalesce whatever else is waiting into the same INSERTs
+            while len(events) < self.batch_size:
+                try:
+                    events = events + self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                self.write(events)
+            except Exception:
+                logger.exception("Writing %s activity event(s) failed", len(events))
+            finally:
+                if self._queue.empty():
+                    connections.close_all()
+
+    def write(self, events):
+        UserActivity.objects.bulk_create(events, batch_size=self.batch_size)
+
+    def close(self):
+        """Write whatever is still queued before shutdown"""
+        events = []
+        while True:
+            try:
+                events.extend(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if events:
+            try:
+                self.write(events)
+            except Exception:
+                logger.exception("Final activity write failed")
+
+
+activity_writer = ActivityWriter()
+
+
+def record(user, activity_type, description='', **fields):
+    """
+    Log an activity for ``user``. Other ``UserActivity`` fields (points_earned,
+    related_object_id, additional_info, ...) are passed as keyword arguments.
+    """
+    event = UserActivity(
+        user=user, activity_type=activity_type, description=description,
+        timestamp=timezone.now(), **fields
+    )
+    transaction.on_commit(lambda: _buffer(event))
+
+
+def _buffer(event):
+    events = getattr(_local, 'events', None)
+    if events is None:
+        activity_writer.submit([event])
+    else:
+        events.append(event)
+
+
+@contextmanager
+def buffered():
+    """Collect events recorded in this block and submit them as one batch"""
+    previous = getattr(_local, 'events', None)
+    _local.events = []
+    try:
+        yield
+    finally:
+        events, _local.events = _local.events, previous
+        if previous is not None:
+            previous.extend(events)
+        else:
+            activity_writer.submit(events)
@@ -0,0 +1,223 @@
+"""
+Materialized leaderboards.
+
+``LeaderboardView`` and ``TeamAnalyticsAPIView`` used to sort every active
+user by ``total_points`` on each request, and the API then counted completed
+tasks once per listed user. Scores and ranks are now kept in
+``LeaderboardEntry`` rows, one per user in each partition:
+
+* period: ``weekly`` and ``monthly`` (keyed by the first day of the
+  week/month) and ``all_time``;
+* team: every ``TeamMembership.team_name`` and ``''`` for everyone.
+
+``record_awards`` is called by ``users.points.apply_pending`` with each batch
+of applied ledger entries. It adds their points (and completions, for
+``task_completed`` entries) to the user's rows and moves ranks
+incrementally. When a score goes from ``old`` to ``new``, only the users
+scoring in ``[old, new)`` move down one place (or up one place when the
+score drops). A page read is then an index range scan on rank, cached
+until the next award.
+
+Rows never start from zero. A user without a row gets one computed from
+the sources: ``User.total_points`` and completed tasks for all-time, the
+ledger for weeks and months. A partition with no rows at all (a new week or
+month, or a team's first award) is rebuilt whole. The all-time partitions
+are filled by migration 0007 when the table is first deployed.
+
+``rebuild`` recomputes partitions from those sources, and
+``manage.py rebuild_leaderboard`` runs it on demand to restore exact ranks
+in case concurrent awards raced.
+"""
+import datetime
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import LeaderboardEntry
+
+User = get_user_model()
+
+PERIODS = ('weekly', 'monthly', 'all_time')
+
+ALL_TIME_START = datetime.date(1970, 1, 1)
+
+CACHE_TIMEOUT = 300
+VERSION_KEY = 'leaderboard:version'
+
+# An empty partition is rebuilt at most this often when read
+SEED_INTERVAL = 3600
+
+
+def period_start(period, day=None):
+    day = day or timezone.localdate()
+    if period == 'weekly':
+        return day - datetime.timedelta(days=day.weekday())
+    if period == 'monthly':
+        return day.replace(day=1)
+    return ALL_TIME_START
+
+
+def _teams_by_user(user_ids):
+    from users.models import TeamMembership
+    teams = defaultdict(list)
+    for user_id, team_name in TeamMembership.objects.filter(
+        user_id__in=user_ids, is_active=True
+    ).values_list('user_id', 'team_name'):
+        teams[user_id].append(team_name)
+    return teams
+
+
+def record_awards(entries):
+    """
+    Apply ``PointsLedger`` entries to the leaderboards. Call inside their
+    transaction, after the entries are marked applied and the user totals
+    updated: partitions and rows created here are computed from those sources
+    and so already include ``entries``.
+    """
+    if not entries:
+        return
+    teams = _teams_by_user({entry.user_id for entry in entries})
+
+    # (period, period_start, team) -> {user_id: [points, completed tasks]}
+    deltas = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for entry in entries:
+        day = timezone.localdate(entry.created_at)
+        completed = 1 if entry.reason == 'task_completed' else 0
+        for period in PERIODS:
+            start = period_start(period, day)
+            for team in [''] + teams.get(entry.user_id, []):
+                delta = deltas[(period, start, team)][entry.user_id]
+                delta[0] += entry.points
+                delta[1] += completed
+
+    for (period, start, team), users in deltas.items():
+        partition = LeaderboardEntry.objects.filter(period=period, period_start=start, team=team)
+        if not partition.exists():
+            # A lone row would rank its user first; fill the whole partition instead
+            rebuild(period, team, start)
+            continue
+        missing = set(users) - set(partition.filter(user_id__in=users).values_list('user_id', flat=True))
+        scores = _scores(period, start, team, user_ids=missing) if missing else {}
+        for user_id, (points, completed) in users.items():
+            if user_id in missing:
+                _insert(partition, period, start, team, user_id, *scores.get(user_id, (0, 0)))
+            else:
+                _apply_delta(partition, user_id, points, completed)
+    _bump_version()
+
+
+def _insert(partition, period, start, team, user_id, points, completed):
+    # Everyone scoring below the newcomer moves down one place
+    partition.filter(points__lt=points).update(rank=F('rank') + 1)
+    LeaderboardEntry.objects.create(
+        period=period, period_start=start, team=team, user_id=user_id,
+        points=points, completed_tasks=completed,
+        rank=partition.filter(points__gt=points).count() + 1,
+    )
+
+
+def _apply_delta(partition, user_id, points, completed):
+    row = partition.select_for_update().get(user_id=user_id)
+    old, new = row.points, row.points + points
+    others = partition.exclude(pk=row.pk)
+    if new > old:
+        others.filter(points__gte=old, points__lt=new).update(rank=F('rank') + 1)
+    elif new < old:
+        others.filter(points__gte=new, points__lt=old).update(rank=F('rank') - 1)
+    LeaderboardEntry.objects.filter(pk=row.pk).update(
+        points=new,
+        completed_tasks=F('completed_tasks') + completed,
+        rank=partition.filter(points__gt=new).exclude(pk=row.pk).count() + 1,
+    )
+
+
+def _bump_version():
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, timezone.now().timestamp(), None))
+
+
+def _scores(period, start, team, user_ids=None):
+    """{user_id: [points, completed tasks]} for a partition (or some of its users), computed from scratch"""
+    from tasks.models import Task
+    from users.models import PointsLedger, TeamMembership
+
+    members = None
+    if team:
+        members = set(TeamMembership.objects.filter(team_name=team, is_active=True).values_list('user_id', flat=True))
+    if user_ids is not None:
+        members = set(user_ids) if members is None else members & set(user_ids)
+
+    scores = defaultdict(lambda: [0, 0])
+    if period == 'all_time':
+        users = User.objects.filter(is_active=True)
+        tasks = Task.objects.filter(status='completed', assigned_to__isnull=False)
+        if members is not None:
+            users = users.filter(pk__in=members)
+            tasks = tasks.filter(assigned_to_id__in=members)
+        for user_id, points in users.values_list('pk', 'total_points'):
+            scores[user_id][0] = points
+        for row in tasks.values('assigned_to_id').annotate(done=Count('pk')):
+            scores[row['assigned_to_id']][1] = row['done']
+        return scores
+
+    ledger = PointsLedger.objects.filter(applied=True, created_at__date__gte=start)
+    if members is not None:
+        ledger = ledger.filter(user_id__in=members)
+    for row in ledger.values('user_id').annotate(
+        earned=Sum('points'), done=Count('pk', filter=Q(reason='task_completed'))
+    ):
+        scores[row['user_id']] = [row['earned'] or 0, row['done']]
+    return scores
+
+
+def rebuild(period, team='', start=None):
+    """Recompute one partition with exact ranks; returns its size"""
+    start = start or period_start(period)
+    ranked = sorted(_scores(period, start, team).items(), key=lambda item: (-item[1][0], item[0]))
+
+    rows = []
+    for position, (user_id, (points, completed)) in enumerate(ranked):
+        # Ties share the rank of the first user with that score
+        rank = rows[-1].rank if rows and rows[-1].points == points else position + 1
+        rows.append(LeaderboardEntry(
+            period=period, period_start=start, team=team, user_id=user_id,
+            points=points, completed_tasks=completed, rank=rank,
+        ))
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(period=period, period_start=start, team=team).delete()
+        LeaderboardEntry.objects.bulk_create(rows, batch_size=1000)
+    _bump_version()
+    return len(rows)
+
+
+def rebuild_all():
+    """Rebuild the current partitions of every period and team"""
+    from users.models import TeamMembership
+    teams = [''] + sorted(set(TeamMembership.objects.filter(is_active=True).values_list('team_name', flat=True)))
+    return {(period, team): rebuild(period, team) for period in PERIODS for team in teams}
+
+
+def page(period='all_time', team='', offset=0, limit=10):
+    """One page of a partition as ``LeaderboardEntry`` rows with ``user`` loaded, best first"""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown leaderboard period '{period}'")
+    start = period_start(period)
+    key = f'leaderboard:{cache.get(VERSION_KEY, 0)}:{period}:{start}:{team}:{offset}:{limit}'
+    entries = cache.get(key)
+    if entries is not None:
+        return entries
+
+    partition = LeaderboardEntry.objects.filter(period=period, period_start=start, team=team)
+    # Fallback for partitions no award has touched yet (e.g. a new team)
+    if not partition.exists() and cache.add(f'leaderboard:seeded:{period}:{start}:{team}', True, SEED_INTERVAL):
+        rebuild(period, team, start)
+
+    entries = list(
+        partition.filter(user__is_active=True).select_related('user')
+        .order_by('rank', 'user_id')[offset:offset + limit]
+    )
+    cache.set(key, entries, CACHE_TIMEOUT)
+    return entries
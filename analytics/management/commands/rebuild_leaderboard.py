@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from analytics import leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Recompute leaderboard scores and ranks for the current periods'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period',
+            choices=leaderboard.PERIODS,
+            help='Only rebuild this period (default: all of them)',
+        )
+        parser.add_argument(
+            '--team',
+            help='Only rebuild this team ("" for the overall leaderboard)',
+        )
+
+    def handle(self, *args, **options):
+        if options['period'] is None and options['team'] is None:
+            sizes = leaderboard.rebuild_all()
+        else:
+            periods = [options['period']] if options['period'] else leaderboard.PERIODS
+            team = options['team'] or ''
+            sizes = {(period, team): leaderboard.rebuild(period, team) for period in periods}
+
+        for (period, team), size in sizes.items():
+            self.stdout.write(f"{period} {team or 'all teams'}: {size} entries")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(sizes)} leaderboards"))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from analytics.retention import retention_days, roll_up
+
+
+class Command(BaseCommand):
+    help = 'Roll up and archive user activity older than ACTIVITY_RETENTION_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Keep this many days of raw activity (default: ACTIVITY_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help='Delete rolled-up rows without writing them to ACTIVITY_ARCHIVE_DIR',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run one rollup and exit instead of repeating',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=24 * 60 * 60,
+            help='Seconds between rollups when repeating (default: daily)',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else retention_days()
+        while True:
+            stats = roll_up(days, archive=not options['no_archive'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Rolled up {stats['events']} events from {stats['days']} day(s) older than {days} days"
+            ))
+            for path in stats['archives']:
+                self.stdout.write(f"  archived to {path}")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,12 @@
+from .activity import buffered
+
+
+class ActivityBufferMiddleware:
+    """Write the activity a request records in one batch once its response is ready"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with buffered():
+            return self.get_response(request)
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:40
+
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+ALL_TIME_START = datetime.date(1970, 1, 1)
+
+
+def seed_all_time(apps, schema_editor):
+    # Fill the all-time partitions (everyone and each team) from the current
+    # totals, so the first award ranks its user among everybody else
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Task = apps.get_model('tasks', 'Task')
+    TeamMembership = apps.get_model('users', 'TeamMembership')
+    LeaderboardEntry = apps.get_model('analytics', 'LeaderboardEntry')
+
+    points = dict(User.objects.filter(is_active=True).values_list('pk', 'total_points'))
+    completed = dict(
+        Task.objects.filter(status='completed', assigned_to_id__in=points)
+        .values('assigned_to_id').annotate(done=Count('pk')).values_list('assigned_to_id', 'done')
+    )
+    teams = defaultdict(set)
+    for user_id, team_name in TeamMembership.objects.filter(is_active=True).values_list('user_id', 'team_name'):
+        teams[team_name].add(user_id)
+
+    partitions = [('', set(points))] + sorted(teams.items())
+    for team, members in partitions:
+        ranked = sorted((user_id for user_id in members if user_id in points), key=lambda pk: (-points[pk], pk))
+        rows = []
+        for position, user_id in enumerate(ranked):
+            # Ties share the rank of the first user with that score
+            rank = rows[-1].rank if rows and rows[-1].points == points[user_id] else position + 1
+            rows.append(LeaderboardEntry(
+                period='all_time', period_start=ALL_TIME_START, team=team, user_id=user_id,
+                points=points[user_id], completed_tasks=completed.get(user_id, 0), rank=rank,
+            ))
+        LeaderboardEntry.objects.filter(period='all_time', period_start=ALL_TIME_START, team=team).delete()
+        LeaderboardEntry.objects.bulk_create(rows, batch_size=1000)
+
+
+def clear_all_time(apps, schema_editor):
+    LeaderboardEntry = apps.get_model('analytics', 'LeaderboardEntry')
+    LeaderboardEntry.objects.filter(period='all_time').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analytics', '0006_useractivitydaily'),
+        ('tasks', '0012_bulktaskupload_claimed_at'),
+        ('users', '0003_pointsledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_all_time, clear_all_time),
+    ]
@@ -34,7 +34,8 @@ class UserActivity(models.Model):
     user_agent = models.TextField(blank=True, help_text="User's browser information")
     additional_info = models.TextField(blank=True, help_text="Additional context information")
     
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the activity is recorded, not when the batch is written
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         db_table = 'user_activities'
@@ -45,4 +46,54 @@ class UserActivity(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.user.email} - {self.activity_type} at {self.timestamp}"
\ No newline at end of file
+        return f"{self.user.email} - {self.activity_type} at {self.timestamp}"
+
+class LeaderboardEntry(models.Model):
+    """A user's points and rank in one leaderboard partition (see ``analytics.leaderboard``)"""
+    PERIOD_CHOICES = [
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('all_time', 'All Time'),
+    ]
+    
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    # First day of the week/month; a fixed date for all_time
+    period_start = models.DateField()
+    # TeamMembership.team_name, or '' for everyone
+    team = models.CharField(max_length=100, blank=True, default='')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    
+    points = models.IntegerField(default=0)
+    completed_tasks = models.PositiveIntegerField(default=0)
+    # 1 + number of users in the partition with more points
+    rank = models.PositiveIntegerField(default=1)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'leaderboard_entries'
+        unique_together = ('period', 'period_start', 'team', 'user')
+        indexes = [
+            models.Index(fields=['period', 'period_start', 'team', 'rank']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.rank} {self.user} ({self.period} {self.team or 'all'})"
+
+class UserActivityDaily(models.Model):
+    """Per-day activity counts that replace raw ``UserActivity`` rows past retention"""
+    date = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_activity')
+    activity_type = models.CharField(max_length=50)
+    count = models.PositiveIntegerField(default=0)
+    points_earned = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'user_activity_daily'
+        unique_together = ('date', 'user', 'activity_type')
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.activity_type} x{self.count} on {self.date}"
@@ -0,0 +1,170 @@
+"""
+Retention for ``user_activities``.
+
+Every user action adds a row to ``user_activities``, and nothing was ever
+removed, so it became the largest table in the database. Only the recent
+rows are read one by one (activity feeds); older history is only counted.
+``roll_up`` keeps ``ACTIVITY_RETENTION_DAYS`` days of raw rows and handles
+anything older one day at a time:
+
+* the day's rows are written to a gzipped JSON-lines file under
+  ``ACTIVITY_ARCHIVE_DIR/<year>/<month>/`` (skipped when archiving is off);
+* their counts and points per (user, activity_type) are added to
+  ``UserActivityDaily``;
+* the raw rows are deleted, in the same transaction as the rollup, so each
+  event is counted either in ``user_activities`` or in the rollup, never in
+  both.
+
+``activity_totals`` adds the rollups and the remaining raw rows together, so
+analytics read a handful of rollup rows per day instead of scanning raw
+events. ``manage.py rollup_activity`` runs the rollup, once or daily.
+
+Monthly PostgreSQL partitions were considered and left out: a partitioned
+table needs the partition key in its primary key, which Django's
+single-column ``id`` cannot express. With the rollup the table holds only
+the retention window, which gives the same benefit.
+"""
+import datetime
+import gzip
+import json
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .models import UserActivity, UserActivityDaily
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 90
+
+ARCHIVE_FIELDS = [
+    'id', 'user_id', 'activity_type', 'description', 'points_earned',
+    'related_object_id', 'related_object_type', 'session_id', 'ip_address',
+    'user_agent', 'additional_info', 'timestamp',
+]
+
+
+def retention_days():
+    return getattr(settings, 'ACTIVITY_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+
+
+def archive_dir():
+    return getattr(settings, 'ACTIVITY_ARCHIVE_DIR', '')
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def roll_up(days=None, archive=True):
+    """Roll up and remove raw events older than ``days`` days; returns stats"""
+    days = retention_days() if days is None else days
+    cutoff = _day_start(timezone.localdate() - datetime.timedelta(days=days))
+    directory = archive_dir() if archive else ''
+
+    stats = {'days': 0, 'events': 0, 'archives': []}
+    while True:
+        oldest = UserActivity.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values_list(
+            'timestamp', flat=True
+        ).first()
+        if oldest is None:
+            return stats
+        day = timezone.localdate(oldest)
+        events, path = roll_up_day(day, directory)
+        stats['days'] += 1
+        stats['events'] += events
+        if path:
+            stats['archives'].append(path)
+
+
+def roll_up_day(day, directory=''):
+    """Roll up one day of raw events; returns (events removed, archive path or None)"""
+    start = _day_start(day)
+    end = _day_start(day + datetime.timedelta(days=1))
+    raw = UserActivity.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    # Pin the set of rows so events written meanwhile wait for the next run
+    last_pk = raw.aggregate(last=Max('pk'))['last']
+    if last_pk is None:
+        return 0, None
+    rows = raw.filter(pk__lte=last_pk)
+
+    path = _archive(rows, day, last_pk, directory) if directory else None
+
+    with transaction.atomic():
+        totals = {
+            (row['user_id'], row['activity_type']): (row['events'], row['points'] or 0)
+            for row in rows.values('user_id', 'activity_type').annotate(
+                events=Count('pk'), points=Sum('points_earned')
+            ).order_by()
+        }
+        existing = {
+            (rollup.user_id, rollup.activity_type): rollup
+            for rollup in UserActivityDaily.objects.select_for_update().filter(date=day)
+        }
+        created, updated = [], []
+        for (user_id, activity_type), (events, points) in totals.items():
+            rollup = existing.get((user_id, activity_type))
+            if rollup is None:
+                created.append(UserActivityDaily(
+                    date=day, user_id=user_id, activity_type=activity_type,
+                    count=events, points_earned=points,
+                ))
+            else:
+                rollup.count += events
+                rollup.points_earned += points
+                updated.append(rollup)
+        UserActivityDaily.objects.bulk_create(created)
+        UserActivityDaily.objects.bulk_update(updated, ['count', 'points_earned'])
+
+        expected = sum(events for events, _ in totals.values())
+        deleted, _ = rows.delete()
+        if deleted != expected:
+            # Another rollup took some of these rows; undo ours rather than double count
+            raise RuntimeError(f"Activity rollup for {day} raced with another run")
+
+    logger.info("Rolled up %s activity events for %s", deleted, day)
+    return deleted, path
+
+
+def _archive(rows, day, last_pk, directory):
+    folder = os.path.join(directory, f'{day:%Y}', f'{day:%m}')
+    os.makedirs(folder, exist_ok=True)
+    # last_pk keeps a rerun for the same day from overwriting an earlier archive
+    path = os.path.join(folder, f'user_activities-{day:%Y-%m-%d}-{last_pk}.jsonl.gz')
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw_file, gzip.GzipFile(fileobj=raw_file, mode='wb') as archive:
+            for row in rows.order_by('pk').values(*ARCHIVE_FIELDS).iterator(chunk_size=2000):
+                archive.write(json.dumps(row, default=str).encode('utf-8') + b'\n')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def activity_totals(since, user=None):
+    """
+    {activity_type: {'count': n, 'points': n}} for activity since the date
+    ``since``, combining rollups and raw events.
+    """
+    rollups = UserActivityDaily.objects.filter(date__gte=since)
+    raw = UserActivity.objects.filter(timestamp__gte=_day_start(since))
+    if user is not None:
+        rollups = rollups.filter(user=user)
+        raw = raw.filter(user=user)
+
+    totals = {}
+    for row in rollups.values('activity_type').annotate(events=Sum('count'), points=Sum('points_earned')).order_by():
+        totals[row['activity_type']] = {'count': row['events'], 'points': row['points'] or 0}
+    for row in raw.values('activity_type').annotate(events=Count('pk'), points=Sum('points_earned')).order_by():
+        entry = totals.setdefault(row['activity_type'], {'count': 0, 'points': 0})
+        entry['count'] += row['events']
+        entry['points'] += row['points'] or 0
+    return totals
@@ -38,11 +38,15 @@ except ImportError:
             self.data = data
             self.status = status
 
+from . import leaderboard
 from .models import UserActivity
+from .retention import activity_totals
 from users.models import User
 from tasks.models import Task
 from projects.models import Project
 
+LEADERBOARD_PAGE_SIZE = 25
+
 # Web Views
 class AnalyticsDashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'analytics/analytics_dashboard.html'
@@ -57,7 +61,15 @@ class AnalyticsDashboardView(LoginRequiredMixin, TemplateView):
         context['completed_tasks'] = Task.objects.filter(status='completed').count()
         
         # Get recent activities
-        context['recent_activities'] = UserActivity.objects.all()[:10]
+        context['recent_activities'] = UserActivity.objects.select_related('user')[:10]
+        
+        # Activity over the last 30 days, mostly from the daily rollups
+        labels = dict(UserActivity.ACTIVITY_TYPES)
+        totals = activity_totals(timezone.localdate() - timedelta(days=30))
+        context['activity_totals'] = [
+            {'type': activity_type, 'label': labels.get(activity_type, activity_type), **values}
+            for activity_type, values in sorted(totals.items(), key=lambda item: -item[1]['count'])
+        ]
         
         return context
 
@@ -105,8 +117,22 @@ class LeaderboardView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Top users by points
-        context['top_users'] = User.objects.filter(is_active=True).order_by('-total_points')[:10]
+        period = self.request.GET.get('period', 'all_time')
+        if period not in leaderboard.PERIODS:
+            period = 'all_time'
+        team = self.request.GET.get('team', '')
+        try:
+            page = max(int(self.request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        
+        # Precomputed ranks, so a page is read straight off the rank index
+        entries = leaderboard.page(period, team, offset=(page - 1) * LEADERBOARD_PAGE_SIZE, limit=LEADERBOARD_PAGE_SIZE)
+        context['leaderboard'] = entries
+        context['top_users'] = [entry.user for entry in entries]
+        context['period'] = period
+        context['team'] = team
+        context['page'] = page
         
         return context
 
@@ -201,14 +227,13 @@ if HAS_REST_FRAMEWORK:
             }
             
             # Top performers
-            top_users = User.objects.filter(is_active=True).order_by('-total_points')[:5]
             top_performers = []
-            for user in top_users:
+            for entry in leaderboard.page('all_time', limit=5):
                 top_performers.append({
-                    'name': user.get_full_name(),
-                    'points': user.total_points,
-                    'level': user.level,
-                    'completed_tasks': Task.objects.filter(assigned_to=user, status='completed').count(),
+                    'name': entry.user.get_full_name(),
+                    'points': entry.points,
+                    'level': entry.user.level,
+                    'completed_tasks': entry.completed_tasks,
                 })
             
             return Response({
@@ -0,0 +1,218 @@
+"""
+Lazily created, shared Google API clients for the service account.
+
+``services`` used to authenticate and ``build()`` the Drive and Sheets
+clients as soon as a service object was created, and ``build()`` parses a
+discovery document of several hundred kilobytes each time. ``client_pool``
+does that work once, and only on first use:
+
+* nothing is loaded while ``GOOGLE_DRIVE_ENABLED`` is off; every client is
+  then ``None``;
+* service-account credentials are loaded once per process and refreshed by
+  a daemon thread shortly before they expire, so requests never wait for a
+  token refresh;
+* discovery documents are kept in ``GOOGLE_DISCOVERY_CACHE_DIR`` (taken from
+  the copy bundled with google-api-python-client, or downloaded once) and
+  read from disk instead of being fetched again;
+* clients are per thread, because the underlying ``httplib2.Http`` is not
+  thread-safe; each thread builds its client from the in-memory document
+  once and reuses it.
+"""
+import datetime
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SCOPES = [
+    'https://www.googleapis.com/auth/drive',
+    'https://www.googleapis.com/auth/drive.file',
+    'https://www.googleapis.com/auth/spreadsheets',
+]
+
+DISCOVERY_URLS = [
+    'https://{api}.googleapis.com/$discovery/rest?version={version}',
+    'https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest',
+]
+
+# Refresh credentials this long before they expire
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
+REFRESH_CHECK_INTERVAL = 60
+
+# After a failed credential load, wait this long before trying again
+LOAD_RETRY_INTERVAL = 300
+
+
+def google_enabled():
+    return getattr(settings, 'GOOGLE_DRIVE_ENABLED', False)
+
+
+def discovery_cache_dir():
+    return getattr(settings, 'GOOGLE_DISCOVERY_CACHE_DIR', '') or os.path.join(
+        tempfile.gettempdir(), 'google-discovery-cache'
+    )
+
+
+class ClientPool:
+    """Process-wide credentials and discovery documents, per-thread clients"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._load_failed_at = None
+        self._documents = {}
+        self._local = threading.local()
+        self._refresher = None
+
+    def credentials(self):
+        """Service-account credentials, or None if disabled or unavailable"""
+        if not google_enabled():
+            return None
+        if self._credentials is not None:
+            return self._credentials
+        with self._lock:
+            if self._credentials is None:
+                if self._load_failed_at and time.monotonic() - self._load_failed_at < LOAD_RETRY_INTERVAL:
+                    return None
+                self._credentials = self._load_credentials()
+                if self._credentials is None:
+                    self._load_failed_at = time.monotonic()
+                else:
+                    self._start_refresher()
+            return self._credentials
+
+    def _load_credentials(self):
+        try:
+            from google.oauth2.service_account import Credentials
+        except ImportError:
+            logger.warning("Google libraries not available")
+            return None
+
+        credentials_path = getattr(settings, 'GOOGLE_SERVICE_ACCOUNT_FILE', None)
+        credentials_json = getattr(settings, 'GOOGLE_SERVICE_ACCOUNT_JSON', None)
+        try:
+            if credentials_path and os.path.exists(credentials_path):
+                return Credentials.from_service_account_file(credentials_path, scopes=SCOPES)
+            if credentials_json:
+                return Credentials.from_service_account_info(json.loads(credentials_json), scopes=SCOPES)
+        except Exception as e:
+            logger.error(f"Failed to load Google service account credentials: {e}")
+            return None
+        logger.error("No Google service account credentials found")
+        return None
+
+    def _start_refresher(self):
+        # Caller holds self._lock
+        if self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh_loop, name='google-credentials', daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self.refresh_if_expiring()
+            except Exception as e:
+                logger.warning(f"Google credential refresh failed: {e}")
+            time.sleep(REFRESH_CHECK_INTERVAL)
+
+    def refresh_if_expiring(self, margin=REFRESH_MARGIN):
+        credentials = self._credentials
+        if credentials is None:
+            return
+        # google-auth keeps expiry as naive UTC
+        expiry = credentials.expiry
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if expiry is None or expiry - now < margin:
+            from google.auth.transport.requests import Request
+            credentials.refresh(Request())
+
+    def discovery_document(self, api, version):
+        """Discovery document text for ``api``/``version``, from memory or disk"""
+        key = f'{api}.{version}'
+        document = self._documents.get(key)
+        if document is not None:
+            return document
+
+        path = os.path.join(discovery_cache_dir(), f'{key}.json')
+        try:
+            with open(path, encoding='utf-8') as cached:
+                document = cached.read()
+        except OSError:
+            document = self._fetch_document(api, version)
+            self._write_cache(path, document)
+        self._documents[key] = document
+        return document
+
+    def _fetch_document(self, api, version):
+        try:
+            from googleapiclient.discovery_cache import get_static_doc
+            document = get_static_doc(api, version)
+            if document:
+                return document
+        except ImportError:
+            pass
+        last_error = None
+        for template in DISCOVERY_URLS:
+            try:
+                with urllib.request.urlopen(template.format(api=api, version=version), timeout=30) as response:
+                    return response.read().decode('utf-8')
+            except OSError as e:
+                last_error = e
+        raise last_error
+
+    def _write_cache(self, path, document):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+                tmp.write(document)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache discovery document at {path}: {e}")
+
+    def client(self, api, version):
+        """This thread's client for ``api``/``version``, or None if unavailable"""
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        key = (api, version)
+        if key not in clients:
+            credentials = self.credentials()
+            if credentials is None:
+                return None
+            try:
+                from googleapiclient.discovery import build_from_document
+                clients[key] = build_from_document(self.discovery_document(api, version), credentials=credentials)
+            except Exception as e:
+                logger.error(f"Failed to build Google {api} {version} client: {e}")
+                return None
+        return clients[key]
+
+    def gspread_client(self):
+        """This thread's gspread client, or None if unavailable"""
+        gc = getattr(self._local, 'gspread', None)
+        if gc is None:
+            credentials = self.credentials()
+            if credentials is None:
+                return None
+            import gspread
+            gc = self._local.gspread = gspread.authorize(credentials)
+        return gc
+
+    def reset(self):
+        """Forget credentials and this thread's clients (e.g. after rotating keys)"""
+        with self._lock:
+            self._credentials = None
+            self._load_failed_at = None
+        self._local.clients = {}
+        self._local.gspread = None
+
+
+client_pool = ClientPool()
@@ -0,0 +1,250 @@
+"""
+Outbox queue for uploading task and resource files to Google Drive.
+
+Uploading inside the request made task creation take several seconds per
+attachment. Now the request only marks the file's ``TaskFileDriveSync`` /
+``ResourceFileDriveSync`` row ``pending``; the file itself is already on
+local disk. Workers drain the queue:
+
+* rows are claimed in batches with ``SELECT ... FOR UPDATE SKIP LOCKED``, so
+  several workers can run side by side;
+* each batch resolves every distinct Drive folder once, streams each file
+  with a resumable ``MediaFileUpload`` and writes the resulting Drive IDs
+  back with ``bulk_update``;
+* transient failures (rate limits, 5xx, network errors) are retried with
+  exponential backoff and jitter, up to ``MAX_ATTEMPTS``; other errors fail
+  the row at once. A 404 for the parent folder drops its cached ID (see
+  ``folder_cache``) and retries. Every batch is recorded in
+  ``GoogleDriveSyncLog``.
+
+``TASK_JOBS_BACKEND`` picks who drains: ``thread`` starts an in-process
+drain after the enqueuing transaction commits, ``database`` leaves it to
+``manage.py process_drive_uploads``.
+"""
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from resources.models import ResourceFile, ResourceFileDriveSync
+from tasks.models import TaskFile, TaskFileDriveSync
+from .models import GoogleDriveSyncLog
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 20
+
+MAX_ATTEMPTS = 8
+
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=6)
+
+# Rows left 'uploading' this long belong to a worker that died
+STALE_CLAIM = timedelta(minutes=30)
+
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# (sync model, field pointing at the file, file model)
+QUEUES = [
+    (TaskFileDriveSync, 'task_file', TaskFile),
+    (ResourceFileDriveSync, 'resource_file', ResourceFile),
+]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def drive_enabled():
+    return getattr(settings, 'GOOGLE_DRIVE_ENABLED', False)
+
+
+def _sync_model_for(file_obj):
+    for model, field, file_model in QUEUES:
+        if isinstance(file_obj, file_model):
+            return model, field
+    raise TypeError(f"Cannot queue {type(file_obj).__name__} for Drive upload")
+
+
+def enqueue_drive_upload(file_obj, folder_path, description=''):
+    """Queue a ``TaskFile`` or ``ResourceFile`` for upload to ``folder_path``"""
+    model, field = _sync_model_for(file_obj)
+    model.objects.update_or_create(
+        **{field: file_obj},
+        defaults={
+            'status': 'pending',
+            'folder_path': folder_path,
+            'description': description,
+            'retry_count': 0,
+            'next_attempt_at': timezone.now(),
+            'sync_message': '',
+        },
+    )
+    schedule_drain()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='drive-upload')
+        return _executor
+
+
+def schedule_drain():
+    """Drain the queue in-process once the current transaction commits"""
+    if getattr(settings, 'TASK_JOBS_BACKEND', 'thread') == 'database':
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_drain_in_thread))
+
+
+def _drain_in_thread():
+    try:
+        drain()
+    except Exception:
+        logger.exception("Drive upload queue drain failed")
+    finally:
+        connections.close_all()
+
+
+def claim_batch(model, field, limit=BATCH_SIZE):
+    """Claim due rows of ``model``, skipping rows locked by other workers"""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            model.objects.select_related(field)
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(
+                Q(status='pending', next_attempt_at__lte=now)
+                | Q(status='uploading', last_synced__lt=now - STALE_CLAIM)
+            )
+            .order_by('next_attempt_at')[:limit]
+        )
+        model.objects.filter(pk__in=[row.pk for row in rows]).update(status='uploading', last_synced=now)
+    return rows
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with jitter for the ``attempt``-th retry"""
+    delay = min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def is_transient(error):
+    from googleapiclient.errors import HttpError
+    if isinstance(error, HttpError):
+        return error.resp.status in TRANSIENT_STATUSES
+    return isinstance(error, (OSError, TimeoutError))
+
+
+def _is_missing_folder(error):
+    from googleapiclient.errors import HttpError
+    return isinstance(error, HttpError) and error.resp.status == 404
+
+
+def process_batch(drive, queue, rows):
+    """Upload one claimed batch; returns (uploaded, retrying, failed)"""
+    model, field, file_model = queue
+    files = {row.pk: getattr(row, field) for row in rows}
+    folder_ids = {}
+    uploaded = retrying = failed = 0
+    now = timezone.now()
+
+    for row in rows:
+        file_obj = files[row.pk]
+        try:
+            if row.folder_path not in folder_ids:
+                folder_ids[row.folder_path] = drive.get_or_create_folder(row.folder_path)
+            if row.folder_path and not folder_ids[row.folder_path]:
+                del folder_ids[row.folder_path]
+                raise ConnectionError(f"Could not resolve Drive folder '{row.folder_path}'")
+            result = drive.upload_local_file(
+                os.path.join(settings.MEDIA_ROOT, file_obj.local_file_path),
+                file_obj.filename,
+                parent_id=folder_ids[row.folder_path],
+                description=row.description,
+                mime_type=file_obj.mime_type or None,
+            )
+        except Exception as e:
+            if _is_missing_folder(e) and row.folder_path:
+                # The cached folder was deleted in Drive; the retry recreates it
+                drive.invalidate_folder(row.folder_path)
+                folder_ids.pop(row.folder_path, None)
+            row.retry_count += 1
+            row.sync_success = False
+            row.sync_message = str(e)[:1000]
+            if (is_transient(e) or _is_missing_folder(e)) and row.retry_count < MAX_ATTEMPTS:
+                row.status = 'pending'
+                row.next_attempt_at = now + backoff_delay(row.retry_count - 1)
+                retrying += 1
+            else:
+                row.status = 'failed'
+                failed += 1
+            logger.warning("Drive upload of %s failed (attempt %s): %s", file_obj.filename, row.retry_count, e)
+            continue
+
+        file_obj.drive_file_id = result.get('id')
+        file_obj.drive_file_url = result.get('webViewLink') or ''
+        row.status = 'synced'
+        row.sync_success = True
+        row.sync_message = ''
+        uploaded += 1
+
+    with transaction.atomic():
+        file_model.objects.bulk_update(
+            [files[row.pk] for row in rows if row.status == 'synced'],
+            ['drive_file_id', 'drive_file_url'],
+        )
+        model.objects.bulk_update(
+            rows,
+            ['status', 'sync_success', 'sync_message', 'retry_count', 'next_attempt_at'],
+        )
+    return uploaded, retrying, failed
+
+
+def drain(max_batches=None):
+    """Upload queued files until nothing is due; returns totals per outcome"""
+    totals = {'uploaded': 0, 'retrying': 0, 'failed': 0}
+    if not drive_enabled():
+        return totals
+
+    from .services import GoogleDriveService
+    drive = GoogleDriveService()
+    if not drive.service.drive_service:
+        logger.error("Google Drive is enabled but could not be authenticated")
+        return totals
+
+    batches = 0
+    for queue in QUEUES:
+        model, field, _ = queue
+        while max_batches is None or batches < max_batches:
+            rows = claim_batch(model, field)
+            if not rows:
+                break
+            batches += 1
+            log = GoogleDriveSyncLog.objects.create(
+                sync_type='upload', status='in_progress',
+                operation_data={'queue': model._meta.db_table, 'files': len(rows)},
+            )
+            try:
+                uploaded, retrying, failed = process_batch(drive, queue, rows)
+            except Exception as e:
+                # Leave the rows claimed; they are reclaimed after STALE_CLAIM
+                log.mark_failed(str(e))
+                raise
+            log.operation_data.update(uploaded=uploaded, retrying=retrying, failed=failed)
+            log.save(update_fields=['operation_data'])
+            if failed and not uploaded:
+                log.mark_failed(f"{failed} file(s) failed permanently")
+            else:
+                log.mark_completed()
+            totals['uploaded'] += uploaded
+            totals['retrying'] += retrying
+            totals['failed'] += failed
+    return totals
@@ -0,0 +1,308 @@
+"""
+Incremental mirror of a Drive account into ``GoogleDriveFile``.
+
+``google_drive_sync`` used to list a single page of 100 files and
+``update_or_create`` each one inside the request. Now a sync is a
+``GoogleDriveSyncLog`` row processed in the background (``TASK_JOBS_BACKEND``
+as for the other jobs; ``manage.py sync_drive_changes`` for ``database``):
+
+* the first sync of an account stores a start page token from
+  ``changes.getStartPageToken`` and then pages through ``files.list``;
+  tracked files of the account missing from the complete listing are
+  marked removed (files attributed to the user for a user's account,
+  unattributed files for the service account);
+* every later sync pages through ``changes.list`` from the stored token, so
+  only files that changed since the last sync are fetched;
+* each page is written with one bulk upsert on ``drive_id`` and the token is
+  advanced in the same transaction, so an interrupted sync resumes from the
+  last page it finished;
+* removed or trashed files are marked ``sync_status='removed'``.
+
+Progress (pages, files upserted and removed) is kept in the log's
+``operation_data`` while the sync runs.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .clients import client_pool
+from .models import GoogleDriveChangeToken, GoogleDriveFile, GoogleDriveSyncLog, UserGoogleAuth
+
+logger = logging.getLogger(__name__)
+
+# Largest page size files.list and changes.list accept
+PAGE_SIZE = 1000
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+FILE_FIELDS = (
+    'id, name, mimeType, size, webViewLink, webContentLink, '
+    'createdTime, modifiedTime, md5Checksum, trashed'
+)
+
+UPSERT_FIELDS = [
+    'name', 'mime_type', 'file_type', 'size', 'web_view_link', 'web_content_link',
+    'created_time', 'modified_time', 'checksum', 'last_synced', 'sync_status', 'updated_at',
+]
+
+SERVICE_ACCOUNT = 'service'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class TokenExpired(Exception):
+    """The stored page token is no longer accepted by Drive"""
+
+
+def account_key(user=None):
+    return f'user:{user.pk}' if user else SERVICE_ACCOUNT
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='drive-sync')
+        return _executor
+
+
+def request_sync(user=None, full=False):
+    """Queue a sync of ``user``'s Drive (the service account if None)"""
+    log = GoogleDriveSyncLog.objects.create(
+        sync_type='sync', status='pending', initiated_by=user,
+        operation_data={'account': account_key(user), 'full': full},
+    )
+    if getattr(settings, 'TASK_JOBS_BACKEND', 'thread') != 'database':
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, log.pk))
+    return log
+
+
+def _run_in_thread(log_id):
+    try:
+        if claim_sync(log_id):
+            run_sync(GoogleDriveSyncLog.objects.get(pk=log_id))
+    except Exception:
+        logger.exception("Drive sync %s failed", log_id)
+    finally:
+        connections.close_all()
+
+
+def claim_sync(log_id):
+    """Atomically move a pending sync to in_progress; False if someone else has it"""
+    return GoogleDriveSyncLog.objects.filter(
+        pk=log_id, sync_type='sync', status='pending'
+    ).update(status='in_progress') == 1
+
+
+def claim_next_sync():
+    """Claim the oldest pending sync, skipping rows locked by other workers"""
+    with transaction.atomic():
+        log = GoogleDriveSyncLog.objects.select_for_update(skip_locked=True).filter(
+            sync_type='sync', status='pending'
+        ).order_by('started_at').first()
+        if log is None:
+            return None
+        GoogleDriveSyncLog.objects.filter(pk=log.pk).update(status='in_progress')
+    log.status = 'in_progress'
+    return log
+
+
+def drive_client_for(user=None):
+    """Drive v3 client for ``user``'s OAuth account, or the service account"""
+    if user is None:
+        drive = client_pool.client('drive', 'v3')
+        if drive is None:
+            raise RuntimeError("Google service account is disabled or could not be authenticated")
+        return drive
+
+    from googleapiclient.discovery import build_from_document
+    user_auth = UserGoogleAuth.objects.filter(user=user).first()
+    if not user_auth:
+        raise RuntimeError(f"{user} has not connected a Google account")
+    return build_from_document(
+        client_pool.discovery_document('drive', 'v3'), credentials=user_auth.get_credentials()
+    )
+
+
+def run_sync(log):
+    """Run the claimed sync ``log``; returns its final operation_data"""
+    user = log.initiated_by
+    try:
+        stats = sync_account(
+            drive_client_for(user), account_key(user), user=user,
+            full=log.operation_data.get('full', False), log=log,
+        )
+    except Exception as e:
+        log.mark_failed(str(e))
+        raise
+    log.operation_data.update(stats)
+    log.mark_completed()
+    return log.operation_data
+
+
+def sync_account(drive, account, user=None, full=False, log=None):
+    """
+    Bring ``GoogleDriveFile`` up to date with ``drive``. Files first seen by
+    this sync are attributed to ``user``.
+    """
+    token = GoogleDriveChangeToken.objects.filter(account=account).first()
+    if token is not None and not full:
+        try:
+            return _sync_changes(drive, token, user, log)
+        except TokenExpired:
+            logger.warning("Drive page token for %s expired; running a full sync", account)
+    return _full_sync(drive, account, user, log)
+
+
+def _full_sync(drive, account, user, log):
+    # Take the token first so changes made while listing are picked up next time
+    start_token = drive.changes().getStartPageToken().execute(num_retries=3)['startPageToken']
+    stats = _new_stats('full')
+    seen = set()
+    page_token = None
+    while True:
+        response = drive.files().list(
+            q=f"trashed=false and mimeType!='{FOLDER_MIME_TYPE}'",
+            spaces='drive',
+            pageSize=PAGE_SIZE,
+            pageToken=page_token,
+            fields=f'nextPageToken, files({FILE_FIELDS})',
+        ).execute(num_retries=3)
+        files = response.get('files', [])
+        seen.update(data['id'] for data in files)
+        with transaction.atomic():
+            stats['upserted'] += _upsert(files, user)
+        _report(log, stats)
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+
+    # Files deleted while there was no valid token never show up in a change
+    # feed; anything the complete listing did not return is gone. Only rows
+    # attributed to this account are swept: other accounts' files are never
+    # in its listing
+    tracked = GoogleDriveFile.objects.exclude(sync_status='removed')
+    if user is not None:
+        tracked = tracked.filter(uploaded_by=user)
+    else:
+        tracked = tracked.filter(uploaded_by__isnull=True)
+    gone = [drive_id for drive_id in tracked.values_list('drive_id', flat=True).iterator() if drive_id not in seen]
+    for start in range(0, len(gone), PAGE_SIZE):
+        stats['removed'] += _mark_removed(gone[start:start + PAGE_SIZE])
+
+    now = timezone.now()
+    GoogleDriveChangeToken.objects.update_or_create(
+        account=account,
+        defaults={'page_token': start_token, 'full_sync_completed_at': now, 'last_synced': now},
+    )
+    return stats
+
+
+def _sync_changes(drive, token, user, log):
+    from googleapiclient.errors import HttpError
+
+    stats = _new_stats('incremental')
+    page_token = token.page_token
+    while page_token:
+        try:
+            response = drive.changes().list(
+                pageToken=page_token,
+                spaces='drive',
+                pageSize=PAGE_SIZE,
+                includeRemoved=True,
+                fields=f'nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}))',
+            ).execute(num_retries=3)
+        except HttpError as e:
+            if e.resp.status in (400, 404, 410) and page_token == token.page_token:
+                raise TokenExpired(token.account) from e
+            raise
+
+        next_token = response.get('nextPageToken') or response.get('newStartPageToken')
+        changed, removed = _split_changes(response.get('changes', []))
+        with transaction.atomic():
+            # Lock the token so two syncs of one account cannot apply the same page
+            locked = GoogleDriveChangeToken.objects.select_for_update().get(pk=token.pk)
+            if locked.page_token != page_token:
+                logger.info("Drive sync of %s was advanced by another worker", token.account)
+                break
+            stats['upserted'] += _upsert(changed, user)
+            stats['removed'] += _mark_removed(removed)
+            locked.page_token = next_token
+            locked.last_synced = timezone.now()
+            locked.save(update_fields=['page_token', 'last_synced', 'updated_at'])
+        _report(log, stats)
+        page_token = response.get('nextPageToken')
+    return stats
+
+
+def _split_changes(changes):
+    """Latest state per file: (file resources to upsert, IDs to mark removed)"""
+    latest = {}
+    for change in changes:
+        latest[change['fileId']] = change
+    changed, removed = [], []
+    for file_id, change in latest.items():
+        data = change.get('file') or {}
+        if change.get('removed') or data.get('trashed'):
+            removed.append(file_id)
+        elif data:
+            changed.append(data)
+    return changed, removed
+
+
+def _upsert(files, user):
+    now = timezone.now()
+    rows = {}
+    for data in files:
+        if data.get('mimeType') == FOLDER_MIME_TYPE:
+            continue
+        row = GoogleDriveFile(
+            drive_id=data['id'],
+            name=data.get('name', '')[:200],
+            mime_type=data.get('mimeType', '')[:100],
+            size=int(data['size']) if data.get('size') else None,
+            web_view_link=data.get('webViewLink'),
+            web_content_link=data.get('webContentLink'),
+            created_time=parse_datetime(data['createdTime']) if data.get('createdTime') else None,
+            modified_time=parse_datetime(data['modifiedTime']) if data.get('modifiedTime') else None,
+            checksum=data.get('md5Checksum'),
+            last_synced=now,
+            sync_status='completed',
+            # Only used for new rows; existing rows keep their uploader
+            uploaded_by=user,
+        )
+        row.file_type = row.get_file_type()
+        rows[row.drive_id] = row
+    if rows:
+        GoogleDriveFile.objects.bulk_create(
+            list(rows.values()),
+            update_conflicts=True,
+            unique_fields=['drive_id'],
+            update_fields=UPSERT_FIELDS,
+        )
+    return len(rows)
+
+
+def _mark_removed(drive_ids):
+    if not drive_ids:
+        return 0
+    return GoogleDriveFile.objects.filter(drive_id__in=drive_ids).exclude(
+        sync_status='removed'
+    ).update(sync_status='removed', last_synced=timezone.now())
+
+
+def _new_stats(mode):
+    return {'mode': mode, 'pages': 0, 'upserted': 0, 'removed': 0}
+
+
+def _report(log, stats):
+    stats['pages'] += 1
+    if log is not None:
+        log.operation_data.update(stats)
+        log.save(update_fields=['operation_data'])
@@ -0,0 +1,150 @@
+"""
+Two-tier cache of Drive folder paths (``tasks/12``) to folder IDs.
+
+``GoogleDriveService.get_or_create_folder`` used to issue a ``files().list``
+call for every path segment on every upload. Resolved IDs are now kept in
+
+1. an in-process LRU (``folder_ids``), so repeat uploads to a folder cost no
+   Drive round trip at all, and
+2. ``GoogleDriveFolder`` rows keyed by ``local_path``, shared by every worker
+   and surviving restarts.
+
+A missing folder is created while holding a placeholder row for its path;
+the unique index on ``local_path`` makes a second worker wait for the first
+one's transaction and then read its ID, so two workers never create the same
+folder twice. Callers that get a 404 for a cached ID call ``invalidate``,
+which unmaps the path but keeps the rows.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import GoogleDriveFolder
+
+FOLDER_CACHE_SIZE = 1024
+
+
+class FolderIdCache:
+    """Thread-safe LRU mapping folder paths to Drive IDs"""
+
+    def __init__(self, maxsize=FOLDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            folder_id = self._entries.get(path)
+            if folder_id is not None:
+                self._entries.move_to_end(path)
+            return folder_id
+
+    def put(self, path, folder_id):
+        with self._lock:
+            self._entries[path] = folder_id
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, path):
+        """Forget ``path`` and every folder below it"""
+        prefix = path + '/'
+        with self._lock:
+            for key in [key for key in self._entries if key == path or key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+folder_ids = FolderIdCache()
+
+
+class FolderCreationFailed(Exception):
+    pass
+
+
+def normalize_path(folder_path):
+    return '/'.join(segment for segment in folder_path.strip('/').split('/') if segment)
+
+
+def resolve(path, find, create):
+    """
+    Drive ID of the folder at normalized ``path``, or None if it cannot be
+    created. ``find(name, parent_id)`` and ``create(name, parent_id)`` return
+    an ID (or None) from Drive and are only called on a cache miss.
+    """
+    folder_id = folder_ids.get(path)
+    if folder_id:
+        return folder_id
+
+    parent_id = None
+    segments = path.split('/')
+    for depth in range(1, len(segments) + 1):
+        prefix = '/'.join(segments[:depth])
+        folder_id = folder_ids.get(prefix) or _stored_id(prefix)
+        if folder_id is None:
+            folder_id = _create(prefix, segments[depth - 1], parent_id, find, create)
+            if folder_id is None:
+                return None
+        folder_ids.put(prefix, folder_id)
+        parent_id = folder_id
+    return parent_id
+
+
+def _stored_id(path):
+    return GoogleDriveFolder.objects.filter(local_path=path).values_list('drive_id', flat=True).first()
+
+
+def _create(path, name, parent_id, find, create):
+    parent_path = path.rpartition('/')[0]
+    try:
+        with transaction.atomic():
+            # Placeholder row: concurrent workers block on its unique local_path
+            record = GoogleDriveFolder.objects.create(
+                name=name,
+                local_path=path,
+                drive_id=f'pending:{uuid.uuid4().hex}',
+                parent_folder=GoogleDriveFolder.objects.filter(local_path=parent_path).first() if parent_path else None,
+                sync_status='creating',
+            )
+            folder_id = find(name, parent_id) or create(name, parent_id)
+            if not folder_id:
+                raise FolderCreationFailed(path)
+
+            tracked = GoogleDriveFolder.objects.filter(drive_id=folder_id).first()
+            if tracked is not None:
+                # Already known (e.g. created from the dashboard): map the path onto it
+                record.delete()
+                if not tracked.local_path:
+                    tracked.local_path = path
+                    tracked.save(update_fields=['local_path', 'updated_at'])
+            else:
+                record.drive_id = folder_id
+                record.sync_status = 'completed'
+                record.last_synced = timezone.now()
+                record.save(update_fields=['drive_id', 'sync_status', 'last_synced', 'updated_at'])
+    except FolderCreationFailed:
+        return None
+    except IntegrityError:
+        # Another worker created this path first; its row is committed now
+        return _stored_id(path)
+    return folder_id
+
+
+def invalidate(folder_path):
+    """Forget ``folder_path`` and its subfolders, e.g. after Drive returned 404"""
+    path = normalize_path(folder_path)
+    if not path:
+        return
+    folder_ids.discard(path)
+    # Unmap rather than delete: files, sync logs and child folders reference
+    # these rows with on_delete=CASCADE. The next resolve maps the path anew.
+    GoogleDriveFolder.objects.filter(Q(local_path=path) | Q(local_path__startswith=path + '/')).update(
+        local_path=None, updated_at=timezone.now()
+    )
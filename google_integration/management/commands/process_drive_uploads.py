@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from google_integration.drive_queue import drain, drive_enabled
+
+
+class Command(BaseCommand):
+    help = 'Upload queued task and resource files to Google Drive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the files that are due and exit instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=10.0,
+            help='Seconds to wait between polls when nothing is due',
+        )
+
+    def handle(self, *args, **options):
+        if not drive_enabled():
+            self.stdout.write(self.style.WARNING("GOOGLE_DRIVE_ENABLED is off; nothing to do"))
+            return
+
+        while True:
+            totals = drain()
+            if any(totals.values()):
+                self.stdout.write(self.style.SUCCESS(
+                    f"Drive uploads: {totals['uploaded']} uploaded, "
+                    f"{totals['retrying']} retrying, {totals['failed']} failed"
+                ))
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
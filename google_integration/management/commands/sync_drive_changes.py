@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from google_integration.drive_sync import claim_next_sync, request_sync, run_sync
+
+
+class Command(BaseCommand):
+    help = 'Run pending Google Drive syncs (TASK_JOBS_BACKEND = "database")'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--service-account',
+            action='store_true',
+            help='Queue a sync of the service account before processing the queue',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='With --service-account: list every file instead of reading the changes feed',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the pending syncs and exit instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=30.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        if options['service_account']:
+            request_sync(full=options['full'])
+
+        while True:
+            log = claim_next_sync()
+            if log is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Running Drive sync {log.pk} ({log.operation_data.get('account')})...")
+            try:
+                stats = run_sync(log)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Sync {log.pk} failed: {e}"))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"Sync {log.pk} ({stats['mode']}): {stats['upserted']} files updated, "
+                f"{stats['removed']} removed in {stats['pages']} page(s)"
+            ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from google_integration.sheets_sync import SHEETS, sync_all
+from google_integration.simple_service import google_database
+
+
+class Command(BaseCommand):
+    help = 'Write Django rows changed since the last sync to the Google Sheets database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore the stored watermarks and rewrite every row',
+        )
+        parser.add_argument(
+            '--sheet',
+            action='append',
+            choices=[spec.sheet_name for spec in SHEETS],
+            help='Only sync this sheet (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        if not google_database.ensure_authenticated():
+            raise CommandError("Google service account could not be authenticated")
+        if not google_database.spreadsheet_id:
+            raise CommandError("GOOGLE_DATABASE_SPREADSHEET_ID is not configured")
+
+        results = sync_all(
+            google_database.sheets_service, google_database.spreadsheet_id,
+            full=options['full'], sheet_names=options['sheet'],
+        )
+        for sheet_name, count in results.items():
+            self.stdout.write(self.style.SUCCESS(f"{sheet_name}: {count} row(s) written"))
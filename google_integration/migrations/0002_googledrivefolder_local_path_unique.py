@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:10
+
+from django.db import migrations, models
+
+
+def clear_duplicate_paths(apps, schema_editor):
+    # Blank and repeated paths would break the unique index; unmap them
+    # (keeping the newest row per path) instead of deleting folders
+    GoogleDriveFolder = apps.get_model('google_integration', 'GoogleDriveFolder')
+    GoogleDriveFolder.objects.filter(local_path='').update(local_path=None)
+    seen = set()
+    duplicates = []
+    for pk, path in GoogleDriveFolder.objects.exclude(local_path__isnull=True).order_by(
+        'local_path', '-updated_at', '-pk'
+    ).values_list('pk', 'local_path'):
+        if path in seen:
+            duplicates.append(pk)
+        seen.add(path)
+    GoogleDriveFolder.objects.filter(pk__in=duplicates).update(local_path=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('google_integration', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_paths, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='googledrivefolder',
+            name='local_path',
+            field=models.CharField(blank=True, max_length=500, null=True, unique=True),
+        ),
+    ]
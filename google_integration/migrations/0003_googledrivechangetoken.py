@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('google_integration', '0002_googledrivefolder_local_path_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoogleDriveChangeToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(max_length=100, unique=True)),
+                ('page_token', models.CharField(max_length=200)),
+                ('full_sync_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_synced', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Google Drive Change Token',
+                'verbose_name_plural': 'Google Drive Change Tokens',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('google_integration', '0003_googledrivechangetoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googlesheetstable',
+            name='watermark',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='googlesheetstable',
+            name='watermark_pk',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
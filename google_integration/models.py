@@ -52,7 +52,8 @@ class GoogleDriveFolder(models.Model):
     name = models.CharField(max_length=200)
     drive_id = models.CharField(max_length=200, unique=True)
     parent_folder = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True)
-    local_path = models.CharField(max_length=500, null=True, blank=True)
+    # Drive folder path (e.g. "tasks/12") for folders resolved by GoogleDriveService
+    local_path = models.CharField(max_length=500, null=True, blank=True, unique=True)
     
     # Metadata
     size = models.BigIntegerField(null=True, blank=True)
@@ -142,6 +143,25 @@ class GoogleDriveFile(models.Model):
         return 'other'
 
 
+class GoogleDriveChangeToken(models.Model):
+    """Position of an account in the Drive changes feed (see ``drive_sync``)"""
+    
+    # 'service' for the service account, 'user:<id>' for a user's OAuth account
+    account = models.CharField(max_length=100, unique=True)
+    page_token = models.CharField(max_length=200)
+    
+    full_sync_completed_at = models.DateTimeField(null=True, blank=True)
+    last_synced = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Google Drive Change Token"
+        verbose_name_plural = "Google Drive Change Tokens"
+    
+    def __str__(self):
+        return self.account
+
+
 class GoogleSheetsTable(models.Model):
     """Google Sheets as database table mapping"""
     
@@ -161,6 +181,10 @@ class GoogleSheetsTable(models.Model):
     sync_interval_minutes = models.PositiveIntegerField(default=30)
     last_synced = models.DateTimeField(null=True, blank=True)
     
+    # Last synced row, in (watermark field, pk) order (see ``sheets_sync``)
+    watermark = models.DateTimeField(null=True, blank=True)
+    watermark_pk = models.BigIntegerField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -1,68 +1,55 @@
 """
 Google Drive and Sheets API Service Configuration - Single Account Database
 """
-import os
-import json
-from google.oauth2.service_account import Credentials as ServiceAccountCredentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from django.conf import settings
-import gspread
 import logging
 
+from .clients import client_pool
+
+from .sheets_cache import DEFAULT_TTL as DEFAULT_CACHE_TTL, SheetsQueryCache
+from .sheets_writer import SheetsAppendWriter
+
 logger = logging.getLogger(__name__)
 
+# Resumable uploads send files to Drive in chunks of this size (a multiple of 256 KB)
+DRIVE_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
 class GoogleDatabaseService:
     """Single Google Account Database Service Manager"""
     
-    def __init__(self):
-        self.credentials = None
-        self.drive_service = None
-        self.sheets_service = None
-        self.gc = None  # gspread client
-        self.authenticated = False
-        
+    def __init__(self, pool=None):
+        # Clients are created lazily and shared, see ``clients``
+        self.pool = pool or client_pool
+    
+    @property
+    def credentials(self):
+        return self.pool.credentials()
+    
+    @property
+    def authenticated(self):
+        return self.pool.credentials() is not None
+    
+    @property
+    def drive_service(self):
+        return self.pool.client('drive', 'v3')
+    
+    @property
+    def sheets_service(self):
+        return self.pool.client('sheets', 'v4')
+    
+    @property
+    def gc(self):
+        """gspread client"""
+        return self.pool.gspread_client()
+    
     def authenticate(self):
         """Authenticate using service account credentials (single account for all users)"""
-        try:
-            # Try to get credentials from settings
-            credentials_path = getattr(settings, 'GOOGLE_SERVICE_ACCOUNT_FILE', None)
-            credentials_json = getattr(settings, 'GOOGLE_SERVICE_ACCOUNT_JSON', None)
-            
-            scopes = [
-                'https://www.googleapis.com/auth/drive',
-                'https://www.googleapis.com/auth/drive.file', 
-                'https://www.googleapis.com/auth/spreadsheets'
-            ]
-            
-            if credentials_path and os.path.exists(credentials_path):
-                # Use service account file
-                self.credentials = ServiceAccountCredentials.from_service_account_file(
-                    credentials_path, scopes=scopes
-                )
-            elif credentials_json:
-                # Use service account JSON (for environment variables)
-                credentials_info = json.loads(credentials_json)
-                self.credentials = ServiceAccountCredentials.from_service_account_info(
-                    credentials_info, scopes=scopes
-                )
-            else:
-                logger.error("No Google service account credentials found")
-                return False
-                
-            # Initialize services
-            self.drive_service = build('drive', 'v3', credentials=self.credentials)
-            self.sheets_service = build('sheets', 'v4', credentials=self.credentials)
-            self.gc = gspread.authorize(self.credentials)
-            
-            self.authenticated = True
+        if self.authenticated:
             logger.info("Google Database Service authenticated successfully")
             return True
-            
-        except Exception as e:
-            logger.error(f"Google Database authentication failed: {e}")
-            self.authenticated = False
-            return False
+        return False
     
     def list_files(self, query="", max_results=100):
         """List files in Google Drive"""
@@ -208,6 +195,26 @@ class GoogleSheetsDatabase:
     def __init__(self, spreadsheet_id=None):
         self.spreadsheet_id = spreadsheet_id
         self.service = google_service
+        self.writer = SheetsAppendWriter(lambda: self.service.sheets_service, on_written=self._sheets_written)
+        self.cache = SheetsQueryCache(
+            self._fetch_sheet,
+            get_version=self._spreadsheet_version,
+            ttl=getattr(settings, 'GOOGLE_SHEETS_CACHE_TTL', DEFAULT_CACHE_TTL),
+        )
+    
+    def _fetch_sheet(self, spreadsheet_id, sheet_name):
+        return self.service.get_spreadsheet_data(spreadsheet_id, f"{sheet_name}!A:Z")
+    
+    def _spreadsheet_version(self, spreadsheet_id):
+        if not self.service.drive_service:
+            return None
+        return self.service.drive_service.files().get(
+            fileId=spreadsheet_id, fields='version'
+        ).execute().get('version')
+    
+    def _sheets_written(self, spreadsheet_id, sheet_names):
+        for sheet_name in sheet_names:
+            self.cache.invalidate(spreadsheet_id, sheet_name)
         
     def setup_database_sheets(self):
         """Setup database structure in Google Sheets"""
@@ -275,26 +282,24 @@ class GoogleSheetsDatabase:
                 [header_row]
             )
     
-    def insert_data(self, sheet_name, data):
-        """Insert data into a specific sheet"""
+    def insert_data(self, sheet_name, data, wait=False):
+        """
+        Append rows to the end of a sheet (see ``sheets_writer``). By default
+        the rows are queued and True means queued, not written; with
+        ``wait=True`` they are written now and True means Sheets accepted them.
+        """
         if isinstance(data, dict):
             data = [list(data.values())]
         elif not isinstance(data, list):
             data = [data]
-            
-        # Find next empty row
-        existing_data = self.service.get_spreadsheet_data(
-            self.spreadsheet_id,
-            f"{sheet_name}!A:A"
-        )
-        next_row = len(existing_data) + 1
         
-        range_name = f"{sheet_name}!A{next_row}"
-        return self.service.update_spreadsheet_data(
-            self.spreadsheet_id,
-            range_name,
-            data
-        )
+        if wait:
+            return self.writer.append_now(self.spreadsheet_id, sheet_name, data)
+        return self.writer.append(self.spreadsheet_id, sheet_name, data)
+    
+    def flush(self):
+        """Write queued rows now"""
+        return self.writer.flush()
     
     def get_data(self, sheet_name, range_name=None):
         """Get data from a specific sheet"""
@@ -311,33 +316,25 @@ class GoogleSheetsDatabase:
     def update_data(self, sheet_name, range_name, data):
         """Update data in a specific sheet"""
         full_range = f"{sheet_name}!{range_name}"
-        return self.service.update_spreadsheet_data(
+        result = self.service.update_spreadsheet_data(
             self.spreadsheet_id,
             full_range,
             data
         )
+        self.cache.invalidate(self.spreadsheet_id, sheet_name)
+        return result
     
     def search_data(self, sheet_name, column, value):
-        """Search for data in a specific column"""
-        data = self.get_data(sheet_name)
-        if not data:
+        """Rows whose ``column`` equals ``value`` (served from ``sheets_cache``)"""
+        if not self.spreadsheet_id:
             return []
-            
-        headers = data[0] if data else []
-        if column not in headers:
+        return self.cache.find(self.spreadsheet_id, sheet_name, column, value)
+    
+    def search_range(self, sheet_name, column, low=None, high=None):
+        """Rows whose ``column`` lies within [``low``, ``high``]; numbers compare numerically"""
+        if not self.spreadsheet_id:
             return []
-            
-        column_index = headers.index(column)
-        results = []
-        
-        for row_index, row in enumerate(data[1:], start=2):
-            if len(row) > column_index and row[column_index] == value:
-                results.append({
-                    'row_number': row_index,
-                    'data': dict(zip(headers, row))
-                })
-                
-        return results
+        return self.cache.find_range(self.spreadsheet_id, sheet_name, column, low, high)
 
 
 # Global database instance
@@ -348,9 +345,8 @@ class GoogleDriveService:
     """Google Drive Service for file operations"""
     
     def __init__(self):
+        # Nothing is authenticated until the first Drive call
         self.service = google_service
-        if not self.service.authenticated:
-            self.service.authenticate()
     
     def upload_file(self, file_obj, folder_path="", description=""):
         """Upload a file object to Google Drive"""
@@ -361,38 +357,48 @@ class GoogleDriveService:
             from googleapiclient.http import MediaIoBaseUpload
             import io
             
-            # Create folder if it doesn't exist
-            parent_id = None
-            if folder_path:
-                parent_id = self.get_or_create_folder(folder_path)
-            
-            file_metadata = {
-                'name': file_obj.name,
-                'description': description
-            }
-            
-            if parent_id:
-                file_metadata['parents'] = [parent_id]
-            
-            # Handle file upload
+            # Stream file objects in chunks instead of reading them into memory
             if hasattr(file_obj, 'read'):
-                file_content = file_obj.read()
-                if hasattr(file_obj, 'seek'):
-                    file_obj.seek(0)  # Reset file pointer
+                stream = file_obj
             else:
-                file_content = file_obj
-            
-            media = MediaIoBaseUpload(
-                io.BytesIO(file_content),
-                mimetype='application/octet-stream',
-                resumable=True
-            )
-            
-            file = self.service.drive_service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id, name, webViewLink, webContentLink'
-            ).execute()
+                stream = io.BytesIO(file_obj)
+            
+            # A second attempt only follows a 404 for a cached folder ID
+            for attempt in range(2):
+                # Create folder if it doesn't exist
+                parent_id = None
+                if folder_path:
+                    parent_id = self.get_or_create_folder(folder_path)
+                
+                file_metadata = {
+                    'name': file_obj.name,
+                    'description': description
+                }
+                
+                if parent_id:
+                    file_metadata['parents'] = [parent_id]
+                
+                if hasattr(stream, 'seek'):
+                    stream.seek(0)
+                media = MediaIoBaseUpload(
+                    stream,
+                    mimetype='application/octet-stream',
+                    chunksize=DRIVE_UPLOAD_CHUNK_SIZE,
+                    resumable=True
+                )
+                
+                try:
+                    file = self.service.drive_service.files().create(
+                        body=file_metadata,
+                        media_body=media,
+                        fields='id, name, webViewLink, webContentLink'
+                    ).execute()
+                    break
+                except HttpError as e:
+                    if attempt or not parent_id or e.resp.status != 404:
+                        raise
+                    # The folder was deleted in Drive; forget it and recreate it
+                    self.invalidate_folder(folder_path)
             
             logger.info(f"Uploaded file: {file.get('name')} with ID: {file.get('id')}")
             return file
@@ -401,36 +407,60 @@ class GoogleDriveService:
             logger.error(f"Failed to upload file: {e}")
             return None
     
-    def get_or_create_folder(self, folder_path):
-        """Get or create a folder path in Google Drive"""
-        if not folder_path:
-            return None
-            
-        folders = folder_path.strip('/').split('/')
-        parent_id = None
+    def upload_local_file(self, file_path, name, parent_id=None, description="", mime_type=None):
+        """
+        Stream a file on disk to Google Drive in resumable chunks.
+
+        Unlike ``upload_file`` errors are raised, so queued uploads can be retried.
+        """
+        from googleapiclient.http import MediaFileUpload
         
-        for folder_name in folders:
-            if not folder_name:
-                continue
-                
-            # Search for existing folder
-            query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'"
-            if parent_id:
-                query += f" and '{parent_id}' in parents"
-            
-            results = self.service.list_files(query)
-            
-            if results:
-                parent_id = results[0]['id']
-            else:
-                # Create folder
-                folder = self.service.create_folder(folder_name, parent_id)
-                if folder:
-                    parent_id = folder['id']
-                else:
-                    return None
+        file_metadata = {'name': name, 'description': description}
+        if parent_id:
+            file_metadata['parents'] = [parent_id]
         
-        return parent_id
+        media = MediaFileUpload(
+            file_path,
+            mimetype=mime_type or 'application/octet-stream',
+            chunksize=DRIVE_UPLOAD_CHUNK_SIZE,
+            resumable=True
+        )
+        file = self.service.drive_service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id, name, webViewLink, webContentLink'
+        ).execute(num_retries=3)
+        
+        logger.info(f"Uploaded file: {file.get('name')} with ID: {file.get('id')}")
+        return file
+    
+    def get_or_create_folder(self, folder_path):
+        """Get or create a folder path in Google Drive (cached, see ``folder_cache``)"""
+        from .folder_cache import normalize_path, resolve
+        
+        path = normalize_path(folder_path or '')
+        if not path:
+            return None
+        return resolve(path, self.find_folder, self.create_folder)
+    
+    def find_folder(self, name, parent_id=None):
+        """ID of an existing folder called ``name`` under ``parent_id``"""
+        escaped = name.replace('\\', '\\\\').replace("'", "\\'")
+        query = f"name='{escaped}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        if parent_id:
+            query += f" and '{parent_id}' in parents"
+        results = self.service.list_files(query, max_results=1)
+        return results[0]['id'] if results else None
+    
+    def create_folder(self, name, parent_id=None):
+        """Create a folder and return its ID"""
+        folder = self.service.create_folder(name, parent_id)
+        return folder['id'] if folder else None
+    
+    def invalidate_folder(self, folder_path):
+        """Drop cached IDs for ``folder_path`` after Drive reported it missing"""
+        from .folder_cache import invalidate
+        invalidate(folder_path)
     
     def delete_file(self, file_id):
         """Delete a file from Google Drive"""
@@ -0,0 +1,155 @@
+"""
+Local, indexed mirror of the Google Sheets database for lookups.
+
+``search_data`` used to download the whole sheet (``A:Z``) for every lookup
+and scan it row by row, so a dashboard showing a row per user made dozens of
+full downloads. ``SheetsQueryCache`` keeps one ``SheetMirror`` per sheet:
+
+* a column's hash index (value -> row positions) is built the first time the
+  column is searched, after which an equality lookup is a dict access;
+* a column's sorted index is built the first time it is range-queried and
+  answers ``low <= value <= high`` with two bisections. Cells that parse as
+  numbers compare as numbers, everything else as text;
+* a mirror is fresh for ``ttl`` seconds. After that the spreadsheet's Drive
+  ``version`` (a cheap metadata call) is compared with the one it was
+  downloaded at, and the sheet is only downloaded again if it changed.
+
+Writes made through ``GoogleSheetsDatabase`` invalidate the sheet's mirror.
+"""
+import bisect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 60
+
+
+def _sort_key(value):
+    try:
+        return (0, float(value), '')
+    except (TypeError, ValueError):
+        return (1, 0.0, str(value))
+
+
+class SheetMirror:
+    """Rows of one sheet with lazily built per-column indexes"""
+
+    def __init__(self, values, version=None):
+        self.headers = values[0] if values else []
+        self.rows = values[1:]
+        self.version = version
+        self.checked_at = time.monotonic()
+        self._hash_indexes = {}
+        self._sorted_indexes = {}
+        self._lock = threading.Lock()
+
+    def _column(self, column):
+        return self.headers.index(column) if column in self.headers else None
+
+    def _cell(self, row, index):
+        return row[index] if len(row) > index else ''
+
+    def _result(self, position):
+        return {
+            'row_number': position + 2,
+            'data': dict(zip(self.headers, self.rows[position])),
+        }
+
+    def _hash_index(self, index):
+        with self._lock:
+            if index not in self._hash_indexes:
+                positions = {}
+                for position, row in enumerate(self.rows):
+                    positions.setdefault(self._cell(row, index), []).append(position)
+                self._hash_indexes[index] = positions
+            return self._hash_indexes[index]
+
+    def _sorted_index(self, index):
+        with self._lock:
+            if index not in self._sorted_indexes:
+                entries = sorted(
+                    (_sort_key(self._cell(row, index)), position)
+                    for position, row in enumerate(self.rows)
+                    if self._cell(row, index) != ''
+                )
+                self._sorted_indexes[index] = ([key for key, _ in entries], [position for _, position in entries])
+            return self._sorted_indexes[index]
+
+    def find(self, column, value):
+        index = self._column(column)
+        if index is None:
+            return []
+        return [self._result(position) for position in self._hash_index(index).get(value, [])]
+
+    def find_range(self, column, low=None, high=None):
+        index = self._column(column)
+        if index is None:
+            return []
+        keys, positions = self._sorted_index(index)
+        start = 0 if low is None else bisect.bisect_left(keys, _sort_key(low))
+        end = len(keys) if high is None else bisect.bisect_right(keys, _sort_key(high))
+        return [self._result(position) for position in sorted(positions[start:end])]
+
+
+class SheetsQueryCache:
+    """Mirrors of sheets keyed by (spreadsheet, sheet), refreshed by TTL and Drive version"""
+
+    def __init__(self, fetch, get_version=None, ttl=DEFAULT_TTL):
+        # fetch(spreadsheet_id, sheet_name) -> list of rows, header first
+        # get_version(spreadsheet_id) -> Drive file version, or None if unknown
+        self.fetch = fetch
+        self.get_version = get_version
+        self.ttl = ttl
+        self._mirrors = {}
+        self._lock = threading.Lock()
+
+    def _version(self, spreadsheet_id):
+        if self.get_version is None:
+            return None
+        try:
+            return self.get_version(spreadsheet_id)
+        except Exception as e:
+            logger.warning(f"Could not read spreadsheet version: {e}")
+            return None
+
+    def mirror(self, spreadsheet_id, sheet_name):
+        key = (spreadsheet_id, sheet_name)
+        with self._lock:
+            mirror = self._mirrors.get(key)
+        if mirror is not None:
+            if time.monotonic() - mirror.checked_at < self.ttl:
+                return mirror
+            version = self._version(spreadsheet_id)
+            if version is not None and version == mirror.version:
+                mirror.checked_at = time.monotonic()
+                return mirror
+        else:
+            version = self._version(spreadsheet_id)
+
+        values = self.fetch(spreadsheet_id, sheet_name)
+        if values is None:
+            # Download failed: serve the stale copy rather than nothing
+            return mirror
+        mirror = SheetMirror(values, version)
+        with self._lock:
+            self._mirrors[key] = mirror
+        return mirror
+
+    def find(self, spreadsheet_id, sheet_name, column, value):
+        mirror = self.mirror(spreadsheet_id, sheet_name)
+        return mirror.find(column, value) if mirror else []
+
+    def find_range(self, spreadsheet_id, sheet_name, column, low=None, high=None):
+        mirror = self.mirror(spreadsheet_id, sheet_name)
+        return mirror.find_range(column, low, high) if mirror else []
+
+    def invalidate(self, spreadsheet_id=None, sheet_name=None):
+        """Drop one sheet's mirror, a spreadsheet's mirrors, or all of them"""
+        with self._lock:
+            for key in list(self._mirrors):
+                if spreadsheet_id is None or (
+                    key[0] == spreadsheet_id and sheet_name in (None, key[1])
+                ):
+                    del self._mirrors[key]
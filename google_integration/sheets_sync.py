@@ -0,0 +1,301 @@
+"""
+Incremental Django -> Google Sheets sync.
+
+``sync_django_to_sheets`` used to build every user row in memory and rewrite
+the whole Users sheet with one ``update``; the other four sheets were never
+filled. Each sheet in ``SHEETS`` now keeps a watermark in its
+``GoogleSheetsTable`` row (the ``updated_at`` and primary key of the last
+row written), and a sync only reads what changed since:
+
+* changed rows are read in keyset order on (watermark field, pk), ``CHUNK_SIZE``
+  at a time, so memory stays bounded. ``updated_at`` is set before the row
+  commits, so a row can commit after a later-stamped one was synced; each
+  sync therefore re-reads the ``SYNC_OVERLAP`` before the watermark
+  (rewriting a row in place is idempotent);
+* rows already in the sheet are found by their ID in column A (read once per
+  sync) and rewritten in place; new rows go after the last one. Each chunk is
+  a single ``values().batchUpdate`` with one range per run of adjacent rows;
+* Analytics rows never change and are only appended. Re-reading would
+  duplicate them, so their watermark is the primary key alone (activity is
+  timestamped when recorded but inserted later, in batches);
+* the watermark advances after every chunk, so an interrupted sync resumes
+  where it stopped.
+
+Deleted objects keep their row, and changes that don't touch the watermark
+field (e.g. a project's member list, ``last_login``) are picked up the next
+time the object itself is saved. ``full=True`` resets the watermarks and
+rewrites every row in place (Analytics excepted, it would only duplicate).
+"""
+import datetime
+import logging
+from collections import namedtuple
+
+from django.apps import apps
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import GoogleSheetsTable
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+# Rows stamped this long before the watermark are read again
+SYNC_OVERLAP = datetime.timedelta(minutes=5)
+
+# Sheets rejects cells longer than this
+MAX_CELL_LENGTH = 50000
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SheetSpec = namedtuple('SheetSpec', 'sheet_name model watermark_field header build_row queryset append_only')
+
+
+def _date(value):
+    if not value:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.strftime(DATE_FORMAT)
+    return value.isoformat()
+
+
+def _text(value):
+    return (value or '')[:MAX_CELL_LENGTH]
+
+
+def _user_label(user):
+    return (user.username or user.email) if user else ''
+
+
+def _user_row(user):
+    return [
+        str(user.id),
+        user.username or '',
+        user.email,
+        user.first_name,
+        user.last_name,
+        'Admin' if user.is_superuser else 'User',
+        _date(user.date_joined),
+        _date(user.last_login),
+        'Yes' if user.is_active else 'No',
+    ]
+
+
+def _task_row(task):
+    return [
+        str(task.id),
+        task.title,
+        _text(task.description),
+        task.get_priority_display(),
+        task.get_status_display(),
+        _user_label(task.assigned_to),
+        _user_label(task.created_by),
+        _date(task.due_date),
+        _date(task.created_at),
+    ]
+
+
+def _project_row(project):
+    return [
+        str(project.id),
+        project.title,
+        _text(project.description),
+        project.get_status_display(),
+        _user_label(project.project_manager),
+        ', '.join(_user_label(member) for member in project.team_members.all()),
+        _date(project.start_date),
+        _date(project.end_date),
+        _date(project.created_at),
+    ]
+
+
+def _resource_row(resource):
+    return [
+        str(resource.id),
+        resource.title,
+        'Public' if resource.is_public else 'Private',
+        _text(resource.description),
+        resource.file_url or '',
+        _user_label(resource.uploaded_by),
+        resource.category.name if resource.category else '',
+        _date(resource.created_at),
+        '',
+    ]
+
+
+def _activity_row(activity):
+    return [
+        str(activity.id),
+        str(activity.user_id),
+        activity.activity_type,
+        activity.related_object_type,
+        str(activity.related_object_id or ''),
+        _date(activity.timestamp),
+        _text(activity.description),
+    ]
+
+
+SHEETS = [
+    SheetSpec(
+        'Users', 'users.User', 'updated_at',
+        ['ID', 'Username', 'Email', 'First Name', 'Last Name', 'Role', 'Date Joined', 'Last Login', 'Is Active'],
+        _user_row, lambda qs: qs, False,
+    ),
+    SheetSpec(
+        'Tasks', 'tasks.Task', 'updated_at',
+        ['ID', 'Title', 'Description', 'Priority', 'Status', 'Assigned To', 'Created By', 'Due Date', 'Created Date'],
+        _task_row, lambda qs: qs.select_related('assigned_to', 'created_by'), False,
+    ),
+    SheetSpec(
+        'Projects', 'projects.Project', 'updated_at',
+        ['ID', 'Name', 'Description', 'Status', 'Team Leader', 'Members', 'Start Date', 'End Date', 'Created Date'],
+        _project_row, lambda qs: qs.select_related('project_manager').prefetch_related('team_members'), False,
+    ),
+    SheetSpec(
+        'Resources', 'resources.Resource', 'updated_at',
+        ['ID', 'Name', 'Type', 'Description', 'File URL', 'Uploaded By', 'Category', 'Created Date', 'File Size'],
+        _resource_row, lambda qs: qs.select_related('uploaded_by', 'category'), False,
+    ),
+    SheetSpec(
+        'Analytics', 'analytics.UserActivity', 'pk',
+        ['ID', 'User ID', 'Action', 'Entity Type', 'Entity ID', 'Timestamp', 'Data'],
+        _activity_row, lambda qs: qs, True,
+    ),
+]
+
+
+def column_letter(index):
+    """Spreadsheet column name of the 1-based column ``index``"""
+    letters = ''
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def changed_chunks(queryset, field, after=None, after_pk=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of objects changed after (``after``, ``after_pk``), oldest
+    first. With ``field='pk'`` only ``after_pk`` is used.
+    """
+    if field == 'pk':
+        queryset = queryset.order_by('pk')
+        while True:
+            batch = queryset.filter(pk__gt=after_pk) if after_pk is not None else queryset
+            objects = list(batch[:chunk_size])
+            if not objects:
+                return
+            yield objects
+            after_pk = objects[-1].pk
+
+    queryset = queryset.order_by(field, 'pk')
+    while True:
+        batch = queryset
+        if after is not None:
+            batch = batch.filter(Q(**{f'{field}__gt': after}) | Q(**{field: after, 'pk__gt': after_pk or 0}))
+        objects = list(batch[:chunk_size])
+        if not objects:
+            return
+        yield objects
+        after, after_pk = getattr(objects[-1], field), objects[-1].pk
+
+
+def _runs(rows):
+    """Group (row_number, values) pairs into runs of adjacent rows"""
+    run_start, run = None, []
+    for number, values in sorted(rows, key=lambda item: item[0]):
+        if run and number != run_start + len(run):
+            yield run_start, run
+            run_start, run = None, []
+        if not run:
+            run_start = number
+        run.append(values)
+    if run:
+        yield run_start, run
+
+
+def sync_sheet(sheets_service, spreadsheet_id, spec, full=False, chunk_size=CHUNK_SIZE):
+    """Write rows of ``spec.model`` changed since the last sync; returns how many"""
+    table, _ = GoogleSheetsTable.objects.get_or_create(
+        spreadsheet_id=spreadsheet_id, sheet_name=spec.sheet_name,
+        defaults={
+            'name': spec.sheet_name,
+            'django_model': spec.model,
+            'column_mapping': {'columns': spec.header, 'watermark': spec.watermark_field},
+        },
+    )
+    if full and not spec.append_only:
+        table.watermark = table.watermark_pk = None
+        table.save(update_fields=['watermark', 'watermark_pk', 'updated_at'])
+
+    values = sheets_service.spreadsheets().values()
+    last_column = column_letter(len(spec.header))
+    row_numbers, next_row = {}, 2
+    if not spec.append_only:
+        # Column A holds the IDs; one read tells where every existing row is
+        ids = values.get(
+            spreadsheetId=spreadsheet_id, range=f"{spec.sheet_name}!A:A"
+        ).execute(num_retries=3).get('values', [])
+        row_numbers = {cells[0]: number for number, cells in enumerate(ids, start=1) if cells}
+        next_row = max(len(ids) + 1, 2)
+
+    model = apps.get_model(spec.model)
+    written = 0
+    header_written = spec.append_only
+    after, after_pk = table.watermark, table.watermark_pk
+    if spec.watermark_field != 'pk' and after is not None:
+        # Start inclusively from the overlap window
+        after, after_pk = after - SYNC_OVERLAP, 0
+    for chunk in changed_chunks(
+        spec.queryset(model.objects.all()), spec.watermark_field, after, after_pk, chunk_size,
+    ):
+        rows = [spec.build_row(obj) for obj in chunk]
+        if spec.append_only:
+            values.append(
+                spreadsheetId=spreadsheet_id, range=f"{spec.sheet_name}!A1",
+                valueInputOption='RAW', insertDataOption='INSERT_ROWS',
+                body={'values': rows},
+            ).execute(num_retries=3)
+        else:
+            placed = []
+            for row in rows:
+                number = row_numbers.get(row[0])
+                if number is None:
+                    number = row_numbers[row[0]] = next_row
+                    next_row += 1
+                placed.append((number, row))
+            data = [] if header_written else [
+                {'range': f"{spec.sheet_name}!A1:{last_column}1", 'values': [spec.header]}
+            ]
+            header_written = True
+            data += [
+                {'range': f"{spec.sheet_name}!A{start}:{last_column}{start + len(run) - 1}", 'values': run}
+                for start, run in _runs(placed)
+            ]
+            values.batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={'valueInputOption': 'RAW', 'data': data},
+            ).execute(num_retries=3)
+
+        if spec.watermark_field == 'pk':
+            table.watermark_pk = chunk[-1].pk
+        else:
+            last = getattr(chunk[-1], spec.watermark_field)
+            # Overlap rows are older than the stored watermark; never move it back
+            if table.watermark is None or (last, chunk[-1].pk) > (table.watermark, table.watermark_pk or 0):
+                table.watermark, table.watermark_pk = last, chunk[-1].pk
+        table.last_synced = timezone.now()
+        table.save(update_fields=['watermark', 'watermark_pk', 'last_synced', 'updated_at'])
+        written += len(rows)
+    return written
+
+
+def sync_all(sheets_service, spreadsheet_id, full=False, sheet_names=None):
+    """Sync every sheet in ``SHEETS`` (or only ``sheet_names``); returns rows written per sheet"""
+    results = {}
+    for spec in SHEETS:
+        if sheet_names and spec.sheet_name not in sheet_names:
+            continue
+        results[spec.sheet_name] = sync_sheet(sheets_service, spreadsheet_id, spec, full=full)
+        logger.info(f"Synced {results[spec.sheet_name]} row(s) to {spec.sheet_name}")
+    return results
@@ -0,0 +1,203 @@
+"""
+Buffered, append-only writes to the Google Sheets database.
+
+``insert_data`` / ``insert_row`` used to read the whole ``A`` column to find
+the next free row and then ``update`` that row: two round trips per row, and
+two concurrent writers could pick the same row and overwrite each other.
+Rows are now queued in a ``SheetsAppendWriter`` and written by Sheets itself
+at the end of the table:
+
+* a flush with rows for a single sheet is one ``values().append`` call;
+  rows for several sheets of a spreadsheet go out as one
+  ``spreadsheets().batchUpdate`` with an ``appendCells`` request per sheet;
+* the buffer is flushed when it holds ``batch_size`` rows or ``max_delay``
+  seconds after the first queued row, whichever comes first, and once more
+  when the process exits.
+
+Rows from a failed flush are put back at the front of the buffer and retried
+``max_delay`` seconds later; past ``max_buffer`` rows the oldest are dropped.
+So ``append`` returning True only means the rows were queued. Interactive
+callers that must report the outcome use ``append_now``.
+"""
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+MAX_DELAY = 5.0
+MAX_BUFFER = 10000
+
+
+def _cell(value):
+    if value is None:
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+
+class SheetsAppendWriter:
+    """Queue rows per (spreadsheet, sheet) and append them in batches"""
+
+    def __init__(self, get_service, batch_size=BATCH_SIZE, max_delay=MAX_DELAY, max_buffer=MAX_BUFFER,
+                 on_written=None):
+        # Called at flush time; returns the Sheets v4 resource or None
+        self.get_service = get_service
+        # Called with (spreadsheet_id, sheet names) after rows were written
+        self.on_written = on_written
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_buffer = max_buffer
+        self._pending = OrderedDict()
+        self._size = 0
+        self._timer = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._sheet_ids = {}
+        atexit.register(self.close)
+
+    def append(self, spreadsheet_id, sheet_name, rows):
+        """Queue ``rows`` (lists of cell values) for the end of ``sheet_name``"""
+        if not spreadsheet_id or not rows:
+            return False
+        with self._lock:
+            self._pending.setdefault((spreadsheet_id, sheet_name), []).extend(list(row) for row in rows)
+            self._size += len(rows)
+            self._trim()
+            flush_now = self._size >= self.batch_size
+            if not flush_now:
+                self._schedule()
+        if flush_now:
+            self.flush()
+        return True
+
+    def append_now(self, spreadsheet_id, sheet_name, rows):
+        """Write ``rows`` immediately, bypassing the buffer; True once Sheets accepted them"""
+        if not spreadsheet_id or not rows:
+            return False
+        try:
+            service = self.get_service()
+            if service is None:
+                raise RuntimeError("Sheets service is not authenticated")
+            self._write(service, spreadsheet_id, {sheet_name: [list(row) for row in rows]})
+        except Exception as e:
+            logger.error(f"Failed to append rows to {sheet_name}: {e}")
+            return False
+        if self.on_written:
+            self.on_written(spreadsheet_id, [sheet_name])
+        return True
+
+    def _schedule(self):
+        # Caller holds self._lock
+        if self._timer is None:
+            self._timer = threading.Timer(self.max_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _trim(self):
+        while self._size > self.max_buffer:
+            key, rows = next(iter(self._pending.items()))
+            excess = min(len(rows), self._size - self.max_buffer)
+            del rows[:excess]
+            self._size -= excess
+            if not rows:
+                del self._pending[key]
+            logger.warning("Sheets write buffer full; dropped %s row(s) for %s", excess, key[1])
+
+    def flush(self):
+        """Write every queued row now; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, OrderedDict()
+                self._size = 0
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending:
+                return 0
+
+            by_spreadsheet = OrderedDict()
+            for (spreadsheet_id, sheet_name), rows in pending.items():
+                by_spreadsheet.setdefault(spreadsheet_id, OrderedDict())[sheet_name] = rows
+
+            written = 0
+            service = None
+            try:
+                service = self.get_service()
+            except Exception as e:
+                logger.error(f"Sheets service unavailable: {e}")
+            for spreadsheet_id, sheets in by_spreadsheet.items():
+                try:
+                    if service is None:
+                        raise RuntimeError("Sheets service is not authenticated")
+                    self._write(service, spreadsheet_id, sheets)
+                    written += sum(len(rows) for rows in sheets.values())
+                    if self.on_written:
+                        self.on_written(spreadsheet_id, list(sheets))
+                except Exception as e:
+                    logger.error(f"Failed to append rows to spreadsheet {spreadsheet_id}: {e}")
+                    self._requeue(spreadsheet_id, sheets)
+            return written
+
+    def _write(self, service, spreadsheet_id, sheets):
+        if len(sheets) == 1:
+            sheet_name, rows = next(iter(sheets.items()))
+            service.spreadsheets().values().append(
+                spreadsheetId=spreadsheet_id,
+                range=f"{sheet_name}!A1",
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body={'values': rows},
+            ).execute(num_retries=3)
+            return
+
+        sheet_ids = self._resolve_sheet_ids(service, spreadsheet_id)
+        requests = []
+        for sheet_name, rows in sheets.items():
+            if sheet_name not in sheet_ids:
+                raise KeyError(f"Sheet '{sheet_name}' does not exist")
+            requests.append({
+                'appendCells': {
+                    'sheetId': sheet_ids[sheet_name],
+                    'rows': [{'values': [_cell(value) for value in row]} for row in rows],
+                    'fields': 'userEnteredValue',
+                }
+            })
+        service.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id, body={'requests': requests}
+        ).execute(num_retries=3)
+
+    def _resolve_sheet_ids(self, service, spreadsheet_id):
+        if spreadsheet_id not in self._sheet_ids:
+            spreadsheet = service.spreadsheets().get(
+                spreadsheetId=spreadsheet_id, fields='sheets.properties(sheetId,title)'
+            ).execute(num_retries=3)
+            self._sheet_ids[spreadsheet_id] = {
+                sheet['properties']['title']: sheet['properties']['sheetId']
+                for sheet in spreadsheet.get('sheets', [])
+            }
+        return self._sheet_ids[spreadsheet_id]
+
+    def _requeue(self, spreadsheet_id, sheets):
+        with self._lock:
+            restored = OrderedDict(((spreadsheet_id, name), rows) for name, rows in sheets.items())
+            for key, rows in self._pending.items():
+                restored.setdefault(key, []).extend(rows)
+            self._pending = restored
+            self._size = sum(len(rows) for rows in restored.values())
+            self._trim()
+            # Drop cached sheet IDs in case a sheet was renamed or removed
+            self._sheet_ids.pop(spreadsheet_id, None)
+            self._schedule()
+
+    def close(self):
+        """Flush before shutdown"""
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final Sheets flush failed")
@@ -2,98 +2,54 @@
 Google Database Service - Single Account for All Users
 Simple service that uses one Google account as database backend
 """
-import os
-import json
 from django.conf import settings
 import logging
 
+from .clients import client_pool, google_enabled
+from .sheets_writer import SheetsAppendWriter
+
 logger = logging.getLogger(__name__)
 
-# Check if Google libraries are available
-try:
-    from google.oauth2.service_account import Credentials as ServiceAccountCredentials
-    from googleapiclient.discovery import build
-    from googleapiclient.errors import HttpError
-    GOOGLE_LIBS_AVAILABLE = True
-except ImportError:
-    GOOGLE_LIBS_AVAILABLE = False
-    # Create dummy classes for when Google libraries aren't available
-    class ServiceAccountCredentials:
-        @classmethod
-        def from_service_account_info(cls, info, scopes=None):
-            return cls()
-    
-    def build(service, version, credentials=None):
-        return None
-    
-    class HttpError(Exception):
-        pass
 
 class GoogleDatabaseService:
     """Single Google Account Database Service"""
     
-    def __init__(self):
-        self.credentials = None
-        self.drive_service = None
-        self.sheets_service = None
-        self.authenticated = False
+    def __init__(self, pool=None):
+        # Clients are created lazily and shared, see ``clients``
+        self.pool = pool or client_pool
         self.spreadsheet_id = getattr(settings, 'GOOGLE_DATABASE_SPREADSHEET_ID', None)
-        self.available = GOOGLE_LIBS_AVAILABLE
+        self.writer = SheetsAppendWriter(self._writer_service)
+    
+    @property
+    def available(self):
+        return google_enabled()
+    
+    @property
+    def credentials(self):
+        return self.pool.credentials()
+    
+    @property
+    def authenticated(self):
+        return self.pool.credentials() is not None
+    
+    @property
+    def drive_service(self):
+        return self.pool.client('drive', 'v3')
+    
+    @property
+    def sheets_service(self):
+        return self.pool.client('sheets', 'v4')
         
     def authenticate(self):
         """Authenticate using service account (one account for all users)"""
         if not self.available:
-            logger.warning("Google libraries not available, skipping authentication")
-            return False
-            
-        try:
-            # Get credentials from environment or file
-            credentials_json = os.environ.get('GOOGLE_SERVICE_ACCOUNT_JSON')
-            credentials_file = getattr(settings, 'GOOGLE_SERVICE_ACCOUNT_FILE', None)
-            
-            scopes = [
-                'https://www.googleapis.com/auth/drive',
-                'https://www.googleapis.com/auth/drive.file', 
-                'https://www.googleapis.com/auth/spreadsheets'
-            ]
-            
-            if credentials_json:
-                # From environment variable (JSON string)
-                credentials_info = json.loads(credentials_json)
-                self.credentials = ServiceAccountCredentials.from_service_account_info(
-                    credentials_info, scopes=scopes
-                )
-                logger.info("Authenticated with Google using service account from environment")
-            elif credentials_file and os.path.exists(credentials_file):
-                # From file
-                self.credentials = ServiceAccountCredentials.from_service_account_file(
-                    credentials_file, scopes=scopes
-                )
-                logger.info(f"Authenticated with Google using service account file: {credentials_file}")
-            else:
-                logger.warning("No Google service account credentials found. Please configure GOOGLE_SERVICE_ACCOUNT_JSON or GOOGLE_SERVICE_ACCOUNT_FILE")
-                return False
-                
-            # Initialize services
-            self.drive_service = build('drive', 'v3', credentials=self.credentials)
-            self.sheets_service = build('sheets', 'v4', credentials=self.credentials)
-            
-            self.authenticated = True
-            return True
-            
-        except Exception as e:
-            logger.error(f"Google authentication failed: {e}")
-            self.authenticated = False
+            logger.warning("GOOGLE_DRIVE_ENABLED is off, skipping authentication")
             return False
+        return self.authenticated
     
     def ensure_authenticated(self):
         """Ensure service is authenticated"""
-        if not self.available:
-            logger.warning("Google libraries not available")
-            return False
-        if not self.authenticated:
-            return self.authenticate()
-        return True
+        return self.authenticate()
     
     def create_database_spreadsheet(self):
         """Create the main database spreadsheet"""
@@ -193,56 +149,43 @@ class GoogleDatabaseService:
             logger.error(f"Failed to update data in {sheet_name}: {e}")
             return False
     
-    def insert_row(self, sheet_name, data):
-        """Insert a new row of data"""
+    def _writer_service(self):
+        return self.sheets_service if self.ensure_authenticated() else None
+    
+    def insert_row(self, sheet_name, data, wait=False):
+        """
+        Append a row to the end of a sheet (see ``sheets_writer``). True means
+        queued, or written when ``wait=True``.
+        """
         if not isinstance(data, list):
             data = [data]
-            
-        # Get existing data to find next row
-        existing_data = self.get_sheet_data(sheet_name, 'A:A')
-        next_row = len(existing_data) + 1
         
-        return self.update_sheet_data(sheet_name, f'A{next_row}', [data])
+        if not self.spreadsheet_id:
+            logger.error("No spreadsheet ID configured")
+            return False
+        if wait:
+            return self.writer.append_now(self.spreadsheet_id, sheet_name, [data])
+        return self.writer.append(self.spreadsheet_id, sheet_name, [data])
     
-    def sync_django_to_sheets(self):
-        """Sync all Django data to Google Sheets"""
+    def flush(self):
+        """Write queued rows now"""
+        return self.writer.flush()
+    
+    def sync_django_to_sheets(self, full=False):
+        """Sync Django rows changed since the last sync to all database sheets"""
         if not self.ensure_authenticated():
             return False
         
+        if not self.spreadsheet_id:
+            logger.error("No spreadsheet ID configured")
+            return False
+        
         try:
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            
-            # Sync Users
-            users = User.objects.all()
-            user_data = []
-            
-            for user in users:
-                user_data.append([
-                    str(user.id),
-                    user.username,
-                    user.email,
-                    user.first_name,
-                    user.last_name,
-                    'Admin' if user.is_superuser else 'User',
-                    user.date_joined.strftime('%Y-%m-%d %H:%M:%S') if user.date_joined else '',
-                    user.last_login.strftime('%Y-%m-%d %H:%M:%S') if user.last_login else '',
-                    'Yes' if user.is_active else 'No'
-                ])
+            from .sheets_sync import sync_all
             
-            # Clear existing data and add headers + new data
-            all_user_data = [
-                ['ID', 'Username', 'Email', 'First Name', 'Last Name', 'Role', 'Date Joined', 'Last Login', 'Is Active']
-            ] + user_data
-            
-            success = self.update_sheet_data('Users', 'A1', all_user_data)
-            
-            if success:
-                logger.info(f"Synced {len(user_data)} users to Google Sheets")
-                return True
-            else:
-                logger.error("Failed to sync users to Google Sheets")
-                return False
+            results = sync_all(self.sheets_service, self.spreadsheet_id, full=full)
+            logger.info(f"Synced to Google Sheets: {results}")
+            return True
                 
         except Exception as e:
             logger.error(f"Failed to sync Django data: {e}")
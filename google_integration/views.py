@@ -18,6 +18,7 @@ from .models import (
     GoogleSheetsTable, GoogleDriveSyncLog, UserGoogleAuth
 )
 from .services import google_service, google_db
+from .drive_sync import request_sync
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +32,7 @@ class GoogleDriveIntegrationView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         return GoogleDriveFile.objects.filter(
             uploaded_by=self.request.user
-        ).order_by('-created_at')
+        ).exclude(sync_status='removed').order_by('-created_at')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -138,42 +139,9 @@ def google_drive_sync(request):
             messages.warning(request, "Please authenticate with Google Drive first.")
             return redirect('google_integration:auth_start')
         
-        # Authenticate service
-        credentials = user_auth.get_credentials()
-        google_service.authenticate_oauth(credentials)
-        
-        # Sync files
-        files = google_service.list_files()
-        synced_count = 0
-        
-        for file_data in files:
-            # Skip folders for now
-            if file_data.get('mimeType') == 'application/vnd.google-apps.folder':
-                continue
-            
-            file_obj, created = GoogleDriveFile.objects.update_or_create(
-                drive_id=file_data['id'],
-                defaults={
-                    'name': file_data['name'],
-                    'mime_type': file_data.get('mimeType', ''),
-                    'size': int(file_data.get('size', 0)) if file_data.get('size') else None,
-                    'web_view_link': file_data.get('webViewLink'),
-                    'web_content_link': file_data.get('webContentLink'),
-                    'created_time': file_data.get('createdTime'),
-                    'modified_time': file_data.get('modifiedTime'),
-                    'last_synced': timezone.now(),
-                    'sync_status': 'completed',
-                    'uploaded_by': request.user if created else file_obj.uploaded_by
-                }
-            )
-            
-            # Determine file type
-            file_obj.file_type = file_obj.get_file_type()
-            file_obj.save()
-            
-            synced_count += 1
-        
-        messages.success(request, f"Successfully synced {synced_count} files from Google Drive.")
+        # Runs in the background; progress is shown in the sync log
+        request_sync(request.user, full=request.POST.get('full') == '1')
+        messages.success(request, "Google Drive sync started. Only files changed since the last sync are fetched.")
         
     except Exception as e:
         logger.error(f"Google Drive sync failed: {e}")
@@ -403,7 +371,8 @@ def database_operations(request):
                 sheet_name = request.POST.get('sheet_name')
                 data = json.loads(request.POST.get('data', '{}'))
                 
-                result = google_db.insert_data(sheet_name, data)
+                # Write synchronously so the response reports the actual outcome
+                result = google_db.insert_data(sheet_name, data, wait=True)
                 if result:
                     return JsonResponse({'success': True, 'message': f'Data inserted into {sheet_name}'})
                 else:
@@ -424,6 +393,15 @@ def database_operations(request):
                 results = google_db.search_data(sheet_name, column, value)
                 return JsonResponse({'success': True, 'results': results})
                 
+            elif action == 'search_range':
+                sheet_name = request.POST.get('sheet_name')
+                column = request.POST.get('column')
+                low = request.POST.get('low') or None
+                high = request.POST.get('high') or None
+                
+                results = google_db.search_range(sheet_name, column, low, high)
+                return JsonResponse({'success': True, 'results': results})
+                
         except Exception as e:
             logger.error(f"Database operation failed: {e}")
             return JsonResponse({'error': f'Operation failed: {e}'})
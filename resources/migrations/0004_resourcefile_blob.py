@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_fileblob'),
+        ('resources', '0003_auto_20250818_1410'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcefile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='resource_files', to='tasks.fileblob'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:40
+
+from django.db import migrations, models
+from django.db.models import Q
+import django.utils.timezone
+
+
+def settle_existing_rows(apps, schema_editor):
+    # Rows from before the queue are finished attempts, not pending uploads;
+    # queueing them would upload already-synced files to Drive again
+    ResourceFileDriveSync = apps.get_model('resources', 'ResourceFileDriveSync')
+    uploaded = Q(sync_success=True) | (Q(resource_file__drive_file_id__isnull=False) & ~Q(resource_file__drive_file_id=''))
+    ResourceFileDriveSync.objects.filter(uploaded).update(status='synced')
+    ResourceFileDriveSync.objects.exclude(uploaded).update(status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0004_resourcefile_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcefiledrivesync',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('uploading', 'Uploading'), ('synced', 'Synced'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='resourcefiledrivesync',
+            name='folder_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='resourcefiledrivesync',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='resourcefiledrivesync',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(settle_existing_rows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='resourcefiledrivesync',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='resource_fi_status_95bfc0_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from users.models import User
 
 class ResourceCategory(models.Model):
@@ -62,6 +63,9 @@ class ResourceFile(models.Model):
     
     # Local storage fallback
     local_file_path = models.CharField(max_length=500, blank=True)
+    blob = models.ForeignKey(
+        'tasks.FileBlob', on_delete=models.PROTECT, null=True, blank=True, related_name='resource_files'
+    )
     
     # File metadata
     description = models.TextField(blank=True)
@@ -325,13 +329,29 @@ class ResourceFileDriveSync(models.Model):
     """Track Google Drive sync status for resource files"""
     resource_file = models.OneToOneField(ResourceFile, on_delete=models.CASCADE, related_name='drive_sync')
     
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('uploading', 'Uploading'),
+        ('synced', 'Synced'),
+        ('failed', 'Failed'),
+    ]
+    
     last_synced = models.DateTimeField(auto_now=True)
     sync_success = models.BooleanField(default=True)
     sync_message = models.TextField(blank=True)
     retry_count = models.PositiveIntegerField(default=0)
     
+    # Upload queue (see google_integration.drive_queue)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    folder_path = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    
     class Meta:
         db_table = 'resource_file_drive_sync'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
     
     def __str__(self):
         status = "Success" if self.sync_success else "Failed"
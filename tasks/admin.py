@@ -8,6 +8,7 @@ from .models import (
     TaskComment, TaskTemplate, TaskRecurringSelection
 )
 from analytics.models import UserActivity
+from .visibility import refresh_task_visibility
 
 
 @admin.register(TaskCategory)
@@ -165,6 +166,7 @@ class TaskAdmin(admin.ModelAdmin):
     
     def assign_to_all_students(self, request, queryset):
         queryset.update(assigned_to_all=True, assigned_to=None)
+        refresh_task_visibility(queryset)
         self.message_user(request, f'{queryset.count()} tasks assigned to all students.')
     assign_to_all_students.short_description = 'Assign selected tasks to all students'
 
@@ -0,0 +1,160 @@
+"""
+Content-addressed storage for uploaded files.
+
+Every upload used to be written under its own path, so the same template
+attachment uploaded to fifty tasks was stored fifty times (and
+``submit_task`` wrote each file twice). ``store_upload`` copies the upload
+chunk by chunk into a temporary file while computing its SHA-256 (and
+``store_file`` adopts a file already on disk), then keeps exactly one copy
+per digest at ``blobs/<aa>/<bb>/<digest><ext>``
+under ``MEDIA_ROOT``.
+
+``FileBlob.ref_count`` counts the rows pointing at a blob. ``store_upload``
+and ``acquire`` take a reference, ``release`` (called from the post_delete
+signals) drops one, and ``collect_garbage`` deletes blobs that have stayed
+unreferenced past a grace period. A blob row is locked while its file is
+installed or unlinked, so a concurrent upload of the same content cannot
+lose its file to the collector.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import FileBlob
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = 'blobs'
+
+# Unreferenced blobs are kept this long before collection, so a reference
+# being created right now is never raced by the collector
+GC_GRACE_PERIOD = timedelta(hours=1)
+
+
+def blob_path(digest, extension=''):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def _spool(uploaded_file):
+    """Copy ``uploaded_file`` to a temporary file under MEDIA_ROOT, hashing as it goes"""
+    tmp_dir = os.path.join(settings.MEDIA_ROOT, BLOB_DIR, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as destination:
+            for chunk in uploaded_file.chunks():
+                digest.update(chunk)
+                destination.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return digest.hexdigest(), size, tmp_path
+
+
+def _hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def store_upload(uploaded_file):
+    """
+    Store ``uploaded_file`` (anything with ``chunks()``) and return its
+    ``FileBlob`` with one reference taken for the caller.
+    """
+    digest, size, tmp_path = _spool(uploaded_file)
+    return _install(digest, size, tmp_path, uploaded_file.name)
+
+
+def store_file(path, name, keep=False):
+    """
+    Move the file at ``path`` (on the MEDIA_ROOT filesystem) into the store
+    without copying it, like ``store_upload``. ``path`` is consumed unless
+    ``keep``, in which case the store gets a hard link to it.
+    """
+    digest, size = _hash_file(path)
+    if keep:
+        tmp_dir = os.path.join(settings.MEDIA_ROOT, BLOB_DIR, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+        os.link(path, tmp_path)
+        path = tmp_path
+    return _install(digest, size, path, name)
+
+
+def _install(digest, size, tmp_path, name):
+    extension = os.path.splitext(name or '')[1].lower()[:10]
+    try:
+        with transaction.atomic():
+            blob, created = FileBlob.objects.select_for_update().get_or_create(
+                sha256=digest,
+                defaults={'path': blob_path(digest, extension), 'size': size},
+            )
+            full_path = os.path.join(settings.MEDIA_ROOT, blob.path)
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+            FileBlob.objects.filter(pk=blob.pk).update(
+                ref_count=F('ref_count') + 1, last_referenced_at=timezone.now()
+            )
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    blob.ref_count += 1
+    return blob
+
+
+def acquire(blob):
+    """Take an additional reference on ``blob``"""
+    FileBlob.objects.filter(pk=blob.pk).update(
+        ref_count=F('ref_count') + 1, last_referenced_at=timezone.now()
+    )
+
+
+def release(blob_id):
+    """Drop one reference; the blob is collected once unreferenced"""
+    if blob_id is None:
+        return
+    FileBlob.objects.filter(pk=blob_id, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1, last_referenced_at=timezone.now()
+    )
+
+
+def collect_garbage(grace_period=GC_GRACE_PERIOD, dry_run=False):
+    """Delete blobs unreferenced for longer than ``grace_period``; returns (count, bytes)"""
+    cutoff = timezone.now() - grace_period
+    candidates = FileBlob.objects.filter(ref_count=0, last_referenced_at__lt=cutoff)
+    if dry_run:
+        return candidates.count(), sum(candidates.values_list('size', flat=True))
+
+    removed = freed = 0
+    for blob_id in list(candidates.values_list('pk', flat=True)):
+        with transaction.atomic():
+            blob = FileBlob.objects.select_for_update(skip_locked=True).filter(
+                pk=blob_id, ref_count=0, last_referenced_at__lt=cutoff
+            ).first()
+            if blob is None:
+                continue
+            try:
+                os.unlink(os.path.join(settings.MEDIA_ROOT, blob.path))
+            except FileNotFoundError:
+                logger.warning("Blob %s was already missing from disk", blob.sha256)
+            blob.delete()
+        removed += 1
+        freed += blob.size
+    return removed, freed
@@ -0,0 +1,149 @@
+"""
+Daily task analytics cube.
+
+``task_analytics`` used to aggregate the whole task table four times per
+request and join every user to ``assigned_tasks`` for the top performers.
+Time logs were filtered with ``task__in=<visible tasks>``. For team leads
+and admins, who see every task, the page now reads ``TaskAnalyticsDaily``:
+one row per (date, assignee, category, status, priority) holding
+
+* ``tasks_created``: tasks created that day;
+* ``tasks_completed`` and ``points``: tasks completed that day and their
+  points;
+* ``time_logs`` and ``minutes_logged``: time logs started that day.
+
+A date range is then a range scan on ``date``, and the all-time totals are
+sums over a table far smaller than ``tasks``. ``refresh`` rebuilds the cube
+with three grouped queries. ``manage.py refresh_task_cube`` runs it daily, so
+the figures lag by up to a day. Status and priority are as of the last
+refresh.
+"""
+import logging
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+from .models import Task, TaskAnalyticsDaily, TaskTimeLog
+
+logger = logging.getLogger(__name__)
+
+# Cube dimension -> Task field (aliased, since annotations may not shadow fields)
+DIMENSION_FIELDS = {
+    'assignee': 'assigned_to_id',
+    'task_category': 'category_id',
+    'task_status': 'status',
+    'task_priority': 'priority',
+}
+TASK_DIMENSIONS = {name: F(field) for name, field in DIMENSION_FIELDS.items()}
+
+MEASURES = ('tasks_created', 'tasks_completed', 'points', 'time_logs', 'minutes_logged')
+
+# An empty cube is built at most this often when read
+SEED_INTERVAL = 3600
+
+
+def refresh():
+    """Rebuild the cube from tasks and time logs; returns the number of rows"""
+    cells = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+    dimensions = ('day',) + tuple(DIMENSION_FIELDS)
+
+    def add(rows, **measures):
+        for row in rows:
+            if row['day'] is None:
+                continue
+            cell = cells[tuple(row[dimension] for dimension in dimensions)]
+            for measure, field in measures.items():
+                cell[measure] += row[field] or 0
+
+    add(
+        Task.objects.annotate(day=TruncDate('created_at'), **TASK_DIMENSIONS)
+        .values(*dimensions).annotate(created=Count('pk')).order_by(),
+        tasks_created='created',
+    )
+    add(
+        Task.objects.filter(status='completed', completion_date__isnull=False)
+        .annotate(day=TruncDate('completion_date'), **TASK_DIMENSIONS)
+        .values(*dimensions).annotate(completed=Count('pk'), earned=Sum('points_value')).order_by(),
+        tasks_completed='completed', points='earned',
+    )
+    add(
+        TaskTimeLog.objects.annotate(
+            day=TruncDate('start_time'),
+            **{name: F(f'task__{field}') for name, field in DIMENSION_FIELDS.items()}
+        ).values(*dimensions).annotate(logs=Count('pk'), minutes=Sum('duration_minutes')).order_by(),
+        time_logs='logs', minutes_logged='minutes',
+    )
+
+    rows = [
+        TaskAnalyticsDaily(
+            date=date, user_id=user_id, category_id=category_id, status=status, priority=priority,
+            **measures
+        )
+        for (date, user_id, category_id, status, priority), measures in cells.items()
+    ]
+    with transaction.atomic():
+        TaskAnalyticsDaily.objects.all().delete()
+        TaskAnalyticsDaily.objects.bulk_create(rows, batch_size=1000)
+    logger.info("Task analytics cube rebuilt with %s rows", len(rows))
+    return len(rows)
+
+
+def _cube():
+    cube = TaskAnalyticsDaily.objects.all()
+    if not cube.exists() and Task.objects.exists() and cache.add('tasks:cube:seeded', True, SEED_INTERVAL):
+        refresh()
+    return cube
+
+
+def summary(start_date=None):
+    """
+    Team-wide figures for ``task_analytics``, shaped like the per-user ones.
+    ``start_date`` bounds ``period_tasks``.
+    """
+    cube = _cube()
+    period = Q(date__gte=start_date) if start_date else Q(pk__isnull=False)
+    totals = cube.aggregate(
+        total_tasks=Sum('tasks_created'),
+        period_tasks=Sum('tasks_created', filter=period),
+        completed_tasks=Sum('tasks_created', filter=Q(status='completed')),
+        in_progress_tasks=Sum('tasks_created', filter=Q(status='in_progress')),
+        time_logs=Sum('time_logs'),
+        minutes_logged=Sum('minutes_logged'),
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+
+    priority_stats = dict.fromkeys((value for value, _ in Task.PRIORITY_CHOICES), 0)
+    status_stats = dict.fromkeys((value for value, _ in Task.STATUS_CHOICES), 0)
+    for row in cube.values('priority').annotate(n=Sum('tasks_created')).order_by():
+        priority_stats[row['priority']] = row['n'] or 0
+    for row in cube.values('status').annotate(n=Sum('tasks_created')).order_by():
+        status_stats[row['status']] = row['n'] or 0
+
+    return totals, priority_stats, status_stats
+
+
+def top_performers(limit=5, start_date=None):
+    """Users with the most completed tasks, with ``completed_count`` and ``total_points`` set"""
+    from users.models import User
+
+    cube = _cube().filter(user__isnull=False, tasks_completed__gt=0)
+    if start_date:
+        cube = cube.filter(date__gte=start_date)
+    ranked = list(
+        cube.values('user_id').annotate(completed=Sum('tasks_completed'), earned=Sum('points'))
+        .order_by('-completed', 'user_id')[:limit]
+    )
+    users = User.objects.in_bulk([row['user_id'] for row in ranked])
+    performers = []
+    for row in ranked:
+        user = users.get(row['user_id'])
+        if user is None:
+            continue
+        user.completed_count = row['completed']
+        # Shadows User.total_points, as the annotation it replaces did
+        user.total_points = row['earned']
+        performers.append(user)
+    return performers
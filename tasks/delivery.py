@@ -0,0 +1,193 @@
+"""
+File delivery for task attachments and submissions.
+
+Files used to be sent with ``FileResponse(open(...))`` (or read fully into an
+``HttpResponse``), which keeps a worker busy for the whole download and
+ignores ``Range`` and conditional requests. ``serve_file`` is the one place
+that decides how a file leaves the application, selected by
+``FILE_DELIVERY_BACKEND``:
+
+``python`` (default)
+    Django answers ``If-None-Match``/``If-Modified-Since`` with 304 and
+    single ``bytes=`` ranges with 206. The body is an open file, so a WSGI
+    server with ``wsgi.file_wrapper`` (gunicorn) sends it with
+    ``os.sendfile`` starting at the range offset.
+
+``x-accel-redirect``
+    Permission checks stay in Django; nginx serves the file from an
+    ``internal`` location mapped onto ``MEDIA_ROOT`` at
+    ``FILE_DELIVERY_ACCEL_PREFIX``, including ranges and conditional GETs.
+
+``x-sendfile``
+    The same for Apache (mod_xsendfile) or lighttpd, using the absolute path.
+
+Files outside ``MEDIA_ROOT`` are always served by Django.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def delivery_backend():
+    return getattr(settings, 'FILE_DELIVERY_BACKEND', 'python')
+
+
+def media_path(relative_path):
+    """Absolute path of a file stored under ``MEDIA_ROOT``"""
+    return os.path.join(settings.MEDIA_ROOT, relative_path)
+
+
+def _media_relative(path):
+    """``path`` relative to ``MEDIA_ROOT``, or None if it lies outside it"""
+    if not settings.MEDIA_ROOT:
+        return None
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(path)
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return os.path.relpath(path, root)
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` inclusive for a single ``bytes=`` range, ``None`` when the
+    header is absent, malformed or asks for several ranges (the full file is
+    sent instead), or ``False`` when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _range_applies(request, etag, last_modified):
+    """``If-Range`` validation: only honour ``Range`` for the current version"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+class FileRange:
+    """
+    Read-only view of ``length`` bytes of an open file from its current
+    position. ``fileno`` is kept so ``wsgi.file_wrapper`` can still use
+    ``os.sendfile``, which starts at the descriptor's offset and stops at
+    ``Content-Length``.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _disposition(response, filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+        response['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+    except UnicodeEncodeError:
+        response['Content-Disposition'] = f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+
+def _offload_response(path, content_type, filename, as_attachment):
+    relative = _media_relative(path)
+    if relative is None:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if delivery_backend() == 'x-accel-redirect':
+        prefix = getattr(settings, 'FILE_DELIVERY_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + relative.replace(os.sep, '/'))
+    else:
+        response['X-Sendfile'] = os.path.realpath(path)
+    _disposition(response, filename, as_attachment)
+    return response
+
+
+def serve_file(request, path, filename=None, as_attachment=False, content_type=None):
+    """Response delivering the file at ``path``; raises Http404 if it is missing"""
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("File not found on server.")
+
+    filename = filename or os.path.basename(path)
+    if content_type is None:
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if delivery_backend() in ('x-accel-redirect', 'x-sendfile'):
+        response = _offload_response(path, content_type, filename, as_attachment)
+        if response is not None:
+            return response
+
+    etag = file_etag(stat)
+    last_modified = stat.st_mtime
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if response is not None:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    byte_range = None
+    if _range_applies(request, etag, last_modified):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(FileRange(file, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+
+    _disposition(response, filename, as_attachment)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,365 @@
+"""
+Streaming exports.
+
+Exports used to render every row into an ``HttpResponse`` before sending it,
+so memory grew with the size of the table. The helpers here read rows in
+fixed-size batches straight from ``values_list()`` and hand them to a
+``StreamingHttpResponse``, optionally gzip-compressed on the fly, so memory
+stays flat however many rows are exported.
+
+Rows come from a server-side cursor (``QuerySet.iterator(chunk_size=...)``)
+where the database connection allows it. Behind a transaction-mode pooler
+such as pgbouncer, server-side cursors must be disabled and psycopg2 would
+then buffer the whole result, so those connections use keyset pagination
+on the primary key instead.
+
+Tasks, time logs and submissions can also be exported with their native
+types: XLSX through an openpyxl write-only workbook, and Parquet through
+pyarrow (when installed), written one row group per batch.
+"""
+import csv
+import datetime
+import tempfile
+import zlib
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import connections
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import TaskSubmission, TaskTimeLog
+
+try:
+    from openpyxl import Workbook
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Spill XLSX output to disk beyond this many bytes
+XLSX_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Rows are joined into blocks of this many before being yielded to the server
+ROWS_PER_BLOCK = 500
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value, for ``csv.writer``"""
+
+    def write(self, value):
+        return value
+
+
+def wants_gzip(request):
+    return request.GET.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+
+def iter_values(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield ``values_list(*fields)`` tuples of ``queryset`` in primary-key order"""
+    queryset = queryset.order_by('pk')
+    connection = connections[queryset.db]
+    if not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+        return
+
+    # Keyset pagination: each batch is an indexed range scan on pk
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(batch.values_list('pk', *fields)[:chunk_size])
+        if not rows:
+            return
+        for row in rows:
+            yield row[1:]
+        last_pk = rows[-1][0]
+
+
+def csv_blocks(header, rows):
+    """Encode ``header`` and ``rows`` as CSV, yielding text in blocks"""
+    writer = csv.writer(Echo())
+    block = [writer.writerow(header)]
+    for row in rows:
+        block.append(writer.writerow(row))
+        if len(block) >= ROWS_PER_BLOCK:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+def gzip_stream(blocks):
+    """Compress a stream of text blocks into a gzip byte stream"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for block in blocks:
+        data = compressor.compress(block.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def timestamped_filename(prefix, extension):
+    return f'{prefix}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+
+def streaming_csv_response(header, rows, filename, gzip=False):
+    """``StreamingHttpResponse`` delivering ``rows`` as a CSV download"""
+    blocks = csv_blocks(header, rows)
+    if gzip:
+        response = StreamingHttpResponse(gzip_stream(blocks), content_type='application/gzip')
+        filename = f'{filename}.gz'
+    else:
+        response = StreamingHttpResponse(blocks, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def full_name(full, first, last):
+    """``User.get_full_name`` over values_list columns"""
+    return full or f"{first or ''} {last or ''}".strip()
+
+
+# ---------------------------------------------------------------------------
+# Typed datasets for the columnar formats
+# ---------------------------------------------------------------------------
+
+Column = namedtuple('Column', ['name', 'field', 'kind'])
+
+TASK_COLUMNS = [
+    Column('id', 'id', 'int'),
+    Column('title', 'title', 'str'),
+    Column('description', 'description', 'str'),
+    Column('category', 'category__name', 'str'),
+    Column('task_type', 'task_type', 'str'),
+    Column('status', 'status', 'str'),
+    Column('priority', 'priority', 'str'),
+    Column('difficulty', 'difficulty', 'str'),
+    Column('assigned_to_id', 'assigned_to_id', 'int'),
+    Column('assigned_to_email', 'assigned_to__email', 'str'),
+    Column('assigned_to_all', 'assigned_to_all', 'bool'),
+    Column('created_by_id', 'created_by_id', 'int'),
+    Column('created_by_email', 'created_by__email', 'str'),
+    Column('reviewer_id', 'reviewer_id', 'int'),
+    Column('due_date', 'due_date', 'datetime'),
+    Column('start_date', 'start_date', 'datetime'),
+    Column('completion_date', 'completion_date', 'datetime'),
+    Column('progress_percentage', 'progress_percentage', 'int'),
+    Column('estimated_hours', 'estimated_hours', 'float'),
+    Column('actual_hours', 'actual_hours', 'float'),
+    Column('points_value', 'points_value', 'int'),
+    Column('is_recurring', 'is_recurring', 'bool'),
+    Column('template_task_id', 'template_task_id', 'int'),
+    Column('instance_date', 'instance_date', 'date'),
+    Column('import_batch', 'import_batch', 'str'),
+    Column('created_at', 'created_at', 'datetime'),
+    Column('updated_at', 'updated_at', 'datetime'),
+]
+
+TIME_LOG_COLUMNS = [
+    Column('id', 'id', 'int'),
+    Column('task_id', 'task_id', 'int'),
+    Column('task_title', 'task__title', 'str'),
+    Column('user_id', 'user_id', 'int'),
+    Column('user_email', 'user__email', 'str'),
+    Column('start_time', 'start_time', 'datetime'),
+    Column('end_time', 'end_time', 'datetime'),
+    Column('duration_minutes', 'duration_minutes', 'int'),
+    Column('description', 'description', 'str'),
+    Column('created_at', 'created_at', 'datetime'),
+]
+
+SUBMISSION_COLUMNS = [
+    Column('id', 'id', 'int'),
+    Column('task_id', 'task_id', 'int'),
+    Column('task_title', 'task__title', 'str'),
+    Column('submitted_by_id', 'submitted_by_id', 'int'),
+    Column('submitted_by_email', 'submitted_by__email', 'str'),
+    Column('submission_type', 'submission_type', 'str'),
+    Column('title', 'title', 'str'),
+    Column('external_url', 'external_url', 'str'),
+    Column('file', 'file', 'str'),
+    Column('is_reviewed', 'is_reviewed', 'bool'),
+    Column('reviewer_id', 'reviewer_id', 'int'),
+    Column('grade', 'grade', 'float'),
+    Column('submitted_at', 'submitted_at', 'datetime'),
+    Column('reviewed_at', 'reviewed_at', 'datetime'),
+]
+
+
+def dataset_queryset(dataset, tasks, owner=None):
+    """
+    Columns and rows of ``dataset``, restricted to the (already filtered)
+    ``tasks``. With ``owner``, time logs and submissions are further limited
+    to that user's own.
+    """
+    if dataset == 'tasks':
+        return TASK_COLUMNS, tasks
+    if dataset == 'time_logs':
+        queryset = TaskTimeLog.objects.filter(task__in=tasks.values('pk'))
+        return TIME_LOG_COLUMNS, queryset.filter(user=owner) if owner else queryset
+    if dataset == 'submissions':
+        queryset = TaskSubmission.objects.filter(task__in=tasks.values('pk'))
+        return SUBMISSION_COLUMNS, queryset.filter(submitted_by=owner) if owner else queryset
+    raise ValueError(f"Unknown dataset '{dataset}'")
+
+
+def _plain(value):
+    """Convert Decimal to float so both writers keep numeric types"""
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def iter_typed_rows(columns, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    for row in iter_values(queryset, [column.field for column in columns], chunk_size):
+        yield [_plain(value) for value in row]
+
+
+# ---------------------------------------------------------------------------
+# XLSX (openpyxl write-only mode)
+# ---------------------------------------------------------------------------
+
+def _excel_value(value):
+    # Excel has no time zones; write UTC wall-clock times
+    if hasattr(value, 'tzinfo') and value.tzinfo is not None:
+        return timezone.make_naive(value, datetime.timezone.utc)
+    return value
+
+
+def write_xlsx(sheets):
+    """
+    Write ``[(sheet_name, header, rows), ...]`` with a write-only workbook.
+
+    Rows are flushed to openpyxl's temporary files as they are appended, and
+    the finished workbook is spooled to disk past ``XLSX_SPOOL_SIZE``.
+    Returns the output file positioned at the start.
+    """
+    if not HAS_OPENPYXL:
+        raise ValueError("XLSX export requires openpyxl.")
+    workbook = Workbook(write_only=True)
+    for sheet_name, header, rows in sheets:
+        sheet = workbook.create_sheet(title=sheet_name)
+        sheet.append(list(header))
+        for row in rows:
+            sheet.append([_excel_value(value) for value in row])
+
+    output = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_SIZE)
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def xlsx_response(sheets, filename):
+    return FileResponse(
+        write_xlsx(sheets), as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE
+    )
+
+
+# ---------------------------------------------------------------------------
+# Parquet (pyarrow)
+# ---------------------------------------------------------------------------
+
+class _DrainableSink:
+    """Write-only file object whose written bytes can be drained between row groups"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_schema(columns):
+    types = {
+        'int': pa.int64(),
+        'str': pa.string(),
+        'float': pa.float64(),
+        'bool': pa.bool_(),
+        'datetime': pa.timestamp('us', tz='UTC'),
+        'date': pa.date32(),
+    }
+    return pa.schema([(column.name, types[column.kind]) for column in columns])
+
+
+def parquet_stream(columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a Parquet file as bytes, one row group per ``chunk_size`` rows"""
+    schema = arrow_schema(columns)
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+
+    def write_batch(batch):
+        arrays = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(arrays, schema)],
+            schema=schema,
+        ))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            write_batch(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write_batch(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def parquet_response(columns, rows, filename):
+    if not HAS_PYARROW:
+        raise ValueError("Parquet export requires pyarrow.")
+    response = StreamingHttpResponse(parquet_stream(columns, rows), content_type='application/vnd.apache.parquet')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+EXPORT_FORMATS = ('csv', 'xlsx', 'parquet')
+
+EXPORT_DATASETS = ('tasks', 'time_logs', 'submissions')
+
+
+def typed_export_response(dataset, export_format, tasks, owner=None):
+    """Export ``dataset`` for the filtered ``tasks`` as XLSX, Parquet or raw-typed CSV"""
+    columns, queryset = dataset_queryset(dataset, tasks, owner)
+    rows = iter_typed_rows(columns, queryset)
+    filename = timestamped_filename(f'{dataset}_export', export_format)
+    header = [column.name for column in columns]
+    if export_format == 'xlsx':
+        return xlsx_response([(dataset, header, rows)], filename)
+    if export_format == 'parquet':
+        return parquet_response(columns, rows, filename)
+    return streaming_csv_response(header, rows, filename)
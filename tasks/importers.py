@@ -0,0 +1,527 @@
+"""
+Streaming bulk task import.
+
+``BulkTaskUpload`` files used to be read whole into memory and imported one
+row at a time, each row costing a duplicate ``SELECT``, a category
+``get_or_create`` and an ``INSERT``. ``TaskImporter`` instead streams rows
+from the stored file in chunks; per chunk it resolves categories from an
+in-memory map, checks duplicates with one ``title__in`` query and writes the
+tasks with ``bulk_create``, updating the upload's progress counters as it goes.
+"""
+import csv
+import io
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from users.models import User
+from analytics import activity
+from .models import BulkTaskUpload, Task, TaskCategory
+from .visibility import refresh_task_visibility
+
+try:
+    from openpyxl import load_workbook
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+try:
+    import numpy as np
+    import pandas as pd
+    HAS_PANDAS = True
+except ImportError:
+    HAS_PANDAS = False
+
+IMPORT_CHUNK_SIZE = 500
+
+
+class RowError(ValueError):
+    """A single row could not be imported"""
+
+
+def iter_csv_rows(file):
+    """Yield CSV rows as dicts without decoding the whole file up front"""
+    file.open('rb')
+    file.seek(0)
+    text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        # Leave the underlying file to its owner
+        text.detach()
+
+
+def iter_excel_rows(file):
+    """Yield rows of the first worksheet as dicts, keyed by the header row"""
+    if not HAS_OPENPYXL:
+        raise ValueError("Excel files require openpyxl. Please install openpyxl or use CSV format.")
+    file.open('rb')
+    file.seek(0)
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else '' for name in header]
+        for values in rows:
+            if values is None or all(value is None for value in values):
+                continue
+            yield dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_due_date(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime.combine(value, datetime.min.time())
+    else:
+        try:
+            parsed = parse_datetime(str(value))
+        except ValueError:
+            return None
+        if parsed is None:
+            return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class TaskImporter:
+    """Import the rows of a ``BulkTaskUpload`` in chunks"""
+
+    def __init__(self, upload, chunk_size=IMPORT_CHUNK_SIZE):
+        self.upload = upload
+        self.chunk_size = chunk_size
+        self.categories = {}
+        self.seen_titles = set()
+        self.error_messages = []
+        self.success_messages = []
+
+    def iter_rows(self):
+        if self.upload.file_type == 'csv':
+            return iter_csv_rows(self.upload.file)
+        if self.upload.file_type == 'excel':
+            return iter_excel_rows(self.upload.file)
+        raise ValueError("Unsupported file type")
+
+    def run(self):
+        upload = self.upload
+        try:
+            BulkTaskUpload.objects.filter(pk=upload.pk).update(
+                status='processing', total_rows=0, successful_imports=0, failed_imports=0,
+                claimed_at=timezone.now(),
+            )
+
+            row_num = 0
+            for chunk in chunked(self.iter_rows(), self.chunk_size):
+                numbered = list(enumerate(chunk, start=row_num + 1))
+                row_num += len(chunk)
+                created, failed = self.import_chunk(numbered)
+                BulkTaskUpload.objects.filter(pk=upload.pk).update(
+                    total_rows=F('total_rows') + len(chunk),
+                    successful_imports=F('successful_imports') + created,
+                    failed_imports=F('failed_imports') + failed,
+                    claimed_at=timezone.now(),
+                )
+
+            upload.refresh_from_db(fields=['total_rows', 'successful_imports', 'failed_imports'])
+            upload.error_log = '\n'.join(self.error_messages)
+            upload.success_log = '\n'.join(self.success_messages)
+            upload.status = 'completed' if not self.error_messages else 'partial'
+        except Exception as e:
+            upload.status = 'failed'
+            upload.error_log = '\n'.join(self.error_messages + [str(e)])
+        upload.processed_at = timezone.now()
+        upload.save(update_fields=['status', 'error_log', 'success_log', 'processed_at'])
+        return upload
+
+    def import_chunk(self, numbered_rows):
+        """Import one chunk of ``(row_num, row)``; returns (created, failed)"""
+        parsed = []
+        failed = 0
+        for row_num, row in numbered_rows:
+            try:
+                parsed.append((row_num, self.parse_row(row)))
+            except (RowError, TypeError, ValueError) as e:
+                failed += 1
+                self.error_messages.append(f"Row {row_num}: {str(e)}")
+
+        self.resolve_categories(fields['category_name'] for _, fields in parsed)
+        if self.upload.skip_duplicates:
+            parsed, duplicates = self.drop_duplicates(parsed)
+            failed += duplicates
+
+        tasks = [self.build_task(fields) for _, fields in parsed]
+        if not tasks:
+            return 0, failed
+
+        try:
+            with transaction.atomic():
+                tasks = Task.objects.bulk_create(tasks)
+                refresh_task_visibility(tasks)
+        except Exception:
+            # Find the offending rows: insert one at a time, each in its own savepoint
+            return self.import_rows(parsed, failed)
+
+        self.success_messages.extend(
+            f"Row {row_num}: Created task '{task.title}'"
+            for (row_num, _), task in zip(parsed, tasks)
+        )
+        return len(tasks), failed
+
+    def import_rows(self, parsed, failed):
+        """Insert ``parsed`` rows one by one; returns (created, failed)"""
+        created = 0
+        for row_num, fields in parsed:
+            try:
+                with transaction.atomic():
+                    task, = Task.objects.bulk_create([self.build_task(fields)])
+                    refresh_task_visibility([task])
+            except Exception as e:
+                failed += 1
+                self.error_messages.append(f"Row {row_num}: {str(e)}")
+                continue
+            created += 1
+            self.success_messages.append(f"Row {row_num}: Created task '{task.title}'")
+        return created, failed
+
+    def parse_row(self, row):
+        # Map CSV columns to task fields
+        title = row.get('title') or row.get('Title')
+        if not title:
+            raise RowError("Title is required")
+        return {
+            'title': str(title).strip(),
+            'description': row.get('description') or '',
+            'priority': row.get('priority') or self.upload.default_priority,
+            'estimated_hours': float(row.get('estimated_hours') or 1.0),
+            'due_date': parse_due_date(row.get('due_date')),
+            'category_name': str(row.get('category') or '').strip(),
+        }
+
+    def resolve_categories(self, names):
+        """Load (creating if needed) every category named in the chunk into ``self.categories``"""
+        missing = {name for name in names if name and name not in self.categories}
+        if not missing:
+            return
+        for category in TaskCategory.objects.filter(name__in=missing):
+            self.categories[category.name] = category
+        to_create = missing - set(self.categories)
+        if to_create:
+            TaskCategory.objects.bulk_create([
+                TaskCategory(name=name, description='Auto-created from bulk upload')
+                for name in to_create
+            ], ignore_conflicts=True)
+            for category in TaskCategory.objects.filter(name__in=to_create):
+                self.categories[category.name] = category
+
+    def drop_duplicates(self, parsed):
+        """Drop rows whose title exists already or earlier in this upload"""
+        titles = {fields['title'] for _, fields in parsed}
+        existing = set(Task.objects.filter(title__in=titles).values_list('title', flat=True))
+        kept = []
+        duplicates = 0
+        for row_num, fields in parsed:
+            title = fields['title']
+            if title in existing or title in self.seen_titles:
+                duplicates += 1
+                self.error_messages.append(f"Row {row_num}: Task with title '{title}' already exists")
+                continue
+            self.seen_titles.add(title)
+            kept.append((row_num, fields))
+        return kept, duplicates
+
+    def build_task(self, fields):
+        return Task(
+            title=fields['title'],
+            description=fields['description'],
+            category=self.categories.get(fields['category_name'], self.upload.default_category),
+            priority=fields['priority'],
+            estimated_hours=fields['estimated_hours'],
+            due_date=fields['due_date'],
+            created_by=self.upload.uploaded_by,
+            import_batch=self.upload.batch_id,
+            assigned_to_all=True  # Bulk uploaded tasks are usually for all students
+        )
+
+
+class ScheduleImporter(ABC):
+    """
+    Base for the daily/weekly recurring task Excel uploads.
+
+    The sheet is processed column-wise: dates and numbers are coerced once
+    per column, assignee emails are resolved with a single ``email__in``
+    query, and the resulting tasks are written with ``bulk_create``.
+    Subclasses declare the required columns and defaults and turn the
+    coerced frame into one row per task in ``expand``.
+    """
+    kind = None
+    required_columns = []
+    category_name = ''
+    category_defaults = {}
+    default_hours = 1.0
+    default_points = 10
+    batch_size = 500
+
+    def __init__(self, upload):
+        self.upload = upload
+        self.errors = []
+        self.failed_rows = set()
+        self.created_count = 0
+
+    def run(self):
+        upload = self.upload
+        try:
+            if not HAS_PANDAS:
+                raise ValueError("Excel files require pandas. Please install pandas or use CSV format.")
+            BulkTaskUpload.objects.filter(pk=upload.pk).update(status='processing', claimed_at=timezone.now())
+
+            upload.file.open('rb')
+            upload.file.seek(0)
+            df = pd.read_excel(upload.file)
+
+            missing_columns = [col for col in self.required_columns if col not in df.columns]
+            if missing_columns:
+                raise ValueError(f'Missing required columns: {", ".join(missing_columns)}')
+
+            self.category, _ = TaskCategory.objects.get_or_create(
+                name=self.category_name, defaults=self.category_defaults
+            )
+
+            # Spreadsheet row numbers as shown to the user (header is row 1)
+            df['_row'] = df.index + 2
+            frame = self.coerce(df)
+            tasks = self.expand(frame)
+            # Progress counts tasks written, and a weekly row expands to many
+            total = len(tasks) + len(self.failed_rows)
+            BulkTaskUpload.objects.filter(pk=upload.pk).update(total_rows=total, claimed_at=timezone.now())
+            self.write(tasks)
+
+            upload.total_rows = total
+            upload.successful_imports = self.created_count
+            upload.failed_imports = len(self.failed_rows)
+            upload.status = 'completed' if not self.errors else 'partial'
+            upload.error_log = '\n'.join(message for _, message in sorted(self.errors))
+            upload.success_log = f"Created {self.created_count} {self.kind} tasks. Batch ID: {upload.batch_id}"
+
+            if self.created_count > 0:
+                activity.record(
+                    upload.uploaded_by,
+                    'bulk_upload',
+                    f"Bulk uploaded {self.created_count} {self.kind} tasks",
+                    additional_info=f"Batch ID: {upload.batch_id}"
+                )
+        except Exception as e:
+            upload.status = 'failed'
+            upload.error_log = '\n'.join([message for _, message in sorted(self.errors)] + [str(e)])
+        upload.processed_at = timezone.now()
+        upload.save()
+        return upload
+
+    def reject(self, df, mask, message):
+        """Report the rows selected by ``mask`` as failed and drop them"""
+        for row in df.loc[mask, '_row']:
+            self.errors.append((row, f"Row {row}: {message}"))
+            self.failed_rows.add(row)
+        return df[~mask]
+
+    def numeric(self, df, column, default, cast):
+        """Coerce a numeric column at once; unparsable values fail their row"""
+        if column not in df.columns:
+            return df.assign(**{column: default})
+        values = pd.to_numeric(df[column], errors='coerce')
+        invalid = values.isna() & df[column].notna()
+        for row, raw in zip(df.loc[invalid, '_row'], df.loc[invalid, column]):
+            self.errors.append((row, f"Row {row}: invalid {column} '{raw}'"))
+            self.failed_rows.add(row)
+        df = df.assign(**{column: values.fillna(default).map(cast)})
+        return df[~invalid]
+
+    def dates(self, df, column):
+        """Parse a date column at once; unparsable values fail their row"""
+        values = pd.to_datetime(df[column], errors='coerce')
+        # The fast path infers one format from the first value; parse the
+        # values that did not match it one by one before rejecting them
+        retry = values.isna() & df[column].notna()
+        if retry.any():
+            values = values.where(~retry, pd.to_datetime(df.loc[retry, column], errors='coerce', format='mixed'))
+        invalid = values.isna() & df[column].notna()
+        for row, raw in zip(df.loc[invalid, '_row'], df.loc[invalid, column]):
+            self.errors.append((row, f"Row {row}: invalid {column} '{raw}'"))
+            self.failed_rows.add(row)
+        df = df.assign(**{column: values.dt.normalize()})
+        return df[~invalid]
+
+    def coerce(self, df):
+        """Column-wise coercion shared by daily and weekly sheets"""
+        df = df.assign(
+            title=df['task_title'].astype(str),
+            description=df['task_description'].where(df['task_description'].notna(), '').astype(str),
+        )
+        if 'priority' in df.columns:
+            df['priority'] = df['priority'].where(df['priority'].notna(), 'medium').astype(str).str.lower()
+        else:
+            df['priority'] = 'medium'
+        df = self.numeric(df, 'estimated_hours', self.default_hours, float)
+        df = self.numeric(df, 'points_value', self.default_points, int)
+        df['assigned_to_id'] = self.resolve_assignees(df)
+        return df
+
+    def resolve_assignees(self, df):
+        """Map ``assigned_to_email`` to user ids with one query; unknown emails are warnings"""
+        if 'assigned_to_email' not in df.columns:
+            return None
+        emails = df['assigned_to_email']
+        present = emails.notna()
+        user_ids = dict(User.objects.filter(
+            email__in=emails[present].astype(str).unique().tolist()
+        ).values_list('email', 'pk'))
+        resolved = emails.where(present).map(lambda email: user_ids.get(str(email)) if pd.notna(email) else None)
+        unknown = present & resolved.isna()
+        for row, email in zip(df.loc[unknown, '_row'], emails[unknown]):
+            # The task is still created, unassigned
+            self.errors.append((row, f"Row {row}: User with email {email} not found"))
+        return resolved.astype(object).where(resolved.notna(), None)
+
+    @abstractmethod
+    def expand(self, df):
+        """Return a frame with one row per task to create and a ``task_date`` column"""
+
+    def task_fields(self, record):
+        """Kind-specific Task fields for one expanded row"""
+        return {}
+
+    def write(self, df):
+        """Insert the expanded rows in batches and index their visibility"""
+        for start in range(0, len(df), self.batch_size):
+            batch = df.iloc[start:start + self.batch_size]
+            tasks = []
+            for record in batch.to_dict('records'):
+                task_date = record['task_date'].date()
+                tasks.append(Task(
+                    description=record['description'],
+                    category=self.category,
+                    assigned_to_id=record['assigned_to_id'],
+                    created_by=self.upload.uploaded_by,
+                    due_date=timezone.make_aware(datetime.combine(task_date, datetime.min.time())),
+                    priority=record['priority'],
+                    estimated_hours=record['estimated_hours'],
+                    points_value=record['points_value'],
+                    status='todo',
+                    is_recurring=True,
+                    recurrence_type=self.kind,
+                    instance_date=task_date,
+                    import_batch=self.upload.batch_id,
+                    assigned_to_all=True,  # Make visible to all users by default
+                    allow_member_selection=True,
+                    **self.task_fields(record),
+                ))
+            with transaction.atomic():
+                tasks = Task.objects.bulk_create(tasks)
+                refresh_task_visibility(tasks)
+            self.created_count += len(tasks)
+            BulkTaskUpload.objects.filter(pk=self.upload.pk).update(
+                successful_imports=self.created_count, failed_imports=len(self.failed_rows),
+                claimed_at=timezone.now(),
+            )
+
+
+class DailyTaskImporter(ScheduleImporter):
+    """One task per row, due on the row's date"""
+    kind = 'daily'
+    required_columns = ['date', 'task_title', 'task_description']
+    category_name = 'Daily Bulk Upload'
+    category_defaults = {
+        'description': 'Tasks uploaded via daily bulk upload',
+        'color': '#3B82F6',
+        'icon': 'fas fa-upload'
+    }
+
+    def expand(self, df):
+        df = self.reject(df, df['date'].isna(), "Date is missing")
+        df = self.dates(df, 'date')
+        return df.assign(task_date=df['date'])
+
+    def task_fields(self, record):
+        return {'title': record['title']}
+
+
+class WeeklyTaskImporter(ScheduleImporter):
+    """One task per matching weekday between each row's start and end date"""
+    kind = 'weekly'
+    required_columns = ['start_date', 'end_date', 'task_title', 'task_description', 'weekday']
+    category_name = 'Weekly Bulk Upload'
+    category_defaults = {
+        'description': 'Tasks uploaded via weekly bulk upload',
+        'color': '#10B981',
+        'icon': 'fas fa-calendar-week'
+    }
+    default_hours = 2.0
+    default_points = 20
+    weekday_map = {
+        'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+        'friday': 4, 'saturday': 5, 'sunday': 6,
+        'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3,
+        'fri': 4, 'sat': 5, 'sun': 6
+    }
+
+    def expand(self, df):
+        df = self.reject(df, df['start_date'].isna() | df['end_date'].isna(),
+                         "Start date or end date is missing")
+        df = self.dates(df, 'start_date')
+        df = self.dates(df, 'end_date')
+
+        weekday = df['weekday'].astype(str).str.lower()
+        target = weekday.map(self.weekday_map)
+        invalid = target.isna()
+        for row, name in zip(df.loc[invalid, '_row'], weekday[invalid]):
+            self.errors.append((row, f"Row {row}: Invalid weekday '{name}'"))
+            self.failed_rows.add(row)
+        df = df[~invalid].assign(weekday=weekday[~invalid], target=target[~invalid].astype(int))
+
+        # First matching weekday on or after start_date, then every 7 days
+        offset = (df['target'] - df['start_date'].dt.weekday) % 7
+        first = df['start_date'] + pd.to_timedelta(offset, unit='D')
+        counts = ((df['end_date'] - first).dt.days // 7 + 1).clip(lower=0).to_numpy()
+
+        positions = np.repeat(np.arange(len(df)), counts)
+        week = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        expanded = df.iloc[positions].reset_index(drop=True)
+        expanded['task_date'] = first.iloc[positions].reset_index(drop=True) + pd.to_timedelta(week * 7, unit='D')
+        return expanded
+
+    def task_fields(self, record):
+        return {
+            'title': f"{record['title']} - Week of {record['task_date'].strftime('%Y-%m-%d')}",
+            'recurrence_days': record['weekday'][:3],
+        }
+
+
+IMPORTERS = {
+    'tasks': TaskImporter,
+    'daily': DailyTaskImporter,
+    'weekly': WeeklyTaskImporter,
+}
+
+
+def importer_for(upload):
+    return IMPORTERS[upload.upload_kind](upload)
@@ -0,0 +1,151 @@
+"""
+Background processing of bulk task uploads.
+
+Uploads are queued as ``BulkTaskUpload`` rows in ``pending`` status and the
+request returns immediately. ``TASK_JOBS_BACKEND`` selects who picks them up:
+
+``thread`` (default)
+    A small in-process thread pool started once the upload is committed.
+    Needs no extra infrastructure, but a job dies with its web worker.
+
+``database``
+    Nothing runs in the web process; ``manage.py process_bulk_uploads``
+    claims pending rows with ``SELECT ... FOR UPDATE SKIP LOCKED`` and can run
+    as one or more separate worker processes.
+
+Progress is read back from the row itself (see ``upload_progress``).
+
+A worker stamps ``claimed_at`` when it claims an upload and again with every
+progress update. An upload left in ``processing`` for ``STALE_CLAIM`` without
+an update belonged to a worker that died, and is marked ``failed``. The tasks
+it already imported are kept (users may have started working on them) and
+can be found by its ``batch_id``. The ``database`` worker does this before
+each claim; the ``thread`` backend does it whenever a new upload is queued.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .importers import importer_for
+from .models import BulkTaskUpload
+
+logger = logging.getLogger(__name__)
+
+# A processing upload with no progress for this long is marked failed
+STALE_CLAIM = timedelta(minutes=15)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def jobs_backend():
+    return getattr(settings, 'TASK_JOBS_BACKEND', 'thread')
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TASK_JOBS_THREADS', 1),
+                thread_name_prefix='bulk-upload',
+            )
+        return _executor
+
+
+def enqueue_bulk_upload(upload):
+    """Queue ``upload`` for processing once the current transaction commits"""
+    if jobs_backend() == 'database':
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, upload.pk))
+    transaction.on_commit(fail_stale_uploads)
+
+
+def _run_in_thread(upload_id):
+    try:
+        run_bulk_upload(upload_id)
+    except Exception:
+        logger.exception("Bulk upload %s failed", upload_id)
+    finally:
+        # Connections are per thread; don't leave this one open
+        connections.close_all()
+
+
+def claim_upload(upload_id):
+    """Atomically move a pending upload to processing; False if someone else has it"""
+    return BulkTaskUpload.objects.filter(pk=upload_id, status='pending').update(
+        status='processing', claimed_at=timezone.now()
+    ) == 1
+
+
+def claim_next_upload():
+    """Claim the oldest pending upload, skipping rows locked by other workers"""
+    fail_stale_uploads()
+    with transaction.atomic():
+        upload = BulkTaskUpload.objects.select_for_update(skip_locked=True).filter(
+            status='pending'
+        ).order_by('uploaded_at').first()
+        if upload is None:
+            return None
+        BulkTaskUpload.objects.filter(pk=upload.pk).update(status='processing', claimed_at=timezone.now())
+    return upload.pk
+
+
+def fail_stale_uploads():
+    """Mark uploads abandoned mid-run as failed; returns their ids"""
+    now = timezone.now()
+    with transaction.atomic():
+        stale = list(
+            BulkTaskUpload.objects.select_for_update(skip_locked=True).filter(
+                status='processing', claimed_at__lt=now - STALE_CLAIM,
+            )
+        )
+        for upload in stale:
+            upload.status = 'failed'
+            upload.processed_at = now
+            upload.error_log = '\n'.join(filter(None, [
+                upload.error_log,
+                f"Processing stopped after {upload.successful_imports} task(s) were imported. "
+                f"They were kept under batch {upload.batch_id}; upload the remaining rows again.",
+            ]))
+            upload.save(update_fields=['status', 'processed_at', 'error_log'])
+    for upload in stale:
+        logger.warning("Bulk upload %s was abandoned mid-run; marked failed", upload.pk)
+    return [upload.pk for upload in stale]
+
+
+def run_bulk_upload(upload_id, claimed=False):
+    """Run the importer matching the upload's kind"""
+    if not claimed and not claim_upload(upload_id):
+        return None
+    upload = BulkTaskUpload.objects.select_related('uploaded_by', 'default_category').get(pk=upload_id)
+    return importer_for(upload).run()
+
+
+def upload_progress(upload):
+    """JSON-serializable progress snapshot of an upload"""
+    processed = upload.successful_imports + upload.failed_imports
+    if upload.status in ('completed', 'partial', 'failed'):
+        percent = 100
+    elif upload.total_rows:
+        percent = min(99, int(processed * 100 / upload.total_rows))
+    else:
+        percent = 0
+    return {
+        'id': upload.pk,
+        'batch_id': upload.batch_id,
+        'kind': upload.upload_kind,
+        'status': upload.status,
+        'total_rows': upload.total_rows,
+        'successful_imports': upload.successful_imports,
+        'failed_imports': upload.failed_imports,
+        'progress': percent,
+        'done': upload.status in ('completed', 'partial', 'failed'),
+        'processed_at': upload.processed_at.isoformat() if upload.processed_at else None,
+        'checked_at': timezone.now().isoformat(),
+    }
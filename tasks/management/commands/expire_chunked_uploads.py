@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from tasks.resumable import STALE_AFTER, expire_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Abort resumable task file uploads that have stopped receiving chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-hours',
+            type=float,
+            default=STALE_AFTER.total_seconds() / 3600,
+            help='Abort uploads idle for at least this many hours',
+        )
+
+    def handle(self, *args, **options):
+        count = expire_stale_uploads(timedelta(hours=options['stale_hours']))
+        self.stdout.write(self.style.SUCCESS(f"Aborted {count} stale upload(s)"))
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from tasks.blobs import GC_GRACE_PERIOD, collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed file blobs that are no longer referenced'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=GC_GRACE_PERIOD.total_seconds() / 3600,
+            help='Only collect blobs unreferenced for at least this many hours',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be collected without deleting anything',
+        )
+
+    def handle(self, *args, **options):
+        count, size = collect_garbage(
+            grace_period=timedelta(hours=options['grace_hours']),
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} blob(s), {size / (1024 * 1024):.1f} MB"))
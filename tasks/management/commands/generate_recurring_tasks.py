@@ -1,6 +1,10 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from django.core.management.base import BaseCommand
+from django.db import connection, connections
 from django.utils import timezone
-from tasks.models import Task
+from tasks.recurring import RecurringTaskGenerator, generate_shard, init_shard_worker
 from datetime import date, timedelta
 
 
@@ -19,6 +23,17 @@ class Command(BaseCommand):
             default=0,
             help='Generate tasks for X days ahead',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes; the date range is sharded across them',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the instances that would be created',
+        )
 
     def handle(self, *args, **options):
         target_date = date.today()
@@ -33,21 +48,53 @@ class Command(BaseCommand):
                 return
 
         days_ahead = options['days_ahead']
+        dates = [target_date + timedelta(days=i) for i in range(days_ahead + 1)]
         
+        # Templates, selections and users are loaded once for the whole range
+        generator = RecurringTaskGenerator()
+        
+        if options['dry_run']:
+            self.plan_only(generator, dates)
+        elif options['workers'] > 1 and len(dates) > 1:
+            if connection.vendor == 'sqlite':
+                # SQLite allows a single writer; shards would only lock each other
+                self.stdout.write(self.style.WARNING('SQLite does not support parallel writers, running serially'))
+                self.generate_serial(generator, dates)
+            else:
+                self.generate_parallel(generator, dates, options['workers'])
+        else:
+            self.generate_serial(generator, dates)
+
+        self.stdout.write(
+            self.style.SUCCESS('Successfully generated recurring tasks!')
+        )
+
+    def plan_only(self, generator, dates):
+        """Count the missing instances for every date without writing anything"""
+        existing = generator.existing_keys(dates)
+        total = 0
+        for current_date in dates:
+            planned = generator.plan(current_date, existing=existing[current_date])
+            daily, weekly = len(planned['daily']), len(planned['weekly'])
+            total += daily + weekly
+            self.stdout.write(f"{current_date}: would create {daily} daily and {weekly} weekly tasks")
+        self.stdout.write(self.style.SUCCESS(f"Dry run: {total} tasks would be created"))
+
+    def generate_serial(self, generator, dates):
         # Generate tasks for the specified date range
-        for i in range(days_ahead + 1):
-            current_date = target_date + timedelta(days=i)
-            
+        for current_date in dates:
             self.stdout.write(f"Generating recurring tasks for {current_date}...")
             
+            created = generator.generate(current_date)
+            
             # Generate daily tasks
-            daily_tasks = Task.generate_daily_tasks(current_date)
+            daily_tasks = created['daily']
             self.stdout.write(
                 self.style.SUCCESS(f"Created {len(daily_tasks)} daily tasks")
             )
             
             # Generate weekly tasks
-            weekly_tasks = Task.generate_weekly_tasks(current_date)
+            weekly_tasks = created['weekly']
             self.stdout.write(
                 self.style.SUCCESS(f"Created {len(weekly_tasks)} weekly tasks")
             )
@@ -57,6 +104,36 @@ class Command(BaseCommand):
                 self.style.SUCCESS(f"Total tasks created for {current_date}: {total_created}")
             )
 
-        self.stdout.write(
-            self.style.SUCCESS('Successfully generated recurring tasks!')
-        )
+    def generate_parallel(self, generator, dates, workers):
+        """
+        Shard the dates round-robin across a process pool. Each date is
+        generated in its own transaction against the existing-key check, so
+        shards never overlap and an interrupted run can simply be repeated.
+        """
+        workers = min(workers, len(dates))
+        shards = [dates[i::workers] for i in range(workers)]
+        self.stdout.write(f"Generating recurring tasks for {len(dates)} dates across {workers} workers...")
+
+        # Children must open their own connections
+        connections.close_all()
+        started = time.monotonic()
+        total_created = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_shard_worker) as pool:
+            futures = {
+                pool.submit(generate_shard, generator, shard): index
+                for index, shard in enumerate(shards, start=1)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                counts, elapsed = future.result()
+                created = sum(sum(per_kind.values()) for per_kind in counts.values())
+                total_created += created
+                rate = created / elapsed if elapsed else created
+                self.stdout.write(
+                    f"Shard {index}: {len(counts)} dates, {created} tasks "
+                    f"in {elapsed:.2f}s ({rate:.0f} tasks/s)"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Total tasks created: {total_created} in {time.monotonic() - started:.2f}s"
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from tasks.jobs import claim_next_upload, fail_stale_uploads, run_bulk_upload
+
+
+class Command(BaseCommand):
+    help = 'Process pending bulk task uploads (TASK_JOBS_BACKEND = "database")'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the pending uploads and exit instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        for upload_id in fail_stale_uploads():
+            self.stdout.write(self.style.WARNING(f"Marked abandoned bulk upload {upload_id} failed"))
+        while True:
+            upload_id = claim_next_upload()
+            if upload_id is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Processing bulk upload {upload_id}...")
+            upload = run_bulk_upload(upload_id, claimed=True)
+            self.stdout.write(self.style.SUCCESS(
+                f"Upload {upload_id} {upload.status}: {upload.successful_imports} imported, "
+                f"{upload.failed_imports} failed"
+            ))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from tasks.cube import refresh
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily task analytics cube used by the analytics page'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Rebuild once and exit instead of repeating',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=24 * 60 * 60,
+            help='Seconds between rebuilds when repeating (default: daily)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            rows = refresh()
+            self.stdout.write(self.style.SUCCESS(f"Task analytics cube rebuilt with {rows} rows"))
+            if options['once']:
+                break
+            time.sleep(options['interval'])
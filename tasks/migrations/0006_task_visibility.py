@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Q
+
+
+def backfill_task_visibility(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskVisibility = apps.get_model('tasks', 'TaskVisibility')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    admin_ids = set(User.objects.filter(
+        Q(is_superuser=True) | Q(groups__name='Admin') | Q(is_staff=True)
+    ).values_list('pk', flat=True))
+
+    rows = []
+    tasks = Task.objects.values_list(
+        'id', 'assigned_to_id', 'created_by_id', 'reviewer_id', 'assigned_to_all'
+    )
+    for task_id, assigned_to_id, created_by_id, reviewer_id, assigned_to_all in tasks.iterator():
+        entries = {assigned_to_id, created_by_id, reviewer_id}
+        entries.discard(None)
+        if assigned_to_all or created_by_id in admin_ids:
+            entries.add(None)
+        rows.extend(TaskVisibility(task_id=task_id, user_id=user_id) for user_id in entries)
+        if len(rows) >= 1000:
+            TaskVisibility.objects.bulk_create(rows)
+            rows = []
+    TaskVisibility.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0005_task_allow_member_selection_task_instance_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility_entries', to='tasks.task')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_visibility_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'task_visibility',
+                'indexes': [models.Index(fields=['user', 'task'], name='task_visibi_user_id_ab0c06_idx')],
+                'unique_together': {('task', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_task_visibility, migrations.RunPython.noop),
+    ]
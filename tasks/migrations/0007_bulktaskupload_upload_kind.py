@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_task_visibility'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulktaskupload',
+            name='upload_kind',
+            field=models.CharField(choices=[('tasks', 'Tasks'), ('daily', 'Daily Recurring Tasks'), ('weekly', 'Weekly Recurring Tasks')], default='tasks', help_text='Which importer processes this upload', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='bulktaskupload',
+            index=models.Index(fields=['status', 'uploaded_at'], name='bulk_task_u_status_ed3b70_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_bulktaskupload_upload_kind'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('path', models.CharField(help_text='Path relative to MEDIA_ROOT', max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_referenced_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'file_blobs',
+                'indexes': [models.Index(fields=['ref_count', 'last_referenced_at'], name='file_blobs_ref_cou_d64d90_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='taskfile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='task_files', to='tasks.fileblob'),
+        ),
+        migrations.AddField(
+            model_name='tasksubmission',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='submissions', to='tasks.fileblob'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-16 21:40
+
+from django.db import migrations, models
+from django.db.models import Q
+import django.utils.timezone
+
+
+def settle_existing_rows(apps, schema_editor):
+    # Rows from before the queue are finished attempts, not pending uploads;
+    # queueing them would upload already-synced files to Drive again
+    TaskFileDriveSync = apps.get_model('tasks', 'TaskFileDriveSync')
+    uploaded = Q(sync_success=True) | (Q(task_file__drive_file_id__isnull=False) & ~Q(task_file__drive_file_id=''))
+    TaskFileDriveSync.objects.filter(uploaded).update(status='synced')
+    TaskFileDriveSync.objects.exclude(uploaded).update(status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskfiledrivesync',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('uploading', 'Uploading'), ('synced', 'Synced'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='taskfiledrivesync',
+            name='folder_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='taskfiledrivesync',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='taskfiledrivesync',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(settle_existing_rows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='taskfiledrivesync',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='task_file_d_status_d95f92_idx'),
+        ),
+    ]
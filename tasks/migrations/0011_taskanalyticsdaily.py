@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 14:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0010_drive_upload_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskAnalyticsDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('priority', models.CharField(max_length=20)),
+                ('tasks_created', models.PositiveIntegerField(default=0)),
+                ('tasks_completed', models.PositiveIntegerField(default=0)),
+                ('points', models.PositiveIntegerField(default=0)),
+                ('time_logs', models.PositiveIntegerField(default=0)),
+                ('minutes_logged', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tasks.taskcategory')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_analytics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'task_analytics_daily',
+                'indexes': [models.Index(fields=['date'], name='task_analyt_date_5f4c17_idx'), models.Index(fields=['user', 'date'], name='task_analyt_user_id_337dd5_idx')],
+            },
+        ),
+    ]
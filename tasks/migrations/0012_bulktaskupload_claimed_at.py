@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:30
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_unclaimed_uploads(apps, schema_editor):
+    # Uploads processing before claims were recorded have no worker to finish
+    # them; fail them and keep whatever tasks they already imported
+    BulkTaskUpload = apps.get_model('tasks', 'BulkTaskUpload')
+    now = timezone.now()
+    for upload in BulkTaskUpload.objects.filter(status='processing', claimed_at__isnull=True):
+        upload.status = 'failed'
+        upload.processed_at = now
+        upload.error_log = '\n'.join(filter(None, [
+            upload.error_log,
+            f"Processing stopped after {upload.successful_imports} task(s) were imported. "
+            f"They were kept under batch {upload.batch_id}; upload the remaining rows again.",
+        ]))
+        upload.save(update_fields=['status', 'processed_at', 'error_log'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0011_taskanalyticsdaily'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulktaskupload',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fail_unclaimed_uploads, migrations.RunPython.noop),
+    ]
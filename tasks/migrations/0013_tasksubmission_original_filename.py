@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_bulktaskupload_claimed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasksubmission',
+            name='original_filename',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -181,6 +181,9 @@ class Task(models.Model):
     def __str__(self):
         return self.title
     
+    # Status when loaded from the database; None for unsaved tasks
+    _loaded_status = None
+    
     def save(self, *args, **kwargs):
         # Auto-set completion date when status changes to completed
         if self.status == 'completed' and not self.completion_date:
@@ -193,11 +196,24 @@ class Task(models.Model):
         if self.status != 'todo' and not self.start_date:
             self.start_date = timezone.now()
         
+        was_completed = self._loaded_status == 'completed'
         super().save(*args, **kwargs)
+        self._loaded_status = self.status
         
-        # Award points if task is completed
-        if self.status == 'completed' and self.assigned_to:
-            self.assigned_to.add_points(self.points_value, f"Completed task: {self.title}")
+        # Award points when the task becomes completed (once per assignee)
+        if self.status == 'completed' and not was_completed and self.assigned_to_id:
+            from users.points import award
+            award(
+                self.assigned_to, self.points_value, 'task_completed', task=self,
+                description=f"Completed task: {self.title}",
+            )
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as loaded, so save() can tell a transition to 'completed'
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
     
     @property
     def is_overdue(self):
@@ -248,6 +264,29 @@ class Task(models.Model):
         else:
             return self.progress_percentage
     
+    def build_recurring_instance(self, target_date, assigned_user_id=None):
+        """Build (without saving) an instance of this template for ``target_date``"""
+        return Task(
+            title=f"{self.title} - {target_date.strftime('%Y-%m-%d')}",
+            description=self.description,
+            category_id=self.category_id,
+            task_type=self.task_type,
+            priority=self.priority,
+            difficulty=self.difficulty,
+            created_by_id=self.created_by_id,
+            assigned_to_id=assigned_user_id,
+            estimated_hours=self.estimated_hours,
+            points_value=self.points_value,
+            acceptance_criteria=self.acceptance_criteria,
+            is_recurring=False,
+            is_template=False,
+            template_task=self,
+            instance_date=target_date,
+            due_date=timezone.make_aware(
+                timezone.datetime.combine(target_date, timezone.datetime.min.time().replace(hour=23, minute=59))
+            ) if target_date else None,
+        )
+    
     def create_recurring_instance(self, target_date, assigned_user=None):
         """Create a new instance of this recurring task for a specific date"""
         if not self.is_template:
@@ -264,26 +303,10 @@ class Task(models.Model):
             return existing
             
         # Create new instance
-        instance = Task.objects.create(
-            title=f"{self.title} - {target_date.strftime('%Y-%m-%d')}",
-            description=self.description,
-            category=self.category,
-            task_type=self.task_type,
-            priority=self.priority,
-            difficulty=self.difficulty,
-            created_by=self.created_by,
-            assigned_to=assigned_user,
-            estimated_hours=self.estimated_hours,
-            points_value=self.points_value,
-            acceptance_criteria=self.acceptance_criteria,
-            is_recurring=False,
-            is_template=False,
-            template_task=self,
-            instance_date=target_date,
-            due_date=timezone.make_aware(
-                timezone.datetime.combine(target_date, timezone.datetime.min.time().replace(hour=23, minute=59))
-            ) if target_date else None,
+        instance = self.build_recurring_instance(
+            target_date, assigned_user.pk if assigned_user else None
         )
+        instance.save()
         
         # Copy relationships
         instance.tags.set(self.tags.all())
@@ -303,99 +326,29 @@ class Task(models.Model):
     
     @classmethod
     def generate_daily_tasks(cls, target_date=None):
-        """Generate daily task instances for users who have selected them"""
+        """Generate daily task instances for users who have selected them.
+
+        Returns only the instances created by this call.
+        """
         from datetime import date
+        from .recurring import RecurringTaskGenerator
         if target_date is None:
             target_date = date.today()
-            
-        # Get all daily recurring task templates
-        daily_templates = cls.objects.filter(
-            is_template=True,
-            is_recurring=True,
-            recurrence_type__in=['daily', 'both']
-        )
         
-        created_tasks = []
-        for template in daily_templates:
-            if template.allow_member_selection:
-                # Get users who selected this daily task
-                selections = TaskRecurringSelection.objects.filter(
-                    task_template=template,
-                    selection_type='daily',
-                    is_active=True
-                )
-                
-                for selection in selections:
-                    task = template.create_recurring_instance(target_date, selection.user)
-                    if task:
-                        created_tasks.append(task)
-            else:
-                # Create for assigned user or all users
-                if template.assigned_to:
-                    task = template.create_recurring_instance(target_date, template.assigned_to)
-                    if task:
-                        created_tasks.append(task)
-                elif template.assigned_to_all:
-                    # Create separate instance for each active user
-                    for user in User.objects.filter(is_active=True):
-                        task = template.create_recurring_instance(target_date, user)
-                        if task:
-                            created_tasks.append(task)
-        
-        return created_tasks
+        return RecurringTaskGenerator().generate(target_date, kinds=('daily',))['daily']
     
     @classmethod
     def generate_weekly_tasks(cls, target_date=None):
-        """Generate weekly task instances for users who have selected them"""
+        """Generate weekly task instances for users who have selected them.
+
+        Returns only the instances created by this call.
+        """
         from datetime import date
+        from .recurring import RecurringTaskGenerator
         if target_date is None:
             target_date = date.today()
-            
-        # Get day of week (0=Monday, 6=Sunday)
-        weekday_names = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
-        current_day = weekday_names[target_date.weekday()]
         
-        # Get all weekly recurring task templates
-        weekly_templates = cls.objects.filter(
-            is_template=True,
-            is_recurring=True,
-            recurrence_type__in=['weekly', 'both']
-        )
-        
-        created_tasks = []
-        for template in weekly_templates:
-            # Check if template should run on this day
-            if template.recurrence_days and current_day not in template.recurrence_days.lower():
-                continue
-                
-            if template.allow_member_selection:
-                # Get users who selected this weekly task
-                selections = TaskRecurringSelection.objects.filter(
-                    task_template=template,
-                    selection_type='weekly',
-                    is_active=True
-                )
-                
-                for selection in selections:
-                    # Check if user selected this day
-                    if selection.selected_days and current_day in selection.selected_days.lower():
-                        task = template.create_recurring_instance(target_date, selection.user)
-                        if task:
-                            created_tasks.append(task)
-            else:
-                # Create for assigned user or all users
-                if template.assigned_to:
-                    task = template.create_recurring_instance(target_date, template.assigned_to)
-                    if task:
-                        created_tasks.append(task)
-                elif template.assigned_to_all:
-                    # Create separate instance for each active user
-                    for user in User.objects.filter(is_active=True):
-                        task = template.create_recurring_instance(target_date, user)
-                        if task:
-                            created_tasks.append(task)
-        
-        return created_tasks
+        return RecurringTaskGenerator().generate(target_date, kinds=('weekly',))['weekly']
 
 
 class TaskTimeLog(models.Model):
@@ -477,6 +430,11 @@ class TaskSubmission(models.Model):
     
     # Submission content
     file = models.FileField(upload_to='submissions/', blank=True, null=True)
+    blob = models.ForeignKey(
+        'FileBlob', on_delete=models.PROTECT, null=True, blank=True, related_name='submissions'
+    )
+    # Name of the uploaded file; ``file`` names its blob by content hash
+    original_filename = models.CharField(max_length=255, blank=True)
     external_url = models.URLField(blank=True)
     notes = models.TextField(blank=True)
     
@@ -587,6 +545,9 @@ class TaskFile(models.Model):
     
     # Local storage fallback
     local_file_path = models.CharField(max_length=500, blank=True)
+    blob = models.ForeignKey(
+        'FileBlob', on_delete=models.PROTECT, null=True, blank=True, related_name='task_files'
+    )
     
     # File metadata
     description = models.TextField(blank=True)
@@ -673,13 +634,29 @@ class TaskFileDriveSync(models.Model):
     """Track Google Drive sync status for task files"""
     task_file = models.OneToOneField(TaskFile, on_delete=models.CASCADE, related_name='drive_sync')
     
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('uploading', 'Uploading'),
+        ('synced', 'Synced'),
+        ('failed', 'Failed'),
+    ]
+    
     last_synced = models.DateTimeField(auto_now=True)
     sync_success = models.BooleanField(default=True)
     sync_message = models.TextField(blank=True)
     retry_count = models.PositiveIntegerField(default=0)
     
+    # Upload queue (see google_integration.drive_queue)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    folder_path = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    
     class Meta:
         db_table = 'task_file_drive_sync'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
     
     def __str__(self):
         status = "Success" if self.sync_success else "Failed"
@@ -703,11 +680,21 @@ class BulkTaskUpload(models.Model):
         ('json', 'JSON File'),
     ]
     
+    UPLOAD_KIND_CHOICES = [
+        ('tasks', 'Tasks'),
+        ('daily', 'Daily Recurring Tasks'),
+        ('weekly', 'Weekly Recurring Tasks'),
+    ]
+    
     # File information
     file = models.FileField(upload_to='bulk_task_uploads/')
     original_filename = models.CharField(max_length=255)
     file_type = models.CharField(max_length=10, choices=FILE_TYPE_CHOICES, default='csv')
     file_size = models.PositiveIntegerField(help_text="File size in bytes")
+    upload_kind = models.CharField(
+        max_length=10, choices=UPLOAD_KIND_CHOICES, default='tasks',
+        help_text="Which importer processes this upload"
+    )
     
     # Upload metadata
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bulk_task_uploads')
@@ -716,6 +703,8 @@ class BulkTaskUpload(models.Model):
     # Processing status
     status = models.CharField(max_length=20, choices=UPLOAD_STATUS_CHOICES, default='pending')
     processed_at = models.DateTimeField(null=True, blank=True)
+    # Set when a worker claims the upload and on each progress update
+    claimed_at = models.DateTimeField(null=True, blank=True)
     
     # Results
     total_rows = models.PositiveIntegerField(default=0)
@@ -735,6 +724,9 @@ class BulkTaskUpload(models.Model):
     class Meta:
         db_table = 'bulk_task_uploads'
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['status', 'uploaded_at']),
+        ]
     
     def __str__(self):
         return f"Bulk Upload: {self.original_filename} ({self.status})"
@@ -856,3 +848,126 @@ class TaskLabel(models.Model):
     
     def __str__(self):
         return self.name
+
+
+class TaskVisibility(models.Model):
+    """Materialized visibility index: which users can see which tasks.
+
+    A row with ``user=NULL`` marks a task visible to everyone (public or
+    admin-created). Maintained by ``tasks.visibility`` and ``tasks.signals``.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='visibility_entries')
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='task_visibility_entries'
+    )
+    
+    class Meta:
+        db_table = 'task_visibility'
+        unique_together = ('task', 'user')
+        indexes = [
+            models.Index(fields=['user', 'task']),
+        ]
+    
+    def __str__(self):
+        return f"{self.task_id} -> {self.user_id or 'everyone'}"
+
+
+class FileBlob(models.Model):
+    """Content-addressed file stored once under ``MEDIA_ROOT/blobs/``.
+
+    ``TaskFile``, ``ResourceFile`` and ``TaskSubmission`` point at blobs;
+    ``ref_count`` counts those references and unreferenced blobs are removed
+    by ``manage.py gc_blobs``. Maintained by ``tasks.blobs``.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    path = models.CharField(max_length=255, help_text="Path relative to MEDIA_ROOT")
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_referenced_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'file_blobs'
+        indexes = [
+            models.Index(fields=['ref_count', 'last_referenced_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+class ChunkedUpload(models.Model):
+    """Resumable upload of one task file, received in offset-addressed chunks.
+
+    Bytes are appended to ``uploads/partial/<upload_id>`` under MEDIA_ROOT;
+    ``offset`` is how many have been received so far. Completed uploads move
+    into the blob store and count towards ``batch``. Maintained by
+    ``tasks.resumable``.
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+    ]
+    
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    batch = models.ForeignKey(TaskFileUploadBatch, on_delete=models.CASCADE, related_name='chunked_uploads')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='chunked_uploads')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads')
+    
+    filename = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=20, choices=TaskFile.FILE_TYPES, default='other')
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    task_file = models.ForeignKey(TaskFile, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'task_chunked_uploads'
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename}: {self.offset}/{self.total_size}"
+
+
+class TaskAnalyticsDaily(models.Model):
+    """Task counts, points and logged time per day and (user, category, status, priority).
+
+    ``user`` is the assignee. ``status`` and ``priority`` are the task's values
+    at the last refresh. Rebuilt by ``tasks.cube``.
+    """
+    date = models.DateField()
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='task_analytics'
+    )
+    category = models.ForeignKey(TaskCategory, on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=20)
+    priority = models.CharField(max_length=20)
+    
+    # Tasks created on this date
+    tasks_created = models.PositiveIntegerField(default=0)
+    # Tasks completed on this date, and their points
+    tasks_completed = models.PositiveIntegerField(default=0)
+    points = models.PositiveIntegerField(default=0)
+    # Time logs started on this date
+    time_logs = models.PositiveIntegerField(default=0)
+    minutes_logged = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'task_analytics_daily'
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['user', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.user_id or '-'} {self.status}/{self.priority}"
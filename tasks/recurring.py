@@ -0,0 +1,176 @@
+"""
+Set-based generation of recurring task instances.
+
+``Task.create_recurring_instance`` costs an existence ``SELECT``, an ``INSERT``
+and three M2M ``.set()`` round trips per (template, user), which multiplies by
+every active user for ``assigned_to_all`` templates. The generator here loads
+templates, selections and users once, fetches the already generated
+(template, date, user) keys in one query per date, and writes the new
+instances and their tag/skill/technology rows with ``bulk_create`` inside a
+single transaction per date.
+"""
+from django.db import transaction
+
+from users.models import User
+from .models import Task, TaskRecurringSelection
+from .visibility import refresh_task_visibility
+
+WEEKDAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+RECURRENCE_TYPES = {
+    'daily': ('daily', 'both'),
+    'weekly': ('weekly', 'both'),
+}
+
+# Relations copied from a template onto each instance
+COPIED_M2M_FIELDS = ('tags', 'required_skills', 'technologies')
+
+BULK_BATCH_SIZE = 500
+
+
+class RecurringTaskGenerator:
+    """
+    Plan and create recurring task instances for one or more dates.
+
+    All reference data is loaded on construction, so a single generator can
+    be reused across a date range without re-reading templates or users.
+    """
+
+    def __init__(self, templates=None):
+        if templates is None:
+            templates = Task.objects.filter(is_template=True, is_recurring=True)
+        self.templates = list(templates.prefetch_related(*COPIED_M2M_FIELDS))
+
+        self.selections = {}
+        for template_id, selection_type, user_id, selected_days in TaskRecurringSelection.objects.filter(
+            task_template__in=[template.pk for template in self.templates],
+            is_active=True,
+        ).values_list('task_template_id', 'selection_type', 'user_id', 'selected_days'):
+            self.selections.setdefault((template_id, selection_type), []).append(
+                (user_id, (selected_days or '').lower())
+            )
+
+        self.active_user_ids = list(
+            User.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+        )
+
+    def templates_for(self, kind):
+        return [t for t in self.templates if t.recurrence_type in RECURRENCE_TYPES[kind]]
+
+    def assignees(self, template, kind, target_date):
+        """User ids (or ``None``) that should get an instance of ``template``"""
+        current_day = WEEKDAY_NAMES[target_date.weekday()]
+
+        if kind == 'weekly' and template.recurrence_days and \
+                current_day not in template.recurrence_days.lower():
+            return []
+
+        if template.allow_member_selection:
+            selected = self.selections.get((template.pk, kind), [])
+            if kind == 'weekly':
+                return [user_id for user_id, days in selected if days and current_day in days]
+            return [user_id for user_id, _ in selected]
+
+        if template.assigned_to_id:
+            return [template.assigned_to_id]
+        if template.assigned_to_all:
+            return self.active_user_ids
+        return []
+
+    def existing_keys(self, dates):
+        """``{date: {(template_id, user_id), ...}}`` of instances already generated"""
+        keys = {target_date: set() for target_date in dates}
+        for template_id, user_id, instance_date in Task.objects.filter(
+            template_task__in=[template.pk for template in self.templates],
+            instance_date__in=list(keys),
+        ).values_list('template_task_id', 'assigned_to_id', 'instance_date'):
+            keys[instance_date].add((template_id, user_id))
+        return keys
+
+    def plan(self, target_date, kinds=('daily', 'weekly'), existing=None):
+        """
+        Return ``{kind: [(template, user_id), ...]}`` for instances that do
+        not exist yet. A template recurring both daily and weekly gets at most
+        one instance per user and date, as before. ``existing`` may carry the
+        keys for ``target_date`` from a prior ``existing_keys()`` call.
+        """
+        if existing is None:
+            existing = self.existing_keys([target_date])[target_date]
+        existing = set(existing)
+
+        planned = {}
+        for kind in kinds:
+            planned[kind] = []
+            for template in self.templates_for(kind):
+                for user_id in self.assignees(template, kind, target_date):
+                    key = (template.pk, user_id)
+                    if key in existing:
+                        continue
+                    existing.add(key)
+                    planned[kind].append((template, user_id))
+        return planned
+
+    def generate(self, target_date, kinds=('daily', 'weekly')):
+        """Create the planned instances for ``target_date``; returns ``{kind: [Task, ...]}``"""
+        with transaction.atomic():
+            planned = self.plan(target_date, kinds)
+            created = {}
+            for kind, pairs in planned.items():
+                created[kind] = self._create(target_date, pairs)
+        return created
+
+    def _create(self, target_date, pairs):
+        if not pairs:
+            return []
+
+        instances = Task.objects.bulk_create(
+            [template.build_recurring_instance(target_date, user_id) for template, user_id in pairs],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        for field_name in COPIED_M2M_FIELDS:
+            field = Task._meta.get_field(field_name)
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            rows = [
+                through(**{source: instance.pk, target: related.pk})
+                for instance, (template, _) in zip(instances, pairs)
+                for related in getattr(template, field_name).all()
+            ]
+            if rows:
+                through.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+
+        # bulk_create bypasses post_save, so index visibility explicitly
+        refresh_task_visibility(instances)
+        return instances
+
+
+def init_shard_worker():
+    """Process pool initializer: never share the parent's DB connections"""
+    import django
+    from django.apps import apps
+    from django.db import connections
+
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def generate_shard(generator, dates, kinds=('daily', 'weekly')):
+    """
+    Generate every date in ``dates`` with ``generator``; run inside a pool
+    worker. Returns per-date created counts and the elapsed wall time.
+    """
+    import time
+    from django.db import connections
+
+    started = time.monotonic()
+    counts = {}
+    try:
+        for target_date in dates:
+            created = generator.generate(target_date, kinds)
+            counts[target_date] = {kind: len(tasks) for kind, tasks in created.items()}
+    finally:
+        connections.close_all()
+    return counts, time.monotonic() - started
@@ -0,0 +1,237 @@
+"""
+Resumable, chunked uploads of task files.
+
+A multipart POST is buffered by Django in full and restarts from zero when a
+connection drops. Here a client instead creates a ``ChunkedUpload`` with the
+file's total size, then sends the bytes in ``PATCH`` requests that each say
+at which offset they start (the scheme used by the tus protocol):
+
+* ``HEAD`` tells the client how many bytes have been received, so after a
+  network failure it resumes from there instead of from zero.
+* Each chunk is streamed from the request into a temporary file, so neither
+  the chunk nor the file is ever held in memory. Only then is the upload row
+  locked, the offset checked and the chunk appended to the partial file,
+  so a slow client never holds a database lock.
+* When the last byte arrives the file is hashed into the blob store (see
+  ``tasks.blobs``) before any lock is taken. The ``TaskFile`` is then
+  created and the upload's ``TaskFileUploadBatch`` progress counters are
+  advanced under the row lock. The partial file is only removed once that
+  commits, so if it fails, an empty ``PATCH`` at the final offset retries
+  the completion.
+"""
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .blobs import release, store_file
+from .models import ChunkedUpload, TaskFile, TaskFileUploadBatch
+
+PARTIAL_DIR = 'uploads/partial'
+
+# Bytes read from the request body at a time
+READ_SIZE = 64 * 1024
+
+# Uploads that have not received a chunk for this long are aborted
+STALE_AFTER = timedelta(days=1)
+
+
+class OffsetMismatch(ValueError):
+    """A chunk did not start where the previous one ended"""
+
+    def __init__(self, expected):
+        super().__init__(f"Upload offset is {expected}")
+        self.expected = expected
+
+
+def partial_path(upload):
+    return os.path.join(settings.MEDIA_ROOT, PARTIAL_DIR, str(upload.upload_id))
+
+
+def start_upload(task, user, filename, total_size, file_type='other', content_type='',
+                 batch_id=None, total_files=1):
+    """
+    Create an upload for ``filename``. Uploads sharing ``batch_id`` report
+    progress on one ``TaskFileUploadBatch`` of ``total_files`` files.
+    """
+    if total_size < 0:
+        raise ValueError("Upload-Length must not be negative")
+
+    with transaction.atomic():
+        if batch_id:
+            batch, _ = TaskFileUploadBatch.objects.get_or_create(
+                batch_id=batch_id,
+                defaults={
+                    'task': task, 'uploaded_by': user,
+                    'total_files': total_files, 'status': 'uploading',
+                },
+            )
+            if batch.task_id != task.pk or batch.uploaded_by_id != user.pk:
+                raise ValueError("Upload batch belongs to another task or user")
+        else:
+            batch = TaskFileUploadBatch.objects.create(
+                task=task, uploaded_by=user, batch_id=str(uuid.uuid4()),
+                total_files=total_files, status='uploading',
+            )
+        upload = ChunkedUpload.objects.create(
+            batch=batch, task=task, uploaded_by=user,
+            filename=os.path.basename(filename)[:255], file_type=file_type,
+            content_type=content_type[:100], total_size=total_size,
+        )
+
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    if total_size == 0:
+        upload = _complete(upload)
+    return upload
+
+
+def _spool_chunk(stream, limit):
+    """Copy at most ``limit`` bytes of ``stream`` to a temporary file"""
+    tmp_dir = os.path.join(settings.MEDIA_ROOT, PARTIAL_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    chunk = tempfile.TemporaryFile(dir=tmp_dir)
+    received = 0
+    while True:
+        data = stream.read(READ_SIZE)
+        if not data:
+            break
+        received += len(data)
+        if received > limit:
+            chunk.close()
+            raise ValueError("Chunk extends past Upload-Length")
+        chunk.write(data)
+    chunk.seek(0)
+    return chunk, received
+
+
+def append_chunk(upload, offset, stream):
+    """
+    Append the body ``stream`` at ``offset`` and return the refreshed upload.
+    Raises ``OffsetMismatch`` if ``offset`` is not the current offset.
+    """
+    if upload.status != 'uploading':
+        raise ValueError(f"Upload is {upload.status}")
+    if offset != upload.offset:
+        raise OffsetMismatch(upload.offset)
+
+    chunk, received = _spool_chunk(stream, upload.total_size - offset)
+    with chunk, transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status != 'uploading':
+            raise ValueError(f"Upload is {upload.status}")
+        if offset != upload.offset:
+            # Another request for the same offset won the race
+            raise OffsetMismatch(upload.offset)
+
+        with open(partial_path(upload), 'r+b') as partial:
+            partial.seek(offset)
+            shutil.copyfileobj(chunk, partial, READ_SIZE)
+            partial.truncate()
+        upload.offset = offset + received
+        upload.save(update_fields=['offset', 'updated_at'])
+
+    if upload.offset == upload.total_size:
+        upload = _complete(upload)
+    return upload
+
+
+def _complete(upload):
+    """Store the finished file as a blob and record the TaskFile; returns the refreshed upload"""
+    path = partial_path(upload)
+    # Hashing reads the whole file; do it before locking the row. The partial
+    # file is kept so a failure below can be retried
+    blob = store_file(path, upload.filename, keep=True)
+    try:
+        with transaction.atomic():
+            upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.status != 'uploading' or upload.offset != upload.total_size:
+                # Another request completed (or aborted) it first
+                release(blob.pk)
+                return upload
+            upload.task_file = TaskFile.objects.create(
+                task=upload.task,
+                uploaded_by=upload.uploaded_by,
+                filename=upload.filename,
+                original_filename=upload.filename,
+                file_type=upload.file_type,
+                file_size=upload.total_size,
+                mime_type=upload.content_type,
+                local_file_path=blob.path,
+                blob=blob,
+            )
+            upload.status = 'completed'
+            upload.save(update_fields=['status', 'task_file', 'updated_at'])
+            _advance_batch(upload.batch_id, uploaded_files=F('uploaded_files') + 1)
+            transaction.on_commit(lambda: _discard_partial(path))
+    except Exception:
+        release(blob.pk)
+        raise
+    return upload
+
+
+def _discard_partial(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def abort_upload(upload):
+    """Stop an upload and discard the bytes received so far"""
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status != 'uploading':
+            return upload
+        upload.status = 'aborted'
+        upload.save(update_fields=['status', 'updated_at'])
+        _advance_batch(upload.batch_id, failed_files=F('failed_files') + 1)
+    _discard_partial(partial_path(upload))
+    return upload
+
+
+def _advance_batch(batch_id, **counters):
+    TaskFileUploadBatch.objects.filter(pk=batch_id).update(**counters)
+    batch = TaskFileUploadBatch.objects.get(pk=batch_id)
+    if batch.uploaded_files + batch.failed_files >= batch.total_files:
+        batch.status = 'completed' if batch.failed_files == 0 else 'partial'
+        batch.completed_at = timezone.now()
+        batch.save(update_fields=['status', 'completed_at'])
+
+
+def expire_stale_uploads(stale_after=STALE_AFTER):
+    """Abort uploads that have stopped receiving chunks; returns how many"""
+    cutoff = timezone.now() - stale_after
+    stale = ChunkedUpload.objects.filter(status='uploading', updated_at__lt=cutoff)
+    count = 0
+    for upload in list(stale):
+        abort_upload(upload)
+        count += 1
+    return count
+
+
+def upload_state(upload):
+    """JSON-serializable state of an upload and its batch"""
+    batch = upload.batch
+    return {
+        'upload_id': str(upload.upload_id),
+        'filename': upload.filename,
+        'status': upload.status,
+        'offset': upload.offset,
+        'total_size': upload.total_size,
+        'task_file_id': upload.task_file_id,
+        'batch': {
+            'batch_id': batch.batch_id,
+            'status': batch.status,
+            'total_files': batch.total_files,
+            'uploaded_files': batch.uploaded_files,
+            'failed_files': batch.failed_files,
+        },
+    }
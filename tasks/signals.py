@@ -0,0 +1,63 @@
+"""
+Signal handlers keeping the task visibility index and blob reference
+counts up to date.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import User
+from .blobs import release
+from .models import Task, TaskFile, TaskSubmission
+from .visibility import refresh_creator_visibility, refresh_task_visibility
+
+VISIBILITY_TRIGGER_FIELDS = {
+    'assigned_to', 'assigned_to_id', 'created_by', 'created_by_id',
+    'reviewer', 'reviewer_id', 'assigned_to_all',
+}
+
+ADMIN_FLAG_FIELDS = {'is_superuser', 'is_staff'}
+
+
+@receiver(post_save, sender=Task)
+def update_task_visibility(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not VISIBILITY_TRIGGER_FIELDS.intersection(update_fields):
+        return
+    refresh_task_visibility([instance])
+
+
+@receiver(post_save, sender=User)
+def update_creator_visibility_on_user_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # A brand new user has no tasks; routine saves such as last_login
+    # updates pass update_fields and do not touch the admin flags.
+    if raw or created:
+        return
+    if update_fields is not None and not ADMIN_FLAG_FIELDS.intersection(update_fields):
+        return
+    refresh_creator_visibility([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def update_creator_visibility_on_group_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Group.user_set.clear(): remember who is about to lose the group
+        instance._visibility_cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action == 'post_clear':
+        user_ids = getattr(instance, '_visibility_cleared_user_ids', [])
+    else:
+        user_ids = pk_set or []
+    refresh_creator_visibility(user_ids)
+
+
+@receiver(post_delete, sender=TaskFile)
+@receiver(post_delete, sender=TaskSubmission)
+@receiver(post_delete, sender='resources.ResourceFile')
+def release_file_blob(sender, instance, **kwargs):
+    release(instance.blob_id)
@@ -0,0 +1,90 @@
+"""
+Single-pass task statistics engine.
+
+Dashboards used to issue one ``COUNT(*)`` per bucket, each re-running the
+visibility filter. Here every bucket is expressed as a ``Q`` object and the
+whole set is evaluated as conditional aggregates in a single query.
+"""
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from users.models import User
+from users.roles import ADMIN_GROUP
+from .models import Task
+
+OPEN_STATUSES = ['todo', 'in_progress']
+
+
+def status_buckets(prefix='status_'):
+    """One bucket per task status"""
+    return {f'{prefix}{value}': Q(status=value) for value, _ in Task.STATUS_CHOICES}
+
+
+def priority_buckets(prefix='priority_'):
+    """One bucket per task priority"""
+    return {f'{prefix}{value}': Q(priority=value) for value, _ in Task.PRIORITY_CHOICES}
+
+
+def overview_buckets(overdue_before=None):
+    """Status counters shown on the task list and dashboards"""
+    if overdue_before is None:
+        overdue_before = timezone.now().date()
+    return {
+        'todo': Q(status='todo'),
+        'in_progress': Q(status='in_progress'),
+        'completed': Q(status='completed'),
+        'active': Q(status__in=OPEN_STATUSES),
+        'overdue': Q(due_date__lt=overdue_before, status__in=OPEN_STATUSES),
+    }
+
+
+def personal_buckets(user, overdue_before=None):
+    """Counters relative to a single user"""
+    if overdue_before is None:
+        overdue_before = timezone.now().date()
+    return {
+        'assigned_to_me': Q(assigned_to=user),
+        'created_by_me': Q(created_by=user),
+        'created_pending_review': Q(created_by=user, status='review'),
+        'pending_my_review': Q(reviewer=user, status='review'),
+        'overdue_assigned': Q(
+            assigned_to=user,
+            due_date__lt=overdue_before,
+            status__in=OPEN_STATUSES,
+        ),
+    }
+
+
+def dashboard_admins():
+    """
+    Superusers and the Admin group, whose tasks the dashboards count as
+    admin-created. Unlike ``users.roles.admin_users`` (used for visibility),
+    staff accounts are not included.
+    """
+    return User.objects.filter(Q(is_superuser=True) | Q(groups__name=ADMIN_GROUP)).values('pk')
+
+
+def team_buckets():
+    """Team-wide visibility counters"""
+    return {
+        'public': Q(assigned_to_all=True),
+        'public_open': Q(assigned_to_all=True, status__in=OPEN_STATUSES),
+        'admin_created': Q(created_by__in=dashboard_admins()),
+        'team_tasks': Q(assigned_to__isnull=False),
+    }
+
+
+def aggregate_task_stats(queryset, buckets):
+    """
+    Count every bucket over ``queryset`` in one query.
+
+    ``buckets`` maps result names to ``Q`` filters; the result also contains
+    ``total``. Ordering and prefetches are dropped, and DISTINCT querysets are
+    wrapped in a subquery by the ORM so joined rows are not double counted.
+    """
+    aggregates = {
+        name: Count('pk', filter=condition)
+        for name, condition in buckets.items()
+    }
+    aggregates['total'] = Count('pk')
+    return queryset.order_by().aggregate(**aggregates)
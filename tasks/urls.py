@@ -60,8 +60,13 @@ urlpatterns = [
     # Bulk upload features
     path('bulk-upload/daily/', views.bulk_upload_daily_tasks, name='bulk-upload-daily'),
     path('bulk-upload/weekly/', views.bulk_upload_weekly_tasks, name='bulk-upload-weekly'),
+    path('bulk-upload/<int:pk>/status/', views.bulk_upload_status, name='bulk-upload-status'),
     path('download-template/daily/', views.download_daily_template, name='download-daily-template'),
     path('download-template/weekly/', views.download_weekly_template, name='download-weekly-template'),
     path('<int:task_id>/download-file/', views.download_task_file, name='download-task-file'),
 
+    # Resumable chunked file uploads
+    path('<int:task_id>/uploads/', views.chunked_upload_create, name='chunked-upload-create'),
+    path('uploads/<uuid:upload_id>/', views.chunked_upload, name='chunked-upload'),
+
 ]
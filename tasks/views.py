@@ -2,8 +2,6 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.http import Http404, HttpResponse, FileResponse
 from django.shortcuts import get_object_or_404, render
 from django.core.exceptions import PermissionDenied
-import os
-import mimetypes
 
 @staff_member_required
 def admin_view_file(request, submission_id):
@@ -18,25 +16,8 @@ def admin_view_file(request, submission_id):
         raise PermissionDenied()
     
     try:
-        # For production, serve the file directly
-        file_path = submission.file.path
-        
-        if not os.path.exists(file_path):
-            raise Http404("File not found on server.")
-        
-        # Determine content type
-        content_type, _ = mimetypes.guess_type(file_path)
-        if content_type is None:
-            content_type = 'application/octet-stream'
-        
-        # Return file response
-        response = FileResponse(
-            open(file_path, 'rb'),
-            content_type=content_type,
-            filename=os.path.basename(file_path)
-        )
-        
-        return response
+        # Ranges, conditional GETs and front-end offload are handled by serve_file
+        return serve_file(request, submission.file.path, filename=submission.original_filename or None)
         
     except Exception as e:
         # Fallback: serve via template with file URL
@@ -64,25 +45,8 @@ def view_submission_file(request, submission_id):
         raise Http404("No file uploaded for this submission.")
     
     try:
-        # For production, serve the file directly
-        file_path = submission.file.path
-        
-        if not os.path.exists(file_path):
-            raise Http404("File not found on server.")
-        
-        # Determine content type
-        content_type, _ = mimetypes.guess_type(file_path)
-        if content_type is None:
-            content_type = 'application/octet-stream'
-        
-        # Return file response
-        response = FileResponse(
-            open(file_path, 'rb'),
-            content_type=content_type,
-            filename=os.path.basename(file_path)
-        )
-        
-        return response
+        # Ranges, conditional GETs and front-end offload are handled by serve_file
+        return serve_file(request, submission.file.path, filename=submission.original_filename or None)
         
     except Exception as e:
         raise Http404(f"Error serving file: {str(e)}")
@@ -111,17 +75,12 @@ def task_submissions_admin(request):
         'status_choices': Task.STATUS_CHOICES,
     })
 import json
-import csv
-try:
-    import pandas as pd
-    HAS_PANDAS = True
-except ImportError:
-    HAS_PANDAS = False
 from datetime import datetime, timedelta
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Q, Count, Avg, Sum, F, Case, When, Value, IntegerField
 from django.http import JsonResponse, HttpResponse, Http404, HttpResponseNotAllowed
 from django.urls import reverse_lazy, reverse
@@ -131,31 +90,43 @@ from django.views.decorators.csrf import csrf_exempt
 from django.core.paginator import Paginator
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
-from django.conf import settings
 import uuid
-import os
 from io import BytesIO
 
 from .models import (
     Task, TaskCategory, TaskFile, TaskComment, TaskSubmission, 
     BulkTaskUpload, TaskTimeLog, TaskTemplate, TaskLabel,
-    TaskFileUploadBatch, TaskFileAccess
+    TaskFileUploadBatch, TaskFileAccess, ChunkedUpload
 )
 from .forms import TaskCreateForm, TaskFileUploadForm, TaskSubmissionForm
+from .stats import (
+    aggregate_task_stats, dashboard_admins, overview_buckets, personal_buckets, team_buckets,
+    status_buckets, priority_buckets,
+)
+from . import cube
+from .blobs import acquire, release, store_upload
+from .delivery import media_path, serve_file
+from .exports import (
+    EXPORT_DATASETS, EXPORT_FORMATS, full_name, iter_values, streaming_csv_response,
+    timestamped_filename, typed_export_response, wants_gzip, xlsx_response,
+)
+from .jobs import enqueue_bulk_upload, upload_progress
+from .recurring import RecurringTaskGenerator
+from .resumable import OffsetMismatch, abort_upload, append_chunk, start_upload, upload_state
+from .visibility import user_can_view_task, visible_tasks, visible_to
 from users.models import User
-from analytics.models import UserActivity
+from users.roles import has_group
+from analytics import activity
 
 # Try to import Google integration, but don't fail if not available
 try:
-    from google_integration.services import GoogleDriveService
+    from google_integration.drive_queue import drive_enabled, enqueue_drive_upload
     HAS_GOOGLE_INTEGRATION = True
 except ImportError:
     HAS_GOOGLE_INTEGRATION = False
-    class GoogleDriveService:
-        """Dummy class when Google integration is not available"""
-        def __init__(self):
-            pass
+    def drive_enabled():
+        """Drive uploads are unavailable without the Google integration"""
+        return False
 
 
 class TaskListView(LoginRequiredMixin, ListView):
@@ -172,47 +143,9 @@ class TaskListView(LoginRequiredMixin, ListView):
             'tags', 'required_skills', 'technologies', 'comments', 'files'
         )
 
-        # Team management visibility logic
-        user = self.request.user
-        
-        # Base visibility: tasks visible to user
-        visibility_filter = Q()
-        
-        # 1. Tasks assigned to the user
-        visibility_filter |= Q(assigned_to=user)
-        
-        # 2. Tasks created by the user
-        visibility_filter |= Q(created_by=user)
-        
-        # 3. Tasks where user is reviewer
-        visibility_filter |= Q(reviewer=user)
-        
-        # 4. Tasks with assigned_to_all=True (public tasks)
-        visibility_filter |= Q(assigned_to_all=True)
-        
-        # 5. Tasks created by administrators (visible to all by default)
-        admin_users = User.objects.filter(
-            Q(is_superuser=True) | 
-            Q(groups__name='Admin') |
-            Q(is_staff=True)
-        )
-        visibility_filter |= Q(created_by__in=admin_users)
-        
-        # 6. Tasks in user's team projects (if user has team memberships)
-        if hasattr(user, 'team_memberships') and user.team_memberships.exists():
-            team_names = user.team_memberships.values_list('team_name', flat=True)
-            # Find projects associated with these teams (by project title or team assignments)
-            from projects.models import Project
-            team_projects = Project.objects.filter(
-                Q(title__in=team_names) |
-                Q(team_members__in=[user])
-            ).values_list('id', flat=True)
-            if team_projects:
-                visibility_filter |= Q(project_id__in=team_projects)
-        
-        # Apply the visibility filter unless user is admin
-        if not (user.is_superuser or user.groups.filter(name='Admin').exists()):
-            queryset = queryset.filter(visibility_filter).distinct()
+        # Team management visibility: assignee, creator, reviewer, public
+        # and admin-created tasks, resolved through the visibility index
+        queryset = visible_tasks(self.request.user, queryset)
 
         # Search functionality
         search_query = self.request.GET.get('search')
@@ -284,46 +217,33 @@ class TaskListView(LoginRequiredMixin, ListView):
             'sort': self.request.GET.get('sort', '-created_at'),
         }
 
-        # Task statistics
-        tasks = self.get_queryset()
+        # Task statistics, computed in one aggregate over the listed tasks
+        stats = aggregate_task_stats(self.object_list, {
+            **overview_buckets(),
+            **personal_buckets(self.request.user),
+            **team_buckets(),
+        })
         context['task_stats'] = {
-            'total': tasks.count(),
-            'todo': tasks.filter(status='todo').count(),
-            'in_progress': tasks.filter(status='in_progress').count(),
-            'completed': tasks.filter(status='completed').count(),
-            'overdue': tasks.filter(
-                due_date__lt=timezone.now().date(),
-                status__in=['todo', 'in_progress']
-            ).count(),
+            'total': stats['total'],
+            'todo': stats['todo'],
+            'in_progress': stats['in_progress'],
+            'completed': stats['completed'],
+            'overdue': stats['overdue'],
         }
 
         # User's task summary - focus on team management
-        user_tasks = tasks.filter(
-            Q(assigned_to=self.request.user) | 
-            Q(created_by=self.request.user)
-        )
         context['my_task_stats'] = {
-            'total_assigned': tasks.filter(assigned_to=self.request.user).count(),
-            'total_created': tasks.filter(created_by=self.request.user).count(),
-            'pending_review': tasks.filter(
-                created_by=self.request.user, 
-                status='review'
-            ).count(),
-            'team_collaboration': tasks.filter(
-                assigned_to_all=True,
-                status__in=['todo', 'in_progress']
-            ).count(),
+            'total_assigned': stats['assigned_to_me'],
+            'total_created': stats['created_by_me'],
+            'pending_review': stats['created_pending_review'],
+            'team_collaboration': stats['public_open'],
         }
 
         # Team insights
         context['team_insights'] = {
-            'public_tasks': tasks.filter(assigned_to_all=True).count(),
-            'admin_created': tasks.filter(
-                created_by__in=User.objects.filter(
-                    Q(is_superuser=True) | Q(groups__name='Admin')
-                )
-            ).count(),
-            'team_tasks': tasks.filter(assigned_to__isnull=False).count(),
+            'public_tasks': stats['public'],
+            'admin_created': stats['admin_created'],
+            'team_tasks': stats['team_tasks'],
         }
 
         return context
@@ -370,31 +290,12 @@ class TaskDetailView(LoginRequiredMixin, DetailView):
         if user.is_superuser:
             return True
         
-        # Task assignee, creator, or reviewer can always view
-        if task.assigned_to == user or task.created_by == user or task.reviewer == user:
+        # Assignee, creator, reviewer, public and admin-created tasks
+        if user_can_view_task(user, task):
             return True
         
-        # Public tasks (assigned_to_all=True) are visible to everyone
-        if task.assigned_to_all:
-            return True
-        
-        # Tasks created by administrators are visible to all by default
-        admin_users = User.objects.filter(
-            Q(is_superuser=True) | 
-            Q(groups__name='Admin') |
-            Q(is_staff=True)
-        )
-        if task.created_by in admin_users:
-            return True
-        
-        # Team-based visibility (if user is in same team/project)
-        if hasattr(task, 'project') and hasattr(user, 'team_memberships'):
-            user_projects = user.team_memberships.values_list('project_id', flat=True)
-            if task.project_id in user_projects:
-                return True
-        
         # Department/category-based visibility for team leads
-        if user.groups.filter(name__in=['Team Lead', 'Manager']).exists():
+        if has_group(user, 'Team Lead', 'Manager'):
             if hasattr(user, 'managed_categories'):
                 return task.category in user.managed_categories.all()
         
@@ -489,34 +390,34 @@ class TaskDetailView(LoginRequiredMixin, DetailView):
         """Team management edit permissions"""
         return (user == task.created_by or 
                 user == task.assigned_to or 
-                user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists())
+                has_group(user, 'Admin', 'Manager', 'Team Lead'))
 
     def can_submit_task(self, user, task):
         """Team management submission permissions"""
         return (user == task.assigned_to or 
                 (task.assigned_to_all and user.is_authenticated) or
-                user.groups.filter(name__in=['Team Member', 'Contributor']).exists())
+                has_group(user, 'Team Member', 'Contributor'))
 
     def can_review_task(self, user, task):
         """Team management review permissions"""
         return (user == task.reviewer or 
                 user == task.created_by or
-                user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead', 'Senior Developer']).exists())
+                has_group(user, 'Admin', 'Manager', 'Team Lead', 'Senior Developer'))
 
     def can_manage_visibility(self, user, task):
         """Check if user can manage task visibility"""
         return (user == task.created_by or 
-                user.groups.filter(name__in=['Admin', 'Manager']).exists())
+                has_group(user, 'Admin', 'Manager'))
 
     def can_assign_team(self, user, task):
         """Check if user can assign team members to task"""
         return (user == task.created_by or 
-                user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists())
+                has_group(user, 'Admin', 'Manager', 'Team Lead'))
 
     def can_clone_task(self, user, task):
         """Check if user can clone the task"""
         return (self.can_view_task(user, task) and 
-                user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead', 'Senior Developer']).exists())
+                has_group(user, 'Admin', 'Manager', 'Team Lead', 'Senior Developer'))
 
 
 class TaskCreateView(LoginRequiredMixin, CreateView):
@@ -537,7 +438,7 @@ class TaskCreateView(LoginRequiredMixin, CreateView):
         form.instance.created_by = self.request.user
 
         # Team management: Auto-set visibility for admin-created tasks
-        if self.request.user.groups.filter(name__in=['Admin', 'Manager']).exists():
+        if has_group(self.request.user, 'Admin', 'Manager'):
             if not form.cleaned_data.get('assigned_to'):
                 form.instance.assigned_to_all = True  # Admin tasks visible to all by default
 
@@ -555,15 +456,13 @@ class TaskCreateView(LoginRequiredMixin, CreateView):
             self.handle_file_uploads(task, files)
 
         # Create initial activity log
-        UserActivity.objects.create(
-            user=self.request.user,
-            activity_type='task_create',
-            description=f"Created task: {task.title}",
-            metadata={
-                'task_id': task.id,
-                'task_title': task.title,
-                'category': task.category.name if task.category else None
-            }
+        activity.record(
+            self.request.user,
+            'task_create',
+            f"Created task: {task.title}",
+            related_object_id=task.id,
+            related_object_type='task',
+            additional_info=f"Category: {task.category.name}" if task.category else '',
         )
 
         messages.success(
@@ -575,7 +474,6 @@ class TaskCreateView(LoginRequiredMixin, CreateView):
     def handle_file_uploads(self, task, files):
         """Handle multiple file uploads for task"""
         batch_id = str(uuid.uuid4())
-        drive_service = GoogleDriveService()
 
         # Create upload batch
         batch = TaskFileUploadBatch.objects.create(
@@ -592,37 +490,29 @@ class TaskCreateView(LoginRequiredMixin, CreateView):
                 # Determine file type
                 file_type = self.determine_file_type(file.name)
                 
-                # Upload to Google Drive if configured
-                drive_file_id = None
-                drive_url = None
-                if hasattr(settings, 'GOOGLE_DRIVE_ENABLED') and settings.GOOGLE_DRIVE_ENABLED:
-                    try:
-                        drive_result = drive_service.upload_file(
-                            file, 
-                            f"tasks/{task.id}/",
-                            description=f"File for task: {task.title}"
-                        )
-                        drive_file_id = drive_result.get('id')
-                        drive_url = drive_result.get('webViewLink')
-                    except Exception as e:
-                        print(f"Drive upload failed: {e}")
-
-                # Create TaskFile record
-                task_file = TaskFile.objects.create(
-                    task=task,
-                    uploaded_by=self.request.user,
-                    filename=file.name,
-                    original_filename=file.name,
-                    file_type=file_type,
-                    file_size=file.size,
-                    mime_type=file.content_type,
-                    drive_file_id=drive_file_id,
-                    drive_file_url=drive_url,
-                    local_file_path=f"task_files/{task.id}/{file.name}",
-                )
-
-                # Save file locally as backup
-                self.save_file_locally(file, task_file.local_file_path)
+                # Save file locally, shared with identical uploads
+                blob = store_upload(file)
+                try:
+                    task_file = TaskFile.objects.create(
+                        task=task,
+                        uploaded_by=self.request.user,
+                        filename=file.name,
+                        original_filename=file.name,
+                        file_type=file_type,
+                        file_size=file.size,
+                        mime_type=file.content_type,
+                        local_file_path=blob.path,
+                        blob=blob,
+                    )
+                except Exception:
+                    release(blob.pk)
+                    raise
+
+                # Google Drive copies are uploaded by the background queue
+                if drive_enabled():
+                    enqueue_drive_upload(
+                        task_file, f"tasks/{task.id}/", description=f"File for task: {task.title}"
+                    )
                 uploaded_count += 1
 
             except Exception as e:
@@ -654,15 +544,6 @@ class TaskCreateView(LoginRequiredMixin, CreateView):
         else:
             return 'other'
 
-    def save_file_locally(self, file, file_path):
-        """Save file to local storage as backup"""
-        full_path = os.path.join(settings.MEDIA_ROOT, file_path)
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-        
-        with open(full_path, 'wb+') as destination:
-            for chunk in file.chunks():
-                destination.write(chunk)
-
     def get_success_url(self):
         return reverse('tasks:task-detail', kwargs={'pk': self.object.pk})
 
@@ -678,7 +559,7 @@ class TaskEditView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         user = self.request.user
         return (user == task.created_by or 
                 user == task.assigned_to or 
-                user.groups.filter(name__in=['Teacher', 'Admin']).exists())
+                has_group(user, 'Teacher', 'Admin'))
 
     def form_valid(self, form):
         # Track changes
@@ -689,14 +570,13 @@ class TaskEditView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 
         # Log changes
         if changes:
-            UserActivity.objects.create(
-                user=self.request.user,
-                activity_type='task_update',
-                description=f"Updated task: {self.object.title}",
-                metadata={
-                    'task_id': self.object.id,
-                    'changes': changes
-                }
+            activity.record(
+                self.request.user,
+                'task_update',
+                f"Updated task: {self.object.title}",
+                related_object_id=self.object.id,
+                related_object_type='task',
+                additional_info=json.dumps(changes, default=str),
             )
 
         messages.success(self.request, f'Task "{self.object.title}" updated successfully.')
@@ -735,20 +615,18 @@ class TaskDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         task = self.get_object()
         user = self.request.user
         return (user == task.created_by or 
-                user.groups.filter(name__in=['Admin']).exists())
+                has_group(user, 'Admin'))
 
     def delete(self, request, *args, **kwargs):
         task = self.get_object()
         
         # Log deletion
-        UserActivity.objects.create(
-            user=request.user,
-            activity_type='task_delete',
-            description=f"Deleted task: {task.title}",
-            metadata={
-                'task_id': task.id,
-                'task_title': task.title
-            }
+        activity.record(
+            request.user,
+            'task_delete',
+            f"Deleted task: {task.title}",
+            related_object_id=task.id,
+            related_object_type='task',
         )
 
         messages.success(request, f'Task "{task.title}" deleted successfully.')
@@ -770,8 +648,8 @@ class BulkTaskUploadView(LoginRequiredMixin, CreateView):
 
         response = super().form_valid(form)
         
-        # Process the file asynchronously (or synchronously for demo)
-        self.process_bulk_upload(self.object)
+        # Process the file in the background
+        enqueue_bulk_upload(self.object)
 
         messages.success(
             self.request, 
@@ -779,112 +657,6 @@ class BulkTaskUploadView(LoginRequiredMixin, CreateView):
         )
         return response
 
-    def process_bulk_upload(self, upload):
-        """Process the uploaded file and create tasks"""
-        try:
-            upload.status = 'processing'
-            upload.save()
-
-            if upload.file_type == 'csv':
-                tasks_data = self.read_csv_file(upload.file)
-            elif upload.file_type == 'excel':
-                tasks_data = self.read_excel_file(upload.file)
-            else:
-                raise ValueError("Unsupported file type")
-
-            upload.total_rows = len(tasks_data)
-            upload.save()
-
-            success_count = 0
-            error_messages = []
-            success_messages = []
-
-            for row_num, task_data in enumerate(tasks_data, 1):
-                try:
-                    task = self.create_task_from_row(task_data, upload)
-                    success_count += 1
-                    success_messages.append(f"Row {row_num}: Created task '{task.title}'")
-                except Exception as e:
-                    error_messages.append(f"Row {row_num}: {str(e)}")
-
-            upload.successful_imports = success_count
-            upload.failed_imports = len(tasks_data) - success_count
-            upload.error_log = '\n'.join(error_messages)
-            upload.success_log = '\n'.join(success_messages)
-            upload.status = 'completed' if error_messages == [] else 'partial'
-            upload.processed_at = timezone.now()
-            upload.save()
-
-        except Exception as e:
-            upload.status = 'failed'
-            upload.error_log = str(e)
-            upload.processed_at = timezone.now()
-            upload.save()
-
-    def read_csv_file(self, file):
-        """Read CSV file and return task data"""
-        file.seek(0)
-        decoded_file = file.read().decode('utf-8')
-        reader = csv.DictReader(decoded_file.splitlines())
-        return list(reader)
-
-    def read_excel_file(self, file):
-        """Read Excel file and return task data"""
-        if not HAS_PANDAS:
-            raise ValueError("Excel files require pandas. Please install pandas or use CSV format.")
-        file.seek(0)
-        df = pd.read_excel(file)
-        return df.to_dict('records')
-
-    def create_task_from_row(self, row_data, upload):
-        """Create a task from a row of data"""
-        # Map CSV columns to task fields
-        title = row_data.get('title') or row_data.get('Title')
-        if not title:
-            raise ValueError("Title is required")
-
-        # Check for duplicates if enabled
-        if upload.skip_duplicates and Task.objects.filter(title=title).exists():
-            raise ValueError(f"Task with title '{title}' already exists")
-
-        # Parse other fields
-        description = row_data.get('description', '')
-        priority = row_data.get('priority', upload.default_priority)
-        estimated_hours = float(row_data.get('estimated_hours', 1.0))
-        
-        # Parse due date
-        due_date = None
-        due_date_str = row_data.get('due_date')
-        if due_date_str:
-            try:
-                due_date = parse_datetime(due_date_str)
-            except:
-                pass
-
-        # Get or create category
-        category = upload.default_category
-        category_name = row_data.get('category')
-        if category_name:
-            category, _ = TaskCategory.objects.get_or_create(
-                name=category_name,
-                defaults={'description': f'Auto-created from bulk upload'}
-            )
-
-        # Create the task
-        task = Task.objects.create(
-            title=title,
-            description=description,
-            category=category,
-            priority=priority,
-            estimated_hours=estimated_hours,
-            due_date=due_date,
-            created_by=upload.uploaded_by,
-            import_batch=upload.batch_id,
-            assigned_to_all=True  # Bulk uploaded tasks are usually for all students
-        )
-
-        return task
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['categories'] = TaskCategory.objects.all()
@@ -894,18 +666,24 @@ class BulkTaskUploadView(LoginRequiredMixin, CreateView):
         return context
 
 
+def can_submit_to_task(user, task):
+    """
+    Allow submissions and file uploads if:
+    1. User is assigned to the task
+    2. Task is assigned to all students and user is a student
+    3. Task is unassigned (anyone can submit)
+    """
+    return (user.pk == task.assigned_to_id or
+            (task.assigned_to_all and has_group(user, 'Student')) or
+            task.assigned_to_id is None)
+
+
 @login_required
 def submit_task(request, task_id):
     """Handle task submission with files and external links"""
     task = get_object_or_404(Task, id=task_id)
     
-    # Check permissions - allow submission if:
-    # 1. User is assigned to the task
-    # 2. Task is assigned to all students and user is a student
-    # 3. Task is unassigned (anyone can submit)
-    if not (request.user == task.assigned_to or 
-            (task.assigned_to_all and request.user.groups.filter(name='Student').exists()) or
-            task.assigned_to is None):
+    if not can_submit_to_task(request.user, task):
         raise PermissionDenied("You cannot submit to this task.")
 
     if request.method == 'POST':
@@ -938,44 +716,37 @@ def submit_task(request, task_id):
             uploaded_files = []
             
             for file in files:
-                # Save file to media directory
-                import os
-                from django.core.files.storage import default_storage
-                from django.core.files.base import ContentFile
-                
-                # Create submission directory
-                submission_dir = f"submissions/{task.id}/{submission.id}/"
-                os.makedirs(os.path.join(settings.MEDIA_ROOT, submission_dir), exist_ok=True)
-                
-                # Save file
-                file_path = default_storage.save(
-                    f"{submission_dir}{file.name}",
-                    ContentFile(file.read())
-                )
-                
-                # Create TaskFile record
-                task_file = TaskFile.objects.create(
-                    task=task,
-                    uploaded_by=request.user,
-                    filename=file.name,
-                    original_filename=file.name,
-                    file_type=get_file_type_from_extension(file.name),
-                    file_size=file.size,
-                    mime_type=file.content_type,
-                    local_file_path=file_path,
-                    description=f"Submission file for: {submission.title}"
-                )
+                # Stream the file into the blob store once; identical
+                # content already stored is shared instead of rewritten
+                blob = store_upload(file)
+                try:
+                    task_file = TaskFile.objects.create(
+                        task=task,
+                        uploaded_by=request.user,
+                        filename=file.name,
+                        original_filename=file.name,
+                        file_type=get_file_type_from_extension(file.name),
+                        file_size=file.size,
+                        mime_type=file.content_type,
+                        local_file_path=blob.path,
+                        blob=blob,
+                        description=f"Submission file for: {submission.title}"
+                    )
+                except Exception:
+                    release(blob.pk)
+                    raise
                 uploaded_files.append(task_file)
 
             # Update submission with file if files were uploaded
             if uploaded_files:
-                # Save the first file to the submission's file field
-                if 'file' in request.FILES:
-                    submission.file = request.FILES['file']
-                elif 'submission_files' in request.FILES:
-                    submission.file = request.FILES.getlist('submission_files')[0]
-                    
-                submission.save()
+                # Point the submission's file field at the first file's blob
+                # rather than writing the upload a second time
+                first_blob = uploaded_files[0].blob
+                acquire(first_blob)
+                submission.blob = first_blob
+                submission.file.name = first_blob.path
+                submission.original_filename = uploaded_files[0].original_filename
+                submission.save(update_fields=['blob', 'file', 'original_filename'])
 
             # Update task status and progress based on completion
             completion_percentage = request.POST.get('completion_percentage')
@@ -993,10 +764,10 @@ def submit_task(request, task_id):
                 task.save()
 
             # Log activity
-            UserActivity.objects.create(
-                user=request.user,
-                activity_type='task_submit',
-                description=f"Submitted solution for task: {task.title} | Submission ID: {submission.id} | Files: {len(uploaded_files)} | External URL: {bool(submission.external_url)} | Completion: {completion_percentage}",
+            activity.record(
+                request.user,
+                'task_submit',
+                f"Submitted solution for task: {task.title} | Submission ID: {submission.id} | Files: {len(uploaded_files)} | External URL: {bool(submission.external_url)} | Completion: {completion_percentage}",
                 related_object_id=submission.id,
                 related_object_type='TaskSubmission'
             )
@@ -1049,7 +820,7 @@ def task_progress(request, task_id):
     # Check permissions
     if not (request.user == task.assigned_to or 
             request.user == task.created_by or
-            request.user.groups.filter(name__in=['Teacher', 'Admin']).exists()):
+            has_group(request.user, 'Teacher', 'Admin')):
         return JsonResponse({'error': 'Permission denied'}, status=403)
 
     if request.method == 'POST':
@@ -1073,15 +844,12 @@ def task_progress(request, task_id):
                 task.save()
 
                 # Log activity
-                UserActivity.objects.create(
-                    user=request.user,
-                    activity_type='task_progress_update',
-                    description=f"Updated progress for task: {task.title} to {new_progress}%",
-                    metadata={
-                        'task_id': task.id,
-                        'old_progress': task.progress_percentage,
-                        'new_progress': new_progress
-                    }
+                activity.record(
+                    request.user,
+                    'task_progress_update',
+                    f"Updated progress for task: {task.title} to {new_progress}%",
+                    related_object_id=task.id,
+                    related_object_type='task',
                 )
 
                 return JsonResponse({
@@ -1110,31 +878,32 @@ def my_tasks(request):
     
     # Admin-created tasks visible to all
     admin_tasks = Task.objects.filter(
-        created_by__in=User.objects.filter(
-            Q(is_superuser=True) | Q(groups__name='Admin')
-        )
+        created_by__in=dashboard_admins()
     ).exclude(assigned_to=user).exclude(created_by=user)
     
-    # Combine all visible tasks
-    all_tasks = (assigned_tasks | created_tasks | public_tasks | admin_tasks).distinct()
+    # Every task the user is related to or that is visible to everyone
+    visible_scope = Task.objects.filter(visible_to(user))
+    all_tasks = visible_scope
     
     # Apply additional filters
     status_filter = request.GET.get('status')
     if status_filter:
         all_tasks = all_tasks.filter(status=status_filter)
 
-    # Team management statistics
-    stats = {
-        'assigned_to_me': assigned_tasks.count(),
-        'created_by_me': created_tasks.count(),
-        'public_tasks': public_tasks.count(),
-        'admin_tasks': admin_tasks.count(),
-        'pending_my_review': Task.objects.filter(reviewer=user, status='review').count(),
-        'overdue_assigned': assigned_tasks.filter(
-            due_date__lt=timezone.now().date(),
-            status__in=['todo', 'in_progress']
-        ).count(),
-    }
+    # Team management statistics, counted in one pass over every task
+    # the user is related to
+    personal = personal_buckets(user)
+    team = team_buckets()
+    counts = aggregate_task_stats(visible_scope, {
+        'assigned_to_me': personal['assigned_to_me'],
+        'created_by_me': personal['created_by_me'],
+        'public_tasks': team['public'],
+        'admin_tasks': team['admin_created'] & ~Q(assigned_to=user) & ~Q(created_by=user),
+        'pending_my_review': personal['pending_my_review'],
+        'overdue_assigned': personal['overdue_assigned'],
+    })
+    counts.pop('total')
+    stats = counts
 
     # Recent activity and upcoming deadlines
     recent_tasks = all_tasks.order_by('-updated_at')[:5]
@@ -1203,14 +972,14 @@ def my_submissions(request):
 
 @login_required
 def export_tasks(request):
-    """Export tasks to CSV"""
+    """Export tasks, time logs or submissions as CSV, XLSX or Parquet"""
     # Get tasks based on user permissions
     user = request.user
     tasks = Task.objects.select_related('category', 'assigned_to', 'created_by')
     
-    if user.groups.filter(name='Student').exists():
+    if has_group(user, 'Student'):
         tasks = tasks.filter(Q(assigned_to=user) | Q(assigned_to_all=True))
-    elif user.groups.filter(name='Teacher').exists():
+    elif has_group(user, 'Teacher'):
         tasks = tasks.filter(
             Q(category__in=user.teachable_categories.all()) |
             Q(assigned_to=user) |
@@ -1226,36 +995,65 @@ def export_tasks(request):
     if category_filter:
         tasks = tasks.filter(category_id=category_filter)
 
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="tasks_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    export_format = request.GET.get('format', 'csv')
+    dataset = request.GET.get('dataset', 'tasks')
+    if export_format not in EXPORT_FORMATS or dataset not in EXPORT_DATASETS:
+        messages.error(request, 'Unsupported export format or dataset.')
+        return redirect('tasks:task-list')
 
-    writer = csv.writer(response)
-    writer.writerow([
-        'ID', 'Title', 'Description', 'Category', 'Status', 'Priority',
-        'Assigned To', 'Created By', 'Due Date', 'Progress', 'Estimated Hours',
-        'Actual Hours', 'Created At', 'Updated At'
-    ])
+    if export_format != 'csv' or dataset != 'tasks':
+        # Other people's submissions and time logs are for staff only
+        owner = None if user.is_staff or user.is_superuser or has_group(user, 'Teacher', 'Admin') else user
+        try:
+            return typed_export_response(dataset, export_format, tasks, owner)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('tasks:task-list')
 
-    for task in tasks:
-        writer.writerow([
-            task.id,
-            task.title,
-            task.description,
-            task.category.name if task.category else '',
-            task.get_status_display(),
-            task.get_priority_display(),
-            task.assigned_to.get_full_name() if task.assigned_to else 'All Students',
-            task.created_by.get_full_name(),
-            task.due_date.strftime('%Y-%m-%d %H:%M') if task.due_date else '',
-            f"{task.progress_percentage}%",
-            task.estimated_hours,
-            task.actual_hours,
-            task.created_at.strftime('%Y-%m-%d %H:%M'),
-            task.updated_at.strftime('%Y-%m-%d %H:%M')
-        ])
+    # Stream the CSV in batches so memory stays flat for large exports
+    statuses = dict(Task.STATUS_CHOICES)
+    priorities = dict(Task.PRIORITY_CHOICES)
+    fields = [
+        'id', 'title', 'description', 'category__name', 'status', 'priority',
+        'assigned_to_id', 'assigned_to__full_name', 'assigned_to__first_name', 'assigned_to__last_name',
+        'created_by__full_name', 'created_by__first_name', 'created_by__last_name',
+        'due_date', 'progress_percentage', 'estimated_hours', 'actual_hours',
+        'created_at', 'updated_at',
+    ]
 
-    return response
+    def rows():
+        for (task_id, title, description, category, status, priority,
+             assignee_id, assignee_full, assignee_first, assignee_last,
+             creator_full, creator_first, creator_last,
+             due_date, progress, estimated_hours, actual_hours,
+             created_at, updated_at) in iter_values(tasks, fields):
+            yield [
+                task_id,
+                title,
+                description,
+                category or '',
+                statuses.get(status, status),
+                priorities.get(priority, priority),
+                full_name(assignee_full, assignee_first, assignee_last) if assignee_id else 'All Students',
+                full_name(creator_full, creator_first, creator_last),
+                due_date.strftime('%Y-%m-%d %H:%M') if due_date else '',
+                f"{progress}%",
+                estimated_hours,
+                actual_hours,
+                created_at.strftime('%Y-%m-%d %H:%M'),
+                updated_at.strftime('%Y-%m-%d %H:%M')
+            ]
+
+    return streaming_csv_response(
+        [
+            'ID', 'Title', 'Description', 'Category', 'Status', 'Priority',
+            'Assigned To', 'Created By', 'Due Date', 'Progress', 'Estimated Hours',
+            'Actual Hours', 'Created At', 'Updated At'
+        ],
+        rows(),
+        timestamped_filename('tasks_export', 'csv'),
+        gzip=wants_gzip(request),
+    )
 
 
 @login_required
@@ -1267,9 +1065,9 @@ def task_calendar(request):
     tasks = Task.objects.filter(due_date__isnull=False)
     
     # Apply user permissions
-    if user.groups.filter(name='Student').exists():
+    if has_group(user, 'Student'):
         tasks = tasks.filter(Q(assigned_to=user) | Q(assigned_to_all=True))
-    elif user.groups.filter(name='Teacher').exists():
+    elif has_group(user, 'Teacher'):
         tasks = tasks.filter(
             Q(category__in=user.teachable_categories.all()) |
             Q(assigned_to=user) |
@@ -1380,9 +1178,9 @@ def task_stats_api(request):
     user = request.user
     
     # Base queryset based on user permissions
-    if user.groups.filter(name='Student').exists():
+    if has_group(user, 'Student'):
         tasks = Task.objects.filter(Q(assigned_to=user) | Q(assigned_to_all=True))
-    elif user.groups.filter(name='Teacher').exists():
+    elif has_group(user, 'Teacher'):
         tasks = Task.objects.filter(
             Q(category__in=user.teachable_categories.all()) |
             Q(assigned_to=user) |
@@ -1391,21 +1189,23 @@ def task_stats_api(request):
     else:
         tasks = Task.objects.all()
 
-    # Calculate statistics
+    # Calculate statistics in a single aggregate query
+    counts = aggregate_task_stats(tasks, {
+        **overview_buckets(),
+        **status_buckets(),
+        **priority_buckets(),
+    })
     stats = {
-        'total_tasks': tasks.count(),
-        'completed_tasks': tasks.filter(status='completed').count(),
-        'in_progress_tasks': tasks.filter(status='in_progress').count(),
-        'overdue_tasks': tasks.filter(
-            due_date__lt=timezone.now().date(),
-            status__in=['todo', 'in_progress']
-        ).count(),
+        'total_tasks': counts['total'],
+        'completed_tasks': counts['completed'],
+        'in_progress_tasks': counts['in_progress'],
+        'overdue_tasks': counts['overdue'],
         'tasks_by_priority': {
-            priority[0]: tasks.filter(priority=priority[0]).count()
+            priority[0]: counts[f'priority_{priority[0]}']
             for priority in Task.PRIORITY_CHOICES
         },
         'tasks_by_status': {
-            status[0]: tasks.filter(status=status[0]).count()
+            status[0]: counts[f'status_{status[0]}']
             for status in Task.STATUS_CHOICES
         },
         'completion_rate': 0
@@ -1431,9 +1231,9 @@ def search_tasks_api(request):
     tasks = Task.objects.select_related('category', 'assigned_to')
 
     # Apply user permissions
-    if user.groups.filter(name='Student').exists():
+    if has_group(user, 'Student'):
         tasks = tasks.filter(Q(assigned_to=user) | Q(assigned_to_all=True))
-    elif user.groups.filter(name='Teacher').exists():
+    elif has_group(user, 'Teacher'):
         tasks = tasks.filter(
             Q(category__in=user.teachable_categories.all()) |
             Q(assigned_to=user) |
@@ -1489,21 +1289,18 @@ def get_user_task_permissions(user, task):
         permissions['can_watch'] = True
 
     # Admin-created tasks are visible to all
-    admin_users = User.objects.filter(
-        Q(is_superuser=True) | Q(groups__name='Admin')
-    )
-    if task.created_by in admin_users:
+    elif user_can_view_task(user, task):
         permissions['can_view'] = True
         permissions['can_comment'] = True
 
     # Edit permission
     if (user == task.created_by or user == task.assigned_to or 
-        user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists()):
+        has_group(user, 'Admin', 'Manager', 'Team Lead')):
         permissions['can_edit'] = True
 
     # Delete permission
     if (user == task.created_by or 
-        user.groups.filter(name__in=['Admin', 'Manager']).exists()):
+        has_group(user, 'Admin', 'Manager')):
         permissions['can_delete'] = True
 
     # Submit permission
@@ -1513,11 +1310,11 @@ def get_user_task_permissions(user, task):
 
     # Review permission
     if (user == task.reviewer or 
-        user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead', 'Senior Developer']).exists()):
+        has_group(user, 'Admin', 'Manager', 'Team Lead', 'Senior Developer')):
         permissions['can_review'] = True
 
     # Team management permissions
-    if user.groups.filter(name__in=['Admin', 'Manager']).exists():
+    if has_group(user, 'Admin', 'Manager'):
         permissions['can_manage_visibility'] = True
         permissions['can_assign_team'] = True
         permissions['can_clone'] = True
@@ -1558,10 +1355,10 @@ def clone_task(request, pk):
     cloned_task.technologies.set(original_task.technologies.all())
     
     # Log the activity
-    UserActivity.objects.create(
-        user=request.user,
-        activity_type='other',
-        description=f"Cloned task: {original_task.title}",
+    activity.record(
+        request.user,
+        'other',
+        f"Cloned task: {original_task.title}",
         related_object_id=cloned_task.id,
         related_object_type='task'
     )
@@ -1591,10 +1388,10 @@ def assign_team(request, pk):
                 task.save()
                 
                 # Log the activity
-                UserActivity.objects.create(
-                    user=request.user,
-                    activity_type='other',
-                    description=f"Assigned task '{task.title}' to {user.get_full_name()}",
+                activity.record(
+                    request.user,
+                    'other',
+                    f"Assigned task '{task.title}' to {user.get_full_name()}",
                     related_object_id=task.id,
                     related_object_type='task'
                 )
@@ -1609,10 +1406,10 @@ def assign_team(request, pk):
             task.save()
             
             # Log the activity
-            UserActivity.objects.create(
-                user=request.user,
-                activity_type='other',
-                description=f"Assigned task '{task.title}' to all team members",
+            activity.record(
+                request.user,
+                'other',
+                f"Assigned task '{task.title}' to all team members",
                 related_object_id=task.id,
                 related_object_type='task'
             )
@@ -1675,10 +1472,10 @@ def manage_visibility(request, pk):
         task.save()
         
         # Log the activity
-        UserActivity.objects.create(
-            user=request.user,
-            activity_type='other',
-            description=f"Changed visibility of task '{task.title}' to {visibility_type}",
+        activity.record(
+            request.user,
+            'other',
+            f"Changed visibility of task '{task.title}' to {visibility_type}",
             related_object_id=task.id,
             related_object_type='task'
         )
@@ -1929,71 +1726,81 @@ def task_analytics(request):
             Q(assigned_to=user) | Q(created_by=user) | Q(assigned_to_all=True)
         ).distinct()
     
-    # Filter by date range
-    period_tasks = tasks_qs.filter(created_at__gte=start_date)
-    
-    # Task metrics
-    task_metrics = {
-        'total_tasks': tasks_qs.count(),
-        'period_tasks': period_tasks.count(),
-        'completed_tasks': tasks_qs.filter(status='completed').count(),
-        'in_progress_tasks': tasks_qs.filter(status='in_progress').count(),
-        'overdue_tasks': tasks_qs.filter(
-            due_date__lt=timezone.now(),
-            status__in=['todo', 'in_progress']
-        ).count(),
-        'completion_rate': 0,
-    }
-    
-    if task_metrics['total_tasks'] > 0:
-        task_metrics['completion_rate'] = round(
-            (task_metrics['completed_tasks'] / task_metrics['total_tasks']) * 100, 1
-        )
-    
-    # Priority distribution
-    priority_stats = tasks_qs.aggregate(
-        critical=Count(Case(When(priority='critical', then=1), output_field=IntegerField())),
-        urgent=Count(Case(When(priority='urgent', then=1), output_field=IntegerField())),
-        high=Count(Case(When(priority='high', then=1), output_field=IntegerField())),
-        medium=Count(Case(When(priority='medium', then=1), output_field=IntegerField())),
-        low=Count(Case(When(priority='low', then=1), output_field=IntegerField())),
-    )
-    
-    # Status distribution
-    status_stats = tasks_qs.aggregate(
-        todo=Count(Case(When(status='todo', then=1), output_field=IntegerField())),
-        in_progress=Count(Case(When(status='in_progress', then=1), output_field=IntegerField())),
-        review=Count(Case(When(status='review', then=1), output_field=IntegerField())),
-        completed=Count(Case(When(status='completed', then=1), output_field=IntegerField())),
-        blocked=Count(Case(When(status='blocked', then=1), output_field=IntegerField())),
-    )
-    
-    # Time tracking metrics
-    time_logs = TaskTimeLog.objects.filter(task__in=tasks_qs)
-    time_metrics = {
-        'total_logged_hours': round((time_logs.aggregate(Sum('duration_minutes'))['duration_minutes__sum'] or 0) / 60, 1),
-        'avg_task_duration': round(time_logs.aggregate(Avg('duration_minutes'))['duration_minutes__avg'] or 0, 1),
-        'active_timers': time_logs.filter(end_time__isnull=True).count(),
-    }
-    
-    # Team performance (if admin/team lead)
+    can_view_team_data = user.is_staff or getattr(user, 'role', '') in ['admin', 'team_lead']
     team_performance = {}
-    if user.is_staff or getattr(user, 'role', '') in ['admin', 'team_lead']:
-        # Get top performers
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        performers = User.objects.filter(
-            assigned_tasks__in=tasks_qs.filter(status='completed')
-        ).annotate(
-            completed_count=Count('assigned_tasks', filter=Q(assigned_tasks__status='completed')),
-            total_points=Sum('assigned_tasks__points_value', filter=Q(assigned_tasks__status='completed'))
-        ).order_by('-completed_count')[:5]
+    
+    if can_view_team_data:
+        # Team viewers see every task: read the pre-aggregated daily cube
+        totals, priority_stats, status_stats = cube.summary(timezone.localdate(start_date))
+        task_metrics = {
+            'total_tasks': totals['total_tasks'],
+            'period_tasks': totals['period_tasks'],
+            'completed_tasks': totals['completed_tasks'],
+            'in_progress_tasks': totals['in_progress_tasks'],
+            'overdue_tasks': tasks_qs.filter(
+                due_date__lt=timezone.now(),
+                status__in=['todo', 'in_progress']
+            ).count(),
+            'completion_rate': 0,
+        }
+        time_metrics = {
+            'total_logged_hours': round(totals['minutes_logged'] / 60, 1),
+            'avg_task_duration': round(totals['minutes_logged'] / totals['time_logs'], 1) if totals['time_logs'] else 0,
+            'active_timers': TaskTimeLog.objects.filter(end_time__isnull=True).count(),
+        }
         
+        performers = cube.top_performers(5)
         team_performance = {
             'top_performers': performers,
             'total_team_points': sum(p.total_points or 0 for p in performers),
         }
+    else:
+        # Filter by date range
+        period_tasks = tasks_qs.filter(created_at__gte=start_date)
+        
+        # Task metrics
+        task_metrics = {
+            'total_tasks': tasks_qs.count(),
+            'period_tasks': period_tasks.count(),
+            'completed_tasks': tasks_qs.filter(status='completed').count(),
+            'in_progress_tasks': tasks_qs.filter(status='in_progress').count(),
+            'overdue_tasks': tasks_qs.filter(
+                due_date__lt=timezone.now(),
+                status__in=['todo', 'in_progress']
+            ).count(),
+            'completion_rate': 0,
+        }
+        
+        # Priority distribution
+        priority_stats = tasks_qs.aggregate(
+            critical=Count(Case(When(priority='critical', then=1), output_field=IntegerField())),
+            urgent=Count(Case(When(priority='urgent', then=1), output_field=IntegerField())),
+            high=Count(Case(When(priority='high', then=1), output_field=IntegerField())),
+            medium=Count(Case(When(priority='medium', then=1), output_field=IntegerField())),
+            low=Count(Case(When(priority='low', then=1), output_field=IntegerField())),
+        )
+        
+        # Status distribution
+        status_stats = tasks_qs.aggregate(
+            todo=Count(Case(When(status='todo', then=1), output_field=IntegerField())),
+            in_progress=Count(Case(When(status='in_progress', then=1), output_field=IntegerField())),
+            review=Count(Case(When(status='review', then=1), output_field=IntegerField())),
+            completed=Count(Case(When(status='completed', then=1), output_field=IntegerField())),
+            blocked=Count(Case(When(status='blocked', then=1), output_field=IntegerField())),
+        )
+        
+        # Time tracking metrics
+        time_logs = TaskTimeLog.objects.filter(task__in=tasks_qs)
+        time_metrics = {
+            'total_logged_hours': round((time_logs.aggregate(Sum('duration_minutes'))['duration_minutes__sum'] or 0) / 60, 1),
+            'avg_task_duration': round(time_logs.aggregate(Avg('duration_minutes'))['duration_minutes__avg'] or 0, 1),
+            'active_timers': time_logs.filter(end_time__isnull=True).count(),
+        }
+    
+    if task_metrics['total_tasks'] > 0:
+        task_metrics['completion_rate'] = round(
+            (task_metrics['completed_tasks'] / task_metrics['total_tasks']) * 100, 1
+        )
     
     # Recent activities
     recent_completed = tasks_qs.filter(
@@ -2011,7 +1818,7 @@ def task_analytics(request):
         'date_range': date_range,
         'start_date': start_date,
         'end_date': end_date,
-        'can_view_team_data': user.is_staff or getattr(user, 'role', '') in ['admin', 'team_lead'],
+        'can_view_team_data': can_view_team_data,
     }
     
     return render(request, 'tasks/analytics.html', context)
@@ -2023,24 +1830,20 @@ def team_dashboard(request):
     user = request.user
     
     # Get team-wide statistics
-    if user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists():
+    if has_group(user, 'Admin', 'Manager', 'Team Lead'):
         # Team leads see all team tasks
         team_tasks = Task.objects.all()
     else:
         # Regular users see their visible tasks
-        team_tasks = Task.objects.filter(
-            Q(assigned_to=user) | 
-            Q(created_by=user) |
-            Q(assigned_to_all=True) |
-            Q(created_by__groups__name='Admin')
-        ).distinct()
+        team_tasks = Task.objects.filter(visible_to(user))
     
+    counts = aggregate_task_stats(team_tasks, overview_buckets())
     context = {
         'team_tasks': team_tasks,
         'team_stats': {
-            'total_tasks': team_tasks.count(),
-            'active_tasks': team_tasks.filter(status__in=['todo', 'in_progress']).count(),
-            'completed_tasks': team_tasks.filter(status='completed').count(),
+            'total_tasks': counts['total'],
+            'active_tasks': counts['active'],
+            'completed_tasks': counts['completed'],
         }
     }
     
@@ -2108,7 +1911,7 @@ def update_task_status(request, pk):
         
         # Check permissions
         if not (user == task.created_by or user == task.assigned_to or 
-                user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists()):
+                has_group(user, 'Admin', 'Manager', 'Team Lead')):
             messages.error(request, "You don't have permission to update this task status.")
             return redirect('tasks:task-detail', pk=pk)
         
@@ -2129,10 +1932,10 @@ def update_task_status(request, pk):
             task.save()
             
             # Log the status change
-            UserActivity.objects.create(
-                user=user,
-                activity_type='other',
-                description=f"Updated task status: {old_status} → {new_status}",
+            activity.record(
+                user,
+                'other',
+                f"Updated task status: {old_status} → {new_status}",
                 related_object_id=task.id,
                 related_object_type='task',
                 additional_info=f"Task: {task.title}. Notes: {notes}" if notes else f"Task: {task.title}"
@@ -2224,10 +2027,10 @@ def select_recurring_task(request):
             )
             
             # Log the activity
-            UserActivity.objects.create(
-                user=request.user,
-                activity_type='other',
-                description=f"Selected recurring task: {template_task.title} ({selection_type})",
+            activity.record(
+                request.user,
+                'other',
+                f"Selected recurring task: {template_task.title} ({selection_type})",
                 related_object_id=template_task.id,
                 related_object_type='task'
             )
@@ -2238,10 +2041,10 @@ def select_recurring_task(request):
             )
             
             # Log the activity
-            UserActivity.objects.create(
-                user=request.user,
-                activity_type='other',
-                description=f"Deselected recurring task: {template_task.title} ({selection_type})",
+            activity.record(
+                request.user,
+                'other',
+                f"Deselected recurring task: {template_task.title} ({selection_type})",
                 related_object_id=template_task.id,
                 related_object_type='task'
             )
@@ -2257,7 +2060,7 @@ def create_recurring_template(request):
     """Create a new recurring task template"""
     # Check if user has permission to create templates
     if not (request.user.is_superuser or 
-            request.user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists()):
+            has_group(request.user, 'Admin', 'Manager', 'Team Lead')):
         from django.contrib import messages
         from django.shortcuts import redirect
         messages.error(request, 'You do not have permission to create recurring task templates.')
@@ -2289,10 +2092,10 @@ def create_recurring_template(request):
             messages.success(request, f'Recurring task template "{template.title}" created successfully!')
             
             # Log the activity
-            UserActivity.objects.create(
-                user=request.user,
-                activity_type='task_created',
-                description=f"Created recurring task template: {template.title}",
+            activity.record(
+                request.user,
+                'task_created',
+                f"Created recurring task template: {template.title}",
                 related_object_id=template.id,
                 related_object_type='task'
             )
@@ -2334,7 +2137,7 @@ def recurring_templates_view(request):
     """View and manage recurring task templates"""
     # Check if user has permission to manage templates
     if not (request.user.is_superuser or 
-            request.user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists()):
+            has_group(request.user, 'Admin', 'Manager', 'Team Lead')):
         from django.contrib import messages
         from django.shortcuts import redirect
         messages.error(request, 'You do not have permission to manage recurring task templates.')
@@ -2378,7 +2181,7 @@ def recurring_templates_view(request):
 @require_http_methods(["POST"])
 def generate_recurring_tasks_manual(request):
     """Manually trigger generation of recurring tasks"""
-    if not request.user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists():
+    if not has_group(request.user, 'Admin', 'Manager', 'Team Lead'):
         messages.error(request, 'Permission denied.')
         return redirect('tasks:task-list')
     
@@ -2386,11 +2189,10 @@ def generate_recurring_tasks_manual(request):
         from datetime import date
         target_date = date.today()
         
-        # Generate daily tasks
-        daily_tasks = Task.generate_daily_tasks(target_date)
-        
-        # Generate weekly tasks
-        weekly_tasks = Task.generate_weekly_tasks(target_date)
+        # Generate daily and weekly tasks in one pass
+        created = RecurringTaskGenerator().generate(target_date)
+        daily_tasks = created['daily']
+        weekly_tasks = created['weekly']
         
         total_created = len(daily_tasks) + len(weekly_tasks)
         
@@ -2401,10 +2203,10 @@ def generate_recurring_tasks_manual(request):
         )
         
         # Log the activity
-        UserActivity.objects.create(
-            user=request.user,
-            activity_type='other',
-            description=f"Manually generated {total_created} recurring tasks",
+        activity.record(
+            request.user,
+            'other',
+            f"Manually generated {total_created} recurring tasks",
             additional_info=f"Daily: {len(daily_tasks)}, Weekly: {len(weekly_tasks)}"
         )
         
@@ -2425,11 +2227,10 @@ def redirect_to_enhanced_bulk_upload(request):
 # BULK UPLOAD VIEWS
 # ============================================================================
 
-@login_required
-def bulk_upload_daily_tasks(request):
-    """Bulk upload daily tasks from Excel file"""
+def queue_schedule_upload(request, kind):
+    """Store an uploaded daily/weekly Excel file and queue it for import"""
     if not (request.user.is_superuser or 
-            request.user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists()):
+            has_group(request.user, 'Admin', 'Manager', 'Team Lead')):
         messages.error(request, 'You do not have permission to bulk upload tasks.')
         return redirect('tasks:task-list')
     
@@ -2440,242 +2241,138 @@ def bulk_upload_daily_tasks(request):
         
         excel_file = request.FILES['excel_file']
         
-        try:
-            import pandas as pd
-            import uuid
-            from datetime import datetime, date
-            
-            # Read Excel file
-            df = pd.read_excel(excel_file)
-            
-            # Validate required columns
-            required_columns = ['date', 'task_title', 'task_description']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                messages.error(request, f'Missing required columns: {", ".join(missing_columns)}')
-                return redirect('tasks:create-recurring-template')
-            
-            # Generate batch ID
-            batch_id = f"daily_bulk_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            
-            # Get or create category
-            category, _ = TaskCategory.objects.get_or_create(
-                name='Daily Bulk Upload',
-                defaults={
-                    'description': 'Tasks uploaded via daily bulk upload',
-                    'color': '#3B82F6',
-                    'icon': 'fas fa-upload'
-                }
+        # Generate batch ID
+        batch_id = f"{kind}_bulk_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        
+        with transaction.atomic():
+            upload = BulkTaskUpload.objects.create(
+                file=excel_file,
+                original_filename=excel_file.name,
+                file_type='excel',
+                file_size=excel_file.size,
+                upload_kind=kind,
+                uploaded_by=request.user,
+                batch_id=batch_id,
             )
-            
-            created_count = 0
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # Parse date
-                    if pd.isna(row['date']):
-                        errors.append(f"Row {index + 2}: Date is missing")
-                        continue
-                    
-                    task_date = pd.to_datetime(row['date']).date()
-                    
-                    # Get assigned user if specified
-                    assigned_user = None
-                    if 'assigned_to_email' in df.columns and not pd.isna(row['assigned_to_email']):
-                        try:
-                            assigned_user = User.objects.get(email=row['assigned_to_email'])
-                        except User.DoesNotExist:
-                            errors.append(f"Row {index + 2}: User with email {row['assigned_to_email']} not found")
-                    
-                    # Create task
-                    task = Task.objects.create(
-                        title=str(row['task_title']),
-                        description=str(row['task_description']) if not pd.isna(row['task_description']) else '',
-                        category=category,
-                        assigned_to=assigned_user,
-                        created_by=request.user,
-                        due_date=task_date,
-                        priority=str(row.get('priority', 'medium')).lower() if 'priority' in df.columns and not pd.isna(row.get('priority')) else 'medium',
-                        estimated_hours=float(row.get('estimated_hours', 1.0)) if 'estimated_hours' in df.columns and not pd.isna(row.get('estimated_hours')) else 1.0,
-                        points_value=int(row.get('points_value', 10)) if 'points_value' in df.columns and not pd.isna(row.get('points_value')) else 10,
-                        status='todo',
-                        is_recurring=True,
-                        recurrence_type='daily',
-                        instance_date=task_date,
-                        import_batch=batch_id,
-                        assigned_to_all=True,  # Make visible to all users by default
-                        allow_member_selection=True
-                    )
-                    created_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Row {index + 2}: {str(e)}")
-            
-            # Show results
-            if created_count > 0:
-                messages.success(request, f'Successfully created {created_count} daily tasks. Batch ID: {batch_id}')
-                
-                # Log activity
-                UserActivity.objects.create(
-                    user=request.user,
-                    activity_type='bulk_upload',
-                    description=f"Bulk uploaded {created_count} daily tasks",
-                    additional_info=f"Batch ID: {batch_id}"
-                )
-            
-            if errors:
-                error_message = f"Errors encountered: {'; '.join(errors[:5])}"
-                if len(errors) > 5:
-                    error_message += f" and {len(errors) - 5} more..."
-                messages.warning(request, error_message)
-                
-        except Exception as e:
-            messages.error(request, f'Error processing Excel file: {str(e)}')
+            enqueue_bulk_upload(upload)
+        
+        messages.success(
+            request,
+            f'Upload received and queued for processing. Batch ID: {batch_id}'
+        )
     
     return redirect('tasks:create-recurring-template')
 
 
+@login_required
+def bulk_upload_daily_tasks(request):
+    """Bulk upload daily tasks from Excel file"""
+    return queue_schedule_upload(request, 'daily')
+
+
 @login_required
 def bulk_upload_weekly_tasks(request):
     """Bulk upload weekly tasks from Excel file"""
-    if not (request.user.is_superuser or 
-            request.user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists()):
-        messages.error(request, 'You do not have permission to bulk upload tasks.')
-        return redirect('tasks:task-list')
-    
-    if request.method == 'POST':
-        if 'excel_file' not in request.FILES:
-            messages.error(request, 'Please select an Excel file to upload.')
-            return redirect('tasks:create-recurring-template')
-        
-        excel_file = request.FILES['excel_file']
-        
+    return queue_schedule_upload(request, 'weekly')
+
+
+@login_required
+def bulk_upload_status(request, pk):
+    """JSON progress of a queued bulk upload"""
+    upload = get_object_or_404(BulkTaskUpload, pk=pk)
+    if not (upload.uploaded_by_id == request.user.pk or request.user.is_staff):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    return JsonResponse(upload_progress(upload))
+
+
+def _upload_metadata(header):
+    """Decode a tus ``Upload-Metadata`` header: comma-separated ``key base64value`` pairs"""
+    import base64
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in header.split(','))):
+        key, _, value = pair.partition(' ')
         try:
-            import pandas as pd
-            import uuid
-            from datetime import datetime, date
-            
-            # Read Excel file
-            df = pd.read_excel(excel_file)
-            
-            # Validate required columns
-            required_columns = ['start_date', 'end_date', 'task_title', 'task_description', 'weekday']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                messages.error(request, f'Missing required columns: {", ".join(missing_columns)}')
-                return redirect('tasks:create-recurring-template')
-            
-            # Generate batch ID
-            batch_id = f"weekly_bulk_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            
-            # Get or create category
-            category, _ = TaskCategory.objects.get_or_create(
-                name='Weekly Bulk Upload',
-                defaults={
-                    'description': 'Tasks uploaded via weekly bulk upload',
-                    'color': '#10B981',
-                    'icon': 'fas fa-calendar-week'
-                }
-            )
-            
-            created_count = 0
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # Parse dates
-                    if pd.isna(row['start_date']) or pd.isna(row['end_date']):
-                        errors.append(f"Row {index + 2}: Start date or end date is missing")
-                        continue
-                    
-                    start_date = pd.to_datetime(row['start_date']).date()
-                    end_date = pd.to_datetime(row['end_date']).date()
-                    weekday = str(row['weekday']).lower()
-                    
-                    # Validate weekday
-                    weekday_map = {
-                        'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-                        'friday': 4, 'saturday': 5, 'sunday': 6,
-                        'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3,
-                        'fri': 4, 'sat': 5, 'sun': 6
-                    }
-                    
-                    if weekday not in weekday_map:
-                        errors.append(f"Row {index + 2}: Invalid weekday '{weekday}'")
-                        continue
-                    
-                    target_weekday = weekday_map[weekday]
-                    
-                    # Get assigned user if specified
-                    assigned_user = None
-                    if 'assigned_to_email' in df.columns and not pd.isna(row['assigned_to_email']):
-                        try:
-                            assigned_user = User.objects.get(email=row['assigned_to_email'])
-                        except User.DoesNotExist:
-                            errors.append(f"Row {index + 2}: User with email {row['assigned_to_email']} not found")
-                    
-                    # Generate tasks for each week in the date range
-                    current_date = start_date
-                    while current_date <= end_date:
-                        if current_date.weekday() == target_weekday:
-                            task = Task.objects.create(
-                                title=f"{str(row['task_title'])} - Week of {current_date.strftime('%Y-%m-%d')}",
-                                description=str(row['task_description']) if not pd.isna(row['task_description']) else '',
-                                category=category,
-                                assigned_to=assigned_user,
-                                created_by=request.user,
-                                due_date=current_date,
-                                priority=str(row.get('priority', 'medium')).lower() if 'priority' in df.columns and not pd.isna(row.get('priority')) else 'medium',
-                                estimated_hours=float(row.get('estimated_hours', 2.0)) if 'estimated_hours' in df.columns and not pd.isna(row.get('estimated_hours')) else 2.0,
-                                points_value=int(row.get('points_value', 20)) if 'points_value' in df.columns and not pd.isna(row.get('points_value')) else 20,
-                                status='todo',
-                                is_recurring=True,
-                                recurrence_type='weekly',
-                                recurrence_days=weekday[:3],
-                                instance_date=current_date,
-                                import_batch=batch_id,
-                                assigned_to_all=True,  # Make visible to all users by default
-                                allow_member_selection=True
-                            )
-                            created_count += 1
-                        
-                        current_date += pd.Timedelta(days=1)
-                    
-                except Exception as e:
-                    errors.append(f"Row {index + 2}: {str(e)}")
-            
-            # Show results
-            if created_count > 0:
-                messages.success(request, f'Successfully created {created_count} weekly tasks. Batch ID: {batch_id}')
-                
-                # Log activity
-                UserActivity.objects.create(
-                    user=request.user,
-                    activity_type='bulk_upload',
-                    description=f"Bulk uploaded {created_count} weekly tasks",
-                    additional_info=f"Batch ID: {batch_id}"
-                )
-            
-            if errors:
-                error_message = f"Errors encountered: {'; '.join(errors[:5])}"
-                if len(errors) > 5:
-                    error_message += f" and {len(errors) - 5} more..."
-                messages.warning(request, error_message)
-                
-        except Exception as e:
-            messages.error(request, f'Error processing Excel file: {str(e)}')
-    
-    return redirect('tasks:create-recurring-template')
+            metadata[key] = base64.b64decode(value).decode('utf-8') if value else ''
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError(f"Invalid Upload-Metadata value for '{key}'")
+    return metadata
+
+
+def _upload_headers(response, upload):
+    response['Upload-Offset'] = str(upload.offset)
+    response['Upload-Length'] = str(upload.total_size)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@login_required
+@require_http_methods(['POST'])
+def chunked_upload_create(request, task_id):
+    """Start a resumable upload of a task file (``Upload-Length`` and ``Upload-Metadata`` headers)"""
+    task = get_object_or_404(Task, id=task_id)
+    if not can_submit_to_task(request.user, task):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    try:
+        metadata = _upload_metadata(request.headers.get('Upload-Metadata', ''))
+        total_size = int(request.headers.get('Upload-Length', ''))
+        filename = metadata.get('filename', '').strip()
+        if not filename:
+            raise ValueError("Upload-Metadata must include a filename")
+        upload = start_upload(
+            task, request.user, filename, total_size,
+            file_type=get_file_type_from_extension(filename),
+            content_type=metadata.get('filetype', ''),
+            batch_id=metadata.get('batch_id') or None,
+            total_files=int(metadata.get('total_files') or 1),
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    response = JsonResponse(upload_state(upload), status=201)
+    response['Location'] = reverse('tasks:chunked-upload', kwargs={'upload_id': upload.upload_id})
+    return _upload_headers(response, upload)
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PATCH', 'DELETE'])
+def chunked_upload(request, upload_id):
+    """Resume (HEAD), send a chunk of (PATCH), inspect (GET) or abort (DELETE) an upload"""
+    upload = get_object_or_404(ChunkedUpload.objects.select_related('batch', 'task'), upload_id=upload_id)
+    if upload.uploaded_by_id != request.user.pk:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    if request.method == 'HEAD':
+        return _upload_headers(HttpResponse(), upload)
+
+    if request.method == 'DELETE':
+        upload = abort_upload(upload)
+        return _upload_headers(JsonResponse(upload_state(upload)), upload)
+
+    if request.method == 'PATCH':
+        # Re-checked per chunk: the task may have been reassigned since the upload started
+        if not can_submit_to_task(request.user, upload.task):
+            return JsonResponse({'error': 'Permission denied'}, status=403)
+        if request.content_type != 'application/offset+octet-stream':
+            return JsonResponse({'error': 'Chunks must be sent as application/offset+octet-stream'}, status=415)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            # Read the body straight from the request stream, never request.body
+            upload = append_chunk(upload, offset, request)
+        except OffsetMismatch as e:
+            upload.offset = e.expected
+            response = JsonResponse({'error': str(e), 'offset': e.expected}, status=409)
+            return _upload_headers(response, upload)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        upload.batch.refresh_from_db()
+
+    return _upload_headers(JsonResponse(upload_state(upload)), upload)
 
 
 @login_required 
 def download_daily_template(request):
     """Download Excel template for daily tasks"""
-    import pandas as pd
-    from django.http import HttpResponse
     from datetime import datetime, timedelta
     
     # Create sample data for the template
@@ -2694,50 +2391,40 @@ def download_daily_template(request):
             'assigned_to_email': 'user@example.com'  # Optional
         })
     
-    # Create DataFrame
-    df = pd.DataFrame(sample_data)
-    
-    # Create response
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="daily_tasks_template_{datetime.now().strftime("%Y%m%d")}.xlsx"'
-    
-    # Write to Excel
-    with pd.ExcelWriter(response, engine='openpyxl') as writer:
-        # Instructions sheet
-        instructions = pd.DataFrame({
-            'INSTRUCTIONS': [
-                '1. Fill in the required columns: date, task_title, task_description',
-                '2. Optional columns: priority (low/medium/high/urgent), estimated_hours, points_value, assigned_to_email',
-                '3. Date format: YYYY-MM-DD (e.g., 2025-08-23)',
-                '4. If assigned_to_email is empty, task will be visible to all users',
-                '5. Priority options: low, medium, high, urgent, critical',
-                '6. Delete this instructions sheet and sample data before uploading',
-                '',
-                'REQUIRED COLUMNS:',
-                '- date: Date for the task (YYYY-MM-DD format)',
-                '- task_title: Title of the task',
-                '- task_description: Detailed description of the task',
-                '',
-                'OPTIONAL COLUMNS:',
-                '- priority: Task priority (default: medium)',
-                '- estimated_hours: Hours needed to complete (default: 1.0)',
-                '- points_value: Points awarded for completion (default: 10)',
-                '- assigned_to_email: Email of user to assign (leave empty for all users)'
-            ]
-        })
-        instructions.to_excel(writer, sheet_name='Instructions', index=False)
-        
-        # Sample data sheet
-        df.to_excel(writer, sheet_name='Daily Tasks', index=False)
-    
-    return response
+    # Write-only workbook: rows go straight to the sheet without a DataFrame
+    instructions = [
+        '1. Fill in the required columns: date, task_title, task_description',
+        '2. Optional columns: priority (low/medium/high/urgent), estimated_hours, points_value, assigned_to_email',
+        '3. Date format: YYYY-MM-DD (e.g., 2025-08-23)',
+        '4. If assigned_to_email is empty, task will be visible to all users',
+        '5. Priority options: low, medium, high, urgent, critical',
+        '6. Delete this instructions sheet and sample data before uploading',
+        '',
+        'REQUIRED COLUMNS:',
+        '- date: Date for the task (YYYY-MM-DD format)',
+        '- task_title: Title of the task',
+        '- task_description: Detailed description of the task',
+        '',
+        'OPTIONAL COLUMNS:',
+        '- priority: Task priority (default: medium)',
+        '- estimated_hours: Hours needed to complete (default: 1.0)',
+        '- points_value: Points awarded for completion (default: 10)',
+        '- assigned_to_email: Email of user to assign (leave empty for all users)'
+    ]
+    header = list(sample_data[0])
+
+    return xlsx_response(
+        [
+            ('Instructions', ['INSTRUCTIONS'], ([line] for line in instructions)),
+            ('Daily Tasks', header, ([row[column] for column in header] for row in sample_data)),
+        ],
+        f'daily_tasks_template_{datetime.now().strftime("%Y%m%d")}.xlsx',
+    )
 
 
 @login_required
 def download_weekly_template(request):
     """Download Excel template for weekly tasks"""
-    import pandas as pd
-    from django.http import HttpResponse
     from datetime import datetime, timedelta
     
     # Create sample data for the template
@@ -2780,46 +2467,38 @@ def download_weekly_template(request):
         }
     ]
     
-    # Create DataFrame
-    df = pd.DataFrame(sample_data)
-    
-    # Create response
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="weekly_tasks_template_{datetime.now().strftime("%Y%m%d")}.xlsx"'
-    
-    # Write to Excel
-    with pd.ExcelWriter(response, engine='openpyxl') as writer:
-        # Instructions sheet
-        instructions = pd.DataFrame({
-            'INSTRUCTIONS': [
-                '1. Fill in the required columns: start_date, end_date, task_title, task_description, weekday',
-                '2. Optional columns: priority, estimated_hours, points_value, assigned_to_email',
-                '3. Date format: YYYY-MM-DD (e.g., 2025-08-23)',
-                '4. Weekday options: Monday, Tuesday, Wednesday, Thursday, Friday, Saturday, Sunday',
-                '5. Tasks will be created for every occurrence of the weekday between start_date and end_date',
-                '6. If assigned_to_email is empty, task will be visible to all users',
-                '7. Delete this instructions sheet and sample data before uploading',
-                '',
-                'REQUIRED COLUMNS:',
-                '- start_date: Start date of the weekly task series (YYYY-MM-DD)',
-                '- end_date: End date of the weekly task series (YYYY-MM-DD)',
-                '- task_title: Title of the weekly task',
-                '- task_description: Detailed description of the task',
-                '- weekday: Day of the week (Monday, Tuesday, etc.)',
-                '',
-                'OPTIONAL COLUMNS:',
-                '- priority: Task priority (default: medium)',
-                '- estimated_hours: Hours needed to complete (default: 2.0)',
-                '- points_value: Points awarded for completion (default: 20)',
-                '- assigned_to_email: Email of user to assign (leave empty for all users)'
-            ]
-        })
-        instructions.to_excel(writer, sheet_name='Instructions', index=False)
-        
-        # Sample data sheet
-        df.to_excel(writer, sheet_name='Weekly Tasks', index=False)
-    
-    return response
+    # Write-only workbook: rows go straight to the sheet without a DataFrame
+    instructions = [
+        '1. Fill in the required columns: start_date, end_date, task_title, task_description, weekday',
+        '2. Optional columns: priority, estimated_hours, points_value, assigned_to_email',
+        '3. Date format: YYYY-MM-DD (e.g., 2025-08-23)',
+        '4. Weekday options: Monday, Tuesday, Wednesday, Thursday, Friday, Saturday, Sunday',
+        '5. Tasks will be created for every occurrence of the weekday between start_date and end_date',
+        '6. If assigned_to_email is empty, task will be visible to all users',
+        '7. Delete this instructions sheet and sample data before uploading',
+        '',
+        'REQUIRED COLUMNS:',
+        '- start_date: Start date of the weekly task series (YYYY-MM-DD)',
+        '- end_date: End date of the weekly task series (YYYY-MM-DD)',
+        '- task_title: Title of the weekly task',
+        '- task_description: Detailed description of the task',
+        '- weekday: Day of the week (Monday, Tuesday, etc.)',
+        '',
+        'OPTIONAL COLUMNS:',
+        '- priority: Task priority (default: medium)',
+        '- estimated_hours: Hours needed to complete (default: 2.0)',
+        '- points_value: Points awarded for completion (default: 20)',
+        '- assigned_to_email: Email of user to assign (leave empty for all users)'
+    ]
+    header = list(sample_data[0])
+
+    return xlsx_response(
+        [
+            ('Instructions', ['INSTRUCTIONS'], ([line] for line in instructions)),
+            ('Weekly Tasks', header, ([row[column] for column in header] for row in sample_data)),
+        ],
+        f'weekly_tasks_template_{datetime.now().strftime("%Y%m%d")}.xlsx',
+    )
 
 
 @login_required
@@ -2832,7 +2511,7 @@ def download_task_file(request, task_id):
         if not (task.assigned_to_all or 
                 task.assigned_to == request.user or 
                 request.user.is_superuser or
-                request.user.groups.filter(name__in=['Admin', 'Manager', 'Team Lead']).exists()):
+                has_group(request.user, 'Admin', 'Manager', 'Team Lead')):
             messages.error(request, 'You do not have permission to access this task file.')
             return redirect('tasks:task-list')
         
@@ -2846,35 +2525,32 @@ def download_task_file(request, task_id):
         # If only one file, download it directly
         if task_files.count() == 1:
             task_file = task_files.first()
-            response = HttpResponse(content_type='application/octet-stream')
-            response['Content-Disposition'] = f'attachment; filename="{task_file.filename}"'
-            
-            # Read file content and return
             try:
-                with open(task_file.file_path, 'rb') as f:
-                    response.write(f.read())
-                return response
-            except FileNotFoundError:
+                return serve_file(
+                    request, media_path(task_file.local_file_path),
+                    filename=task_file.filename, as_attachment=True,
+                )
+            except Http404:
                 messages.error(request, 'File not found on server.')
                 return redirect('tasks:task-detail', pk=task_id)
         
-        # If multiple files, create a zip
+        # If multiple files, build the zip on disk rather than in memory
         import zipfile
-        import io
+        import tempfile
         
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+        zip_file_obj = tempfile.TemporaryFile()
+        with zipfile.ZipFile(zip_file_obj, 'w') as zip_file:
             for task_file in task_files:
                 try:
-                    zip_file.write(task_file.file_path, task_file.filename)
+                    zip_file.write(media_path(task_file.local_file_path), task_file.filename)
                 except FileNotFoundError:
                     continue
         
-        zip_buffer.seek(0)
-        response = HttpResponse(zip_buffer.read(), content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename="{task.title}_files.zip"'
-        
-        return response
+        zip_file_obj.seek(0)
+        return FileResponse(
+            zip_file_obj, as_attachment=True,
+            filename=f'{task.title}_files.zip', content_type='application/zip',
+        )
         
     except Task.DoesNotExist:
         messages.error(request, 'Task not found.')
@@ -0,0 +1,147 @@
+"""
+Materialized task visibility index.
+
+A task is visible to its assignee, creator and reviewer, and to everyone when
+it is public (``assigned_to_all``) or was created by an administrator. Instead
+of rebuilding that rule as an OR of subqueries on every request, each task
+keeps a handful of ``TaskVisibility`` rows: one per related user plus a single
+``user=NULL`` row when the task is visible to everyone. Listing and permission
+checks then become one indexed ``EXISTS``.
+
+The rows are maintained by the signal handlers in ``tasks.signals``; code that
+bypasses ``Task.save()`` (``QuerySet.update()``, ``bulk_create()``) must call
+``refresh_task_visibility`` itself.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from users.roles import admin_users, is_admin
+from .models import Task, TaskVisibility
+
+EVERYONE = None
+
+VISIBILITY_FIELDS = ('id', 'assigned_to_id', 'created_by_id', 'reviewer_id', 'assigned_to_all')
+
+REFRESH_CHUNK_SIZE = 500
+
+
+def visible_to(user):
+    """Filter expression matching tasks indexed as visible to ``user``"""
+    return Exists(
+        TaskVisibility.objects.filter(task=OuterRef('pk')).filter(
+            Q(user=user) | Q(user__isnull=True)
+        )
+    )
+
+
+def visible_tasks(user, queryset=None):
+    """Restrict ``queryset`` to the tasks ``user`` may see"""
+    if queryset is None:
+        queryset = Task.objects.all()
+    if is_admin(user):
+        return queryset
+    return queryset.filter(visible_to(user))
+
+
+def user_can_view_task(user, task):
+    """Single-task check: cheap attribute tests first, then one indexed lookup"""
+    if user.is_superuser or task.assigned_to_all:
+        return True
+    if user.pk in (task.assigned_to_id, task.created_by_id, task.reviewer_id):
+        return True
+    return TaskVisibility.objects.filter(task=task).filter(
+        Q(user=user) | Q(user__isnull=True)
+    ).exists()
+
+
+def expected_entries(task, admin_ids):
+    """The set of user ids (``EVERYONE`` for the public row) that should see ``task``"""
+    entries = {task.assigned_to_id, task.created_by_id, task.reviewer_id}
+    entries.discard(None)
+    if task.assigned_to_all or task.created_by_id in admin_ids:
+        entries.add(EVERYONE)
+    return entries
+
+
+def _admin_creators(tasks):
+    # Read fresh: the rows written here are permanent, and the cached admin
+    # set may be up to ROLE_CACHE_TTL stale in this worker
+    creator_ids = {task.created_by_id for task in tasks} - {None}
+    if not creator_ids:
+        return set()
+    return set(admin_users().filter(pk__in=creator_ids).values_list('pk', flat=True))
+
+
+def _refresh_chunk(tasks, admin_ids=None):
+    if admin_ids is None:
+        admin_ids = _admin_creators(tasks)
+    wanted = {task.pk: expected_entries(task, admin_ids) for task in tasks}
+    existing = {}
+    for row_id, task_id, user_id in TaskVisibility.objects.filter(
+        task_id__in=wanted
+    ).values_list('id', 'task_id', 'user_id'):
+        existing.setdefault(task_id, {})[user_id] = row_id
+
+    stale = []
+    missing = []
+    for task_id, entries in wanted.items():
+        current = existing.get(task_id, {})
+        stale.extend(row_id for user_id, row_id in current.items() if user_id not in entries)
+        missing.extend(
+            TaskVisibility(task_id=task_id, user_id=user_id)
+            for user_id in entries if user_id not in current
+        )
+
+    if stale:
+        TaskVisibility.objects.filter(id__in=stale).delete()
+    if missing:
+        TaskVisibility.objects.bulk_create(missing)
+
+
+def refresh_task_visibility(tasks, admin_ids=None):
+    """
+    Bring the index in line for ``tasks`` (instances or a queryset).
+
+    Rows are diffed against what is stored, so untouched tasks cost nothing
+    beyond the lookup; work is done in chunks of ``REFRESH_CHUNK_SIZE``.
+    Creators' admin status is read from the database unless ``admin_ids``
+    is given.
+    """
+    if hasattr(tasks, 'only'):
+        tasks = tasks.only(*VISIBILITY_FIELDS).iterator(chunk_size=REFRESH_CHUNK_SIZE)
+
+    with transaction.atomic():
+        chunk = []
+        for task in tasks:
+            chunk.append(task)
+            if len(chunk) >= REFRESH_CHUNK_SIZE:
+                _refresh_chunk(chunk, admin_ids)
+                chunk = []
+        if chunk:
+            _refresh_chunk(chunk, admin_ids)
+
+
+def refresh_creator_visibility(user_ids):
+    """
+    Re-evaluate the public row of every task created by ``user_ids`` after
+    their admin status may have changed (group, superuser or staff flag).
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    # Read fresh rather than from the role cache, which may not have been
+    # invalidated yet when this runs from a signal handler
+    admin_ids = set(admin_users().filter(pk__in=user_ids).values_list('pk', flat=True))
+    public_row = TaskVisibility.objects.filter(task=OuterRef('pk'), user__isnull=True)
+
+    with transaction.atomic():
+        promoted = Task.objects.filter(created_by_id__in=admin_ids).exclude(Exists(public_row))
+        TaskVisibility.objects.bulk_create([
+            TaskVisibility(task_id=task_id, user_id=EVERYONE)
+            for task_id in promoted.values_list('pk', flat=True)
+        ])
+        TaskVisibility.objects.filter(
+            user__isnull=True,
+            task__created_by_id__in=user_ids - admin_ids,
+            task__assigned_to_all=False,
+        ).delete()
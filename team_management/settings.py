@@ -121,6 +121,9 @@ except ImportError:
     print("[WARNING] django-allauth not available, skipping allauth middleware")
     pass
 
+# Last, so it only wraps the view
+MIDDLEWARE.append('analytics.middleware.ActivityBufferMiddleware')
+
 ROOT_URLCONF = 'team_management.urls'
 
 TEMPLATES = [
@@ -160,6 +163,9 @@ DATABASES = {
         },
         'CONN_MAX_AGE': 600,
         'CONN_HEALTH_CHECKS': True,
+        # Port 6543 is Supabase's transaction-mode pooler, which cannot keep
+        # server-side cursors open between transactions
+        'DISABLE_SERVER_SIDE_CURSORS': config('SUPABASE_PORT', default='6543', cast=int) == 6543,
     }
 }
 
@@ -358,11 +364,45 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Background jobs (bulk uploads, Drive uploads and syncs, points): 'thread'
+# runs them in-process after the request returns, 'database' leaves them
+# queued for `manage.py process_bulk_uploads` / `process_drive_uploads` /
+# `sync_drive_changes` / `apply_points`
+TASK_JOBS_BACKEND = config('TASK_JOBS_BACKEND', default='thread')
+TASK_JOBS_THREADS = config('TASK_JOBS_THREADS', default=1, cast=int)
+
+# User activity log: 'thread' writes each request's events in batches on a
+# background thread, 'sync' writes them before the response is returned
+ACTIVITY_WRITER = config('ACTIVITY_WRITER', default='thread')
+
+# Raw activity older than this is rolled up into daily counts and removed
+# (`manage.py rollup_activity`); the removed rows are archived as gzipped
+# JSON lines under ACTIVITY_ARCHIVE_DIR (empty to skip archiving)
+ACTIVITY_RETENTION_DAYS = config('ACTIVITY_RETENTION_DAYS', default=90, cast=int)
+ACTIVITY_ARCHIVE_DIR = config('ACTIVITY_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'activity'))
+
+# File downloads: 'python' serves them from Django (Range/ETag aware, sendfile
+# through wsgi.file_wrapper); 'x-accel-redirect' (nginx) or 'x-sendfile'
+# (Apache/lighttpd) hand files under MEDIA_ROOT to the front-end server.
+# For nginx, map FILE_DELIVERY_ACCEL_PREFIX to MEDIA_ROOT in an internal location.
+FILE_DELIVERY_BACKEND = config('FILE_DELIVERY_BACKEND', default='python')
+FILE_DELIVERY_ACCEL_PREFIX = config('FILE_DELIVERY_ACCEL_PREFIX', default='/protected-media/')
+
+# Google Drive/Sheets integration. When off, no Google credentials are loaded
+# and no API clients are built; uploaded task files stay local only
+GOOGLE_DRIVE_ENABLED = config('GOOGLE_DRIVE_ENABLED', default=False, cast=bool)
+
+# Where Google API discovery documents are cached (default: a temp directory)
+GOOGLE_DISCOVERY_CACHE_DIR = config('GOOGLE_DISCOVERY_CACHE_DIR', default='')
+
 # Google Database Integration Settings (Single Account)
 GOOGLE_SERVICE_ACCOUNT_FILE = config('GOOGLE_SERVICE_ACCOUNT_FILE', default='')
 GOOGLE_SERVICE_ACCOUNT_JSON = config('GOOGLE_SERVICE_ACCOUNT_JSON', default='')
 GOOGLE_DATABASE_SPREADSHEET_ID = config('GOOGLE_DATABASE_SPREADSHEET_ID', default='')
 
+# Seconds a cached sheet is trusted before its Drive version is rechecked
+GOOGLE_SHEETS_CACHE_TTL = config('GOOGLE_SHEETS_CACHE_TTL', default=60, cast=int)
+
 # Google Sheets Configuration (for gspread-django)
 GSPREAD_CONFIG = {
     'service_account_file': GOOGLE_SERVICE_ACCOUNT_FILE,
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from users.points import apply_pending
+
+
+class Command(BaseCommand):
+    help = 'Add pending points ledger entries to user totals (TASK_JOBS_BACKEND = "database")'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Apply the pending entries and exit instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when nothing is pending',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            applied = apply_pending()
+            if applied:
+                self.stdout.write(self.style.SUCCESS(f"Applied {applied} points entries"))
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_drive_upload_queue'),
+        ('users', '0002_remove_user_profile_picture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('task_completed', 'Task Completed'), ('manual', 'Manual Award')], max_length=30)),
+                ('points', models.IntegerField()),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('applied', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='points_entries', to='tasks.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'points_ledger',
+                'ordering': ['-created_at'],
+                'indexes': [
+                    models.Index(fields=['applied', 'id'], name='points_ledg_applied_f2e3be_idx'),
+                    models.Index(fields=['user', 'created_at'], name='points_ledg_user_id_ed8d7f_idx'),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pointsledger',
+            constraint=models.UniqueConstraint(condition=models.Q(('task__isnull', False)), fields=('user', 'task', 'reason'), name='points_ledger_unique_task_award'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 import uuid
@@ -191,23 +191,16 @@ class User(AbstractUser):
         return self.get_role_display().title()
     
     def add_points(self, points, reason=""):
-        """Add points to user and update level"""
-        self.total_points += points
-        # Simple level calculation: every 1000 points = 1 level
-        self.level = (self.total_points // 1000) + 1
-        self.save()
+        """
+        Award points through the ledger (see ``users.points``). The points are
+        applied and this instance's totals refreshed once the current
+        transaction commits (right away outside one).
+        """
+        from .points import award
         
-        # Log the activity (will be imported later to avoid circular imports)
-        try:
-            from analytics.models import UserActivity
-            UserActivity.objects.create(
-                user=self,
-                activity_type='points_earned',
-                description=f"Earned {points} points: {reason}",
-                points_earned=points
-            )
-        except ImportError:
-            pass  # Analytics models not yet available
+        award(self, points, 'manual', description=reason, apply_now=True)
+        # Runs after award's apply_pending callback
+        transaction.on_commit(lambda: self.refresh_from_db(fields=['total_points', 'level']))
     
     def can_manage_users(self):
         """Check if user can manage other users"""
@@ -471,3 +464,44 @@ class TeamMembership(models.Model):
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.team_name} ({self.role_in_team})"
+
+
+class PointsLedger(models.Model):
+    """Append-only record of awarded points, applied to User totals by ``users.points``"""
+    
+    REASON_CHOICES = [
+        ('task_completed', 'Task Completed'),
+        ('manual', 'Manual Award'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='points_entries')
+    task = models.ForeignKey(
+        'tasks.Task', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='points_entries'
+    )
+    reason = models.CharField(max_length=30, choices=REASON_CHOICES)
+    points = models.IntegerField()
+    description = models.CharField(max_length=255, blank=True)
+    
+    # Set once the points have been added to user.total_points
+    applied = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'points_ledger'
+        ordering = ['-created_at']
+        constraints = [
+            # A task awards its points to a user once per reason
+            models.UniqueConstraint(
+                fields=['user', 'task', 'reason'],
+                condition=models.Q(task__isnull=False),
+                name='points_ledger_unique_task_award',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['applied', 'id']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} +{self.points} ({self.reason})"
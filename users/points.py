@@ -0,0 +1,121 @@
+"""
+Points awards through an append-only ledger.
+
+``Task.save()`` used to call ``User.add_points()`` on every save of a
+completed task, so each progress edit or time-log update awarded the points
+again, and each award was a full ``User.save()`` (firing every User
+post_save handler) plus a ``UserActivity`` insert, inside the task's
+transaction. Concurrent awards to one user could also overwrite each other's
+``total_points``.
+
+Now an award is a single ``PointsLedger`` insert. The (user, task, reason)
+constraint makes repeated awards for the same task no-ops. Pending entries
+are applied after commit by ``apply_pending``: they are claimed with
+``SELECT ... FOR UPDATE SKIP LOCKED``, summed per user, and added with one
+``F()`` update per user. The ``points_earned`` activities are written in one
+``bulk_create``, and the same batch updates the leaderboards
+(``analytics.leaderboard``).
+
+``TASK_JOBS_BACKEND`` picks who applies them: ``thread`` applies them on
+a background thread once the awarding transaction commits; ``database``
+leaves them for ``manage.py apply_points``.
+"""
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+
+from .models import PointsLedger, User
+
+logger = logging.getLogger(__name__)
+
+APPLY_BATCH_SIZE = 500
+
+# Every 1000 points is one level
+POINTS_PER_LEVEL = 1000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='points')
+        return _executor
+
+
+def award(user, points, reason, task=None, description='', apply_now=False):
+    """
+    Record ``points`` for ``user``. Returns the ledger entry, or None if
+    ``task`` already awarded this user points for ``reason``.
+    """
+    try:
+        with transaction.atomic():
+            entry = PointsLedger.objects.create(
+                user=user, task=task, reason=reason, points=points,
+                description=description[:255],
+            )
+    except IntegrityError:
+        if task is None:
+            raise
+        return None
+
+    if apply_now:
+        transaction.on_commit(apply_pending)
+    elif getattr(settings, 'TASK_JOBS_BACKEND', 'thread') != 'database':
+        transaction.on_commit(lambda: _get_executor().submit(_apply_in_thread))
+    return entry
+
+
+def _apply_in_thread():
+    try:
+        apply_pending()
+    except Exception:
+        logger.exception("Applying points failed")
+    finally:
+        connections.close_all()
+
+
+def apply_pending(batch_size=APPLY_BATCH_SIZE):
+    """Add unapplied ledger entries to user totals; returns how many were applied"""
+    from analytics import leaderboard
+    from analytics.models import UserActivity
+
+    applied = 0
+    while True:
+        with transaction.atomic():
+            entries = list(
+                PointsLedger.objects.select_for_update(skip_locked=True)
+                .filter(applied=False).order_by('pk')[:batch_size]
+            )
+            if not entries:
+                return applied
+
+            totals = defaultdict(int)
+            for entry in entries:
+                totals[entry.user_id] += entry.points
+            for user_id, points in totals.items():
+                # Two statements: the level must see the new total on every backend
+                User.objects.filter(pk=user_id).update(total_points=F('total_points') + points)
+                User.objects.filter(pk=user_id).update(level=F('total_points') / POINTS_PER_LEVEL + 1)
+
+            PointsLedger.objects.filter(pk__in=[entry.pk for entry in entries]).update(applied=True)
+            UserActivity.objects.bulk_create([
+                UserActivity(
+                    user_id=entry.user_id,
+                    activity_type='points_earned',
+                    description=f"Earned {entry.points} points: {entry.description}",
+                    points_earned=max(entry.points, 0),
+                    related_object_id=entry.task_id,
+                    related_object_type='task' if entry.task_id else '',
+                )
+                for entry in entries
+            ])
+            leaderboard.record_awards(entries)
+        applied += len(entries)
@@ -0,0 +1,82 @@
+"""
+Role and permission resolution.
+
+Group membership used to be checked with ``user.groups.filter(...).exists()``
+at every call site, several times per page, and the set of administrators was
+re-selected as a subquery by every visibility rule. This module loads a user's
+group names once and memoizes them on the user instance (``request.user`` lives
+for a single request), and keeps the admin-ID set in a process-local cache
+that is invalidated by the signal handlers in ``users.signals`` and bounded by
+``ROLE_CACHE_TTL`` seconds so that other worker processes converge as well.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import User
+
+ADMIN_GROUP = 'Admin'
+
+_GROUP_CACHE_ATTR = '_cached_group_names'
+
+_admin_ids_lock = threading.Lock()
+_admin_ids_cache = {'ids': None, 'loaded_at': 0.0, 'generation': 0}
+
+
+def group_names(user):
+    """Names of the groups ``user`` belongs to, loaded once per user instance"""
+    if not getattr(user, 'is_authenticated', False):
+        return frozenset()
+    names = getattr(user, _GROUP_CACHE_ATTR, None)
+    if names is None:
+        names = frozenset(user.groups.values_list('name', flat=True))
+        setattr(user, _GROUP_CACHE_ATTR, names)
+    return names
+
+
+def forget_group_names(user):
+    """Drop the memoized group names of a user instance"""
+    user.__dict__.pop(_GROUP_CACHE_ATTR, None)
+
+
+def has_group(user, *names):
+    """True if ``user`` belongs to any of the groups ``names``"""
+    return not group_names(user).isdisjoint(names)
+
+
+def is_admin(user):
+    """Superusers and members of the Admin group"""
+    return bool(getattr(user, 'is_superuser', False)) or has_group(user, ADMIN_GROUP)
+
+
+def admin_users():
+    """Users whose tasks are visible to the whole team"""
+    return User.objects.filter(
+        Q(is_superuser=True) | Q(groups__name=ADMIN_GROUP) | Q(is_staff=True)
+    )
+
+
+def admin_user_ids():
+    """Memoized ids of ``admin_users()``"""
+    ttl = getattr(settings, 'ROLE_CACHE_TTL', 300)
+    with _admin_ids_lock:
+        ids = _admin_ids_cache['ids']
+        if ids is not None and time.monotonic() - _admin_ids_cache['loaded_at'] < ttl:
+            return ids
+        generation = _admin_ids_cache['generation']
+
+    ids = frozenset(admin_users().values_list('pk', flat=True))
+    with _admin_ids_lock:
+        # Don't store a result that an invalidation overtook while querying
+        if _admin_ids_cache['generation'] == generation:
+            _admin_ids_cache['ids'] = ids
+            _admin_ids_cache['loaded_at'] = time.monotonic()
+    return ids
+
+
+def invalidate_admin_user_ids():
+    with _admin_ids_lock:
+        _admin_ids_cache['ids'] = None
+        _admin_ids_cache['generation'] += 1
@@ -0,0 +1,29 @@
+"""
+Signal handlers invalidating the role caches in ``users.roles``.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+from .roles import forget_group_names, invalidate_admin_user_ids
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_group_change(sender, instance, action, reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        forget_group_names(instance)
+    invalidate_admin_user_ids()
+
+
+@receiver(post_save, sender=User)
+def invalidate_roles_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not {'is_superuser', 'is_staff'}.intersection(update_fields):
+        return
+    invalidate_admin_user_ids()
+
+
+@receiver(post_delete, sender=User)
+def invalidate_roles_on_user_delete(sender, instance, **kwargs):
+    invalidate_admin_user_ids()
@@ -45,6 +45,8 @@ except ImportError:
 from .models import User, UserProfile
 from .forms import UserProfileForm, UserRegistrationForm, LoginForm
 from tasks.models import Task
+from tasks.stats import aggregate_task_stats, overview_buckets
+from tasks.exports import iter_values, streaming_csv_response, wants_gzip
 from projects.models import Project
 from analytics.models import UserActivity
 from django.utils import timezone
@@ -71,16 +73,19 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         # Get recent tasks (all tasks)
         recent_tasks = all_tasks.order_by('-created_at')[:5]
         
-        # Get task statistics (all tasks)
+        # Get task statistics (all tasks) in a single aggregate query
+        counts = aggregate_task_stats(all_tasks, {
+            **overview_buckets(overdue_before=timezone.now()),
+            'dsa_tasks': Q(task_type='feature', status='completed'),
+            'python_tasks': Q(task_type='bug', status='completed'),
+            'ml_tasks': Q(task_type='learning', status='completed'),
+        })
         task_stats = {
-            'total': all_tasks.count(),
-            'completed': all_tasks.filter(status='completed').count(),
-            'pending': all_tasks.filter(status='todo').count(),
-            'in_progress': all_tasks.filter(status='in_progress').count(),
-            'overdue': all_tasks.filter(
-                due_date__lt=timezone.now(),
-                status__in=['todo', 'in_progress']
-            ).count(),
+            'total': counts['total'],
+            'completed': counts['completed'],
+            'pending': counts['todo'],
+            'in_progress': counts['in_progress'],
+            'overdue': counts['overdue'],
         }
         
         # Calculate completion percentage
@@ -99,9 +104,9 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         
         # Get learning progress (overall progress across all tasks)
         learning_progress = {
-            'dsa_tasks': all_tasks.filter(task_type='feature', status='completed').count(),
-            'python_tasks': all_tasks.filter(task_type='bug', status='completed').count(),
-            'ml_tasks': all_tasks.filter(task_type='learning', status='completed').count(),
+            'dsa_tasks': counts['dsa_tasks'],
+            'python_tasks': counts['python_tasks'],
+            'ml_tasks': counts['ml_tasks'],
         }
         
         # Get recent activities
@@ -362,32 +367,33 @@ def toggle_user_status(request, pk):
 @login_required
 def export_users(request):
     """Export users to CSV (admin only)"""
-    import csv
-    from django.http import HttpResponse
-    
     if request.user.role != 'admin':
         messages.error(request, 'Access denied. Admin privileges required.')
         return redirect('users:dashboard')
     
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="users_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Name', 'Email', 'Role', 'Active', 'Date Joined', 'Last Login'])
+    roles = dict(User.ROLE_CHOICES)
     
-    users = User.objects.all().order_by('date_joined')
-    for user in users:
-        writer.writerow([
-            user.id,
-            user.full_name,
-            user.email,
-            user.get_role_display() if hasattr(user, 'get_role_display') else user.role,
-            'Yes' if user.is_active else 'No',
-            user.date_joined.strftime('%Y-%m-%d %H:%M:%S'),
-            user.last_login.strftime('%Y-%m-%d %H:%M:%S') if user.last_login else 'Never',
-        ])
+    def rows():
+        for user_id, full, email, role, is_active, date_joined, last_login in iter_values(
+            User.objects.all(),
+            ['id', 'full_name', 'email', 'role', 'is_active', 'date_joined', 'last_login'],
+        ):
+            yield [
+                user_id,
+                full,
+                email,
+                roles.get(role, role),
+                'Yes' if is_active else 'No',
+                date_joined.strftime('%Y-%m-%d %H:%M:%S'),
+                last_login.strftime('%Y-%m-%d %H:%M:%S') if last_login else 'Never',
+            ]
     
-    return response
+    return streaming_csv_response(
+        ['ID', 'Name', 'Email', 'Role', 'Active', 'Date Joined', 'Last Login'],
+        rows(),
+        'users_export.csv',
+        gzip=wants_gzip(request),
+    )
 
 # API ViewSets - Only available if REST framework is installed
 if HAS_REST_FRAMEWORK and HAS_SERIALIZERS: